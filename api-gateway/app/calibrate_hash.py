@@ -0,0 +1,69 @@
+"""
+Подбор стоимости хэширования паролей под время входа на текущем оборудовании.
+
+Запуск в контейнере API-gateway:
+    python -m app.calibrate_hash [--target 0.25] [--algorithm bcrypt]
+Найденное значение задаётся в PASSWORD_HASH_ROUNDS; хэши пользователей пересчитываются при следующем входе.
+"""
+import time
+import argparse
+import statistics
+from passlib.context import CryptContext
+
+# Проверяемые значения стоимости: для bcrypt - log2 числа итераций, для argon2 - time_cost, для pbkdf2 - итерации
+CANDIDATE_ROUNDS = {
+    "bcrypt": range(4, 18),
+    "argon2": range(1, 17),
+    "pbkdf2_sha256": [10_000 * 2 ** i for i in range(10)],
+    "pbkdf2_sha512": [10_000 * 2 ** i for i in range(10)],
+    "sha256_crypt": [5_000 * 2 ** i for i in range(10)],
+    "sha512_crypt": [5_000 * 2 ** i for i in range(10)],
+}
+
+
+def measure(algorithm: str, rounds: int, samples: int) -> float:
+    """Медианное время проверки пароля (примерно равно времени хэширования) в секундах."""
+    context = CryptContext(schemes=[algorithm], **{f"{algorithm}__rounds": rounds})
+    hashed_password = context.hash("calibration-password")
+    durations = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.verify("calibration-password", hashed_password)
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+def calibrate(algorithm: str, target: float, samples: int) -> int | None:
+    """Наибольшая стоимость, при которой проверка пароля укладывается в target секунд."""
+    chosen = None
+    for rounds in CANDIDATE_ROUNDS[algorithm]:
+        duration = measure(algorithm, rounds, samples)
+        print(f"{algorithm} rounds={rounds:<8} {duration * 1000:8.1f} ms")
+        if duration > target:
+            break
+        chosen = rounds
+    return chosen
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--algorithm", choices=CANDIDATE_ROUNDS, default=None,
+                        help="алгоритм (по умолчанию PASSWORD_HASH_ALGORITHM)")
+    parser.add_argument("--target", type=float, default=0.25, help="допустимое время проверки пароля в секундах")
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    algorithm = args.algorithm
+    if algorithm is None:
+        from app.config import settings
+        algorithm = settings.PASSWORD_HASH_ALGORITHM
+
+    rounds = calibrate(algorithm, args.target, args.samples)
+    if rounds is None:
+        print(f"Even the lowest cost of {algorithm} exceeds {args.target} s")
+    else:
+        print(f"PASSWORD_HASH_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,129 @@
 import logging
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import field_validator
-from typing import Dict, List
+from pydantic import BaseModel, field_validator
+from typing import Dict, List, Literal
 from pytimeparse import parse
 
 
+def parse_time_value(v):
+    """Преобразует время в формате pytimeparse в секунды, числа оставляет как есть."""
+    if v is None or isinstance(v, (int, float)):
+        return v
+    parsed_time = parse(v)
+    if parsed_time is None:
+        raise ValueError(f"Could not parse time value: {v}")
+    return parsed_time
+
+
+class RateLimitQuota(BaseModel):
+    """Квота запросов: requests запросов за period секунд с допустимым всплеском burst."""
+    requests: int
+    period: float = 1  # Значение в секундах
+    burst: int | None = None  # размер всплеска (по умолчанию равен requests)
+
+    @field_validator("period", mode="before")
+    @classmethod
+    def parse_time(cls, v):
+        return parse_time_value(v)
+
+
+class CircuitBreakerSettings(BaseModel):
+    """Настройки circuit breaker микросервиса."""
+    enabled: bool = True
+    window_size: int = 50  # количество последних вызовов в скользящем окне
+    min_calls: int = 20  # минимальное количество вызовов в окне для оценки
+    error_rate: float = 0.5  # доля ошибок (сетевые ошибки, таймауты, 5xx), при которой цепь размыкается
+    slow_call_threshold: float | None = None  # Значение в секундах, ответы дольше считаются медленными
+    slow_call_rate: float = 0.8  # доля медленных ответов, при которой цепь размыкается
+    open_timeout: float = 30  # Значение в секундах, время до пропуска пробных запросов
+    half_open_probes: int = 3  # количество успешных пробных запросов для замыкания цепи
+
+    @field_validator("slow_call_threshold", "open_timeout", mode="before")
+    @classmethod
+    def parse_time(cls, v):
+        return parse_time_value(v)
+
+
+class LoadBalancerSettings(BaseModel):
+    """Настройки балансировки между экземплярами микросервиса."""
+    strategy: Literal["least_requests", "p2c"] = "least_requests"  # полный перебор или выбор лучшего из двух случайных
+    consecutive_failures: int = 5  # количество ошибок подряд, после которого экземпляр исключается
+    ejection_time: float = 30  # Значение в секундах, растёт с каждым повторным исключением
+    max_ejection_time: float = 300  # Значение в секундах
+    max_ejected_percent: float = 0.5  # максимальная доля одновременно исключённых экземпляров
+
+    @field_validator("ejection_time", "max_ejection_time", mode="before")
+    @classmethod
+    def parse_time(cls, v):
+        return parse_time_value(v)
+
+
+class RetrySettings(BaseModel):
+    """Настройки повторов и hedging идемпотентных запросов к микросервису."""
+    methods: List[Literal["GET", "HEAD"]] = []  # методы, для которых включены повторы (по умолчанию выключены)
+    max_attempts: int = 2  # максимальное количество попыток, включая первую
+    retry_on_connection_error: bool = True  # повторять запрос на другом экземпляре при ошибке соединения
+    hedge: bool = False  # отправлять дополнительный запрос, если ответ задерживается дольше hedge_percentile
+    hedge_percentile: float = 0.95  # перцентиль задержек сервиса, после которого отправляется hedge-запрос
+    hedge_min_delay: float = 0.005  # Значение в секундах, минимальная задержка hedge-запроса
+    hedge_min_samples: int = 100  # количество замеров задержки, необходимое для включения hedging
+
+    @field_validator("hedge_min_delay", mode="before")
+    @classmethod
+    def parse_time(cls, v):
+        return parse_time_value(v)
+
+
+class ConcurrencyLimitSettings(BaseModel):
+    """Настройки адаптивного ограничения одновременных запросов к микросервису (AIMD)."""
+    enabled: bool = False  # включается для сервиса явно: лимит растёт с initial_limit только под нагрузкой
+    initial_limit: int = 20  # начальный лимит одновременных запросов
+    min_limit: int = 1
+    max_limit: int = 100
+    backoff_ratio: float = 0.9  # множитель лимита при перегрузке сервиса
+    latency_threshold: float = 5  # Значение в секундах, ответы дольше считаются признаком перегрузки
+    max_queue: int = 50  # максимальное количество запросов, ожидающих свободного места
+    queue_timeout: float = 1  # Значение в секундах, время ожидания в очереди до отказа с 503
+
+    @field_validator("latency_threshold", "queue_timeout", mode="before")
+    @classmethod
+    def parse_time(cls, v):
+        return parse_time_value(v)
+
+
+class ServiceSettings(BaseModel):
+    """Настройки проксирования для отдельного микросервиса."""
+    buffered: bool = False  # буферизовать тело запроса и ответа целиком вместо потоковой передачи
+
+    # Кэширование GET/HEAD-ответов
+    cache: bool = False  # включить кэширование ответов сервиса
+    cache_ttl: int = 0  # Время свежести ответа без Cache-Control (в секундах, 0 - только с ETag)
+    coalesce: bool = False  # объединять одновременные одинаковые GET/HEAD-запросы в один вызов сервиса
+
+    # Пул соединений
+    pool_limit: int = 100  # максимальное количество одновременных соединений с сервисом
+    keepalive_timeout: float = 15  # Значение в секундах
+    dns_cache_ttl: int = 10  # Значение в секундах
+    connect_timeout: float | None = None  # Значение в секундах (по умолчанию ограничено TOTAL_TIMEOUT)
+    read_timeout: float | None = None  # Значение в секундах (по умолчанию ограничено TOTAL_TIMEOUT)
+
+    rate_limit: RateLimitQuota | None = None  # квота запросов к сервису на одного клиента
+    breaker: CircuitBreakerSettings = CircuitBreakerSettings()
+    balancer: LoadBalancerSettings = LoadBalancerSettings()
+    retry: RetrySettings = RetrySettings()
+    concurrency: ConcurrencyLimitSettings = ConcurrencyLimitSettings()
+
+    @field_validator(
+        "cache_ttl", "keepalive_timeout", "dns_cache_ttl", "connect_timeout", "read_timeout", mode="before"
+    )
+    @classmethod
+    def parse_time(cls, v):
+        return parse_time_value(v)
+
+
+DEFAULT_SERVICE_SETTINGS = ServiceSettings()
+
+
 class Settings(BaseSettings):
     # Параметры подключения к PostgreSQL
     DB_USER: str
@@ -22,20 +141,89 @@ class Settings(BaseSettings):
     PORT: int = 8000
     WORKERS: int = 1
     LOG_LEVEL: int = logging.INFO
+    LOG_SAMPLING: Dict[str, float] = {}  # доля выводимых записей INFO и ниже по логгерам (пример: {"app.routers": 0.1})
 
     # Настройки JWT
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE: int = 15 * 60  # Значение в секундах
     REFRESH_TOKEN_EXPIRE: int = 30 * 24 * 60 * 60  # Значение в секундах
+    TOKEN_CACHE_SIZE: int = 10000  # Количество проверенных access-токенов в кэше (0 - кэш выключен)
+    REFRESH_TOKEN_PURGE_INTERVAL: float = 10 * 60  # Значение в секундах, период очистки токенов (0 - выключена)
+    REFRESH_TOKEN_PURGE_BATCH_SIZE: int = 1000  # количество токенов, удаляемых одной транзакцией
 
     # Настройки паролей
     PASSWORD_HASH_ALGORITHM: str = "bcrypt"  # алгоритм шифрования паролей
+    PASSWORD_HASH_ROUNDS: int | None = None  # стоимость хэширования (python -m app.calibrate_hash), None - passlib
+    PASSWORD_HASH_DEPRECATED: List[str] = []  # прежние алгоритмы: хэши проверяются и заменяются при входе
+    PASSWORD_HASH_WORKERS: int = 0  # потоки хеширования паролей (0 - число ядер / WORKERS)
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # операции с паролями в очереди сверх потоков, дальше - 503
 
     # Настройки CORS и микросервисов
     ALLOWED_ORIGINS: List[str] = []
-    MICRO_SERVICES: Dict[str, str] = {}
+    MICRO_SERVICES: Dict[str, str | List[str]] = {}  # адрес сервиса или список адресов его экземпляров
     TOTAL_TIMEOUT: int = 10  # Значение в секундах
+    MICRO_SERVICES_SETTINGS: Dict[str, ServiceSettings] = {}  # настройки проксирования по сервисам
+    PROXY_CHUNK_SIZE: int = 64 * 1024  # Размер чанка при потоковом проксировании (в байтах)
+    PROXY_FAST_PATH: bool = True  # обрабатывать прокси-маршрут на уровне ASGI в обход роутера FastAPI
+
+    # Бюджет повторов и hedge-запросов (общий для всех сервисов в пределах воркера)
+    RETRY_BUDGET_RATIO: float = 0.1  # доля дополнительных попыток от одновременно выполняемых запросов
+    RETRY_BUDGET_MIN_CONCURRENCY: int = 3  # дополнительные попытки, разрешённые при любой нагрузке
+
+    # Пакетные запросы (POST /api/batch)
+    BATCH_MAX_REQUESTS: int = 20  # максимальное количество подзапросов в пакете
+    BATCH_CONCURRENCY: int = 8  # количество одновременно выполняемых подзапросов пакета
+
+    # Доставка сообщений outbox микросервисам (создание профиля при регистрации)
+    OUTBOX_DISPATCH_INTERVAL: float = 5  # Значение в секундах, период проверки outbox (0 - доставка выключена)
+    OUTBOX_BATCH_SIZE: int = 50  # количество сообщений, доставляемых одновременно
+    OUTBOX_MAX_ATTEMPTS: int = 10  # после этого количества попыток доставка сообщения прекращается
+    OUTBOX_RETRY_DELAY: float = 1  # задержка первого повтора, удваивается с каждой попыткой (в секундах)
+    OUTBOX_MAX_RETRY_DELAY: float = 5 * 60  # максимальная задержка повтора (в секундах)
+    OUTBOX_LEASE: float = 60  # через это время сообщение, взятое завершившимся воркером, доставляется снова
+
+    # Страница товара (GET /api/pages/products/{product_id})
+    PAGES_PROFILES_BATCH_SIZE: int = 50  # количество user_id в одном запросе к profiles
+    PAGES_PROFILES_TIMEOUT: float = 1  # после этого времени страница отдаётся без имён пользователей (в секундах)
+
+    # Ограничение частоты запросов (квоты на одного клиента, делятся поровну между воркерами)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_DEFAULT: RateLimitQuota | None = None  # квота на все запросы /api (по умолчанию без ограничения)
+    RATE_LIMIT_ROUTES: Dict[str, RateLimitQuota] = {
+        "/api/auth/login": RateLimitQuota(requests=10, period=60),
+        "/api/auth/register": RateLimitQuota(requests=5, period=60),
+    }  # квоты отдельных маршрутов
+    RATE_LIMIT_TRUSTED_PROXIES: int = 0  # количество доверенных прокси перед gateway, дописывающих X-Forwarded-For
+
+    # Сжатие ответов
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_ALGORITHMS: List[str] = ["br", "zstd", "gzip"]  # в порядке предпочтения (br и zstd - при наличии)
+    COMPRESSION_MIN_SIZE: int = 1024  # Минимальный размер сжимаемого ответа (в байтах)
+    COMPRESSION_CONTENT_TYPES: List[str] = [
+        "application/json",
+        "application/javascript",
+        "application/xml",
+        "image/svg+xml",
+        "text/",
+    ]  # сжимаемые типы содержимого (значения с '/' на конце - префиксы)
+    COMPRESSION_THREAD_THRESHOLD: int = 256 * 1024  # Части ответа больше этого размера сжимаются в потоке (в байтах)
+
+    # Настройки кэша ответов
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # Бюджет памяти кэша (в байтах)
+    CACHE_MAX_ENTRY_BYTES: int = 1024 * 1024  # Максимальный размер одной записи (в байтах)
+
+    # Служебные эндпоинты /stats
+    STATS_TOKEN: str | None = None  # значение заголовка X-Stats-Token для доступа к /stats (не задан - доступ закрыт)
+
+    # Метрики Prometheus (GET /metrics)
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str | None = None  # токен Prometheus (Authorization: Bearer) для /metrics, не задан - закрыт
+    METRICS_LOOP_LAG_INTERVAL: float = 0.5  # период измерения задержки event loop (в секундах)
+
+    # Трассировка запросов (X-Request-ID и Server-Timing)
+    TRACING_ENABLED: bool = True
+    TRACING_EXPORT_FILE: str | None = None  # файл для выгрузки интервалов запросов (JSON Lines)
 
     # Режим отладки
     DEBUG: bool = False
@@ -117,6 +305,23 @@ class Settings(BaseSettings):
             raise ValueError(f"Could not parse TOTAL_REQUEST_TIMEOUT: {v}")
         return int(parsed_time)
 
+    @field_validator(
+        "PAGES_PROFILES_TIMEOUT",
+        "REFRESH_TOKEN_PURGE_INTERVAL",
+        "OUTBOX_DISPATCH_INTERVAL",
+        "OUTBOX_RETRY_DELAY",
+        "OUTBOX_MAX_RETRY_DELAY",
+        "OUTBOX_LEASE",
+        mode="before",
+    )
+    @classmethod
+    def parse_time(cls, v):
+        return parse_time_value(v)
+
+    def get_service_settings(self, service_name: str) -> ServiceSettings:
+        """Возвращает настройки проксирования сервиса (или значения по умолчанию)."""
+        return self.MICRO_SERVICES_SETTINGS.get(service_name, DEFAULT_SERVICE_SETTINGS)
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
@@ -3,6 +3,7 @@ from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.exc import IntegrityError
 
 from app.config import settings
+from app.migrations import run_migrations
 import logging
 
 logger = logging.getLogger(__name__)
@@ -39,6 +40,7 @@ async def setup_database():
     async with engine.begin() as conn:
         try:
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(run_migrations)
             logger.info("Database tables created successfully")
         except IntegrityError as e:
             logger.warning("IntegrityError during table creation", extra={"error": str(e)})
@@ -1,3 +1,4 @@
+import math
 import logging
 from fastapi import Request
 from fastapi.responses import JSONResponse
@@ -41,6 +42,23 @@ class ServiceUnavailableError(DatabaseServiceError):
         super().__init__(self.message)
 
 
+class TooManyRequestsError(DatabaseServiceError):
+    """Ошибка при превышении квоты запросов."""
+
+    def __init__(self, retry_after: float, message="Too many requests"):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(self.message)
+
+
+def lookup_exception_handler(handlers: dict, exc: Exception):
+    """Находит обработчик исключения (или его базового класса) среди зарегистрированных в приложении."""
+    for cls in type(exc).__mro__:
+        if cls in handlers:
+            return handlers[cls]
+    return None
+
+
 # Обработчики исключений для FastAPI
 async def invalid_credentials_handler(request: Request, exc: InvalidCredentials):
     """Возвращает 401 при неверных учетных данных."""
@@ -94,6 +112,20 @@ async def service_unavailable_handler(request: Request, exc: ServiceUnavailableE
     )
 
 
+async def too_many_requests_handler(request: Request, exc: TooManyRequestsError):
+    """Возвращает 429 с заголовком Retry-After при превышении квоты запросов."""
+    logging.warning(f"429 Too Many Requests", extra={"url": str(request.url), "retry_after": exc.retry_after})
+    return JSONResponse(
+        status_code=429,
+        content={
+            "detail": exc.message,
+            "error": "TooManyRequestsError",
+            "path": str(request.url),
+        },
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
 async def sql_error_handler(request: Request, exc: SQLAlchemyError):
     """Возвращает 500 при ошибке работы с базой данных."""
     logging.error(f"500 Database error", extra={"url": str(request.url), "exception": str(exc)})
@@ -1,18 +1,38 @@
-import aiohttp
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database import setup_database, engine
-from app.routers import main_router
+from app.database import setup_database, engine, async_session_maker
+from app.routers import main_router, internal_router
+from app.services.outbox import OutboxDispatcher
+from app.services.token_purge import run_refresh_token_purge
 from app.config import settings
 from app.exceptions import *
-from app.logs import setup_logging
+from app.logs import setup_logging, shutdown_logging
+from app.metrics import MetricsMiddleware, instrument_engine, metrics_endpoint, monitor_event_loop, shutdown_metrics
+from app.tracing import SpanExporter, TracedJSONResponse, TracingMiddleware, trace_engine
+from app.middleware import ProxyFastPathMiddleware, CompressionMiddleware, RateLimitMiddleware
+from app.utils.upstream import UpstreamRegistry
+from app.utils.cache import ResponseCache
+from app.utils.single_flight import SingleFlight
+from app.utils.token_cache import TokenCache
+from app.utils.rate_limiter import RateLimiter
+from app.utils.hashing import password_hasher
 
-setup_logging(debug=settings.DEBUG, level=settings.LOG_LEVEL, exclude_extra_fields=["message", "asctime"])
+setup_logging(debug=settings.DEBUG, level=settings.LOG_LEVEL, exclude_extra_fields=["message", "asctime"],
+              sampling=settings.LOG_SAMPLING)
 logger = logging.getLogger(__name__)
 
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+span_exporter = None
+if settings.TRACING_ENABLED:
+    trace_engine(engine)
+    if settings.TRACING_EXPORT_FILE:
+        span_exporter = SpanExporter(settings.TRACING_EXPORT_FILE)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -20,10 +40,36 @@ async def lifespan(app: FastAPI):
     safe_settings = settings.model_dump(exclude={"DB_PASSWORD", "JWT_SECRET_KEY", "DB_USER"})
     logger.info("Loaded settings from .env", extra={"settings": safe_settings})
 
-    logger.info("Application startup: Initializing aiohttp session")
-    app.state.aiohttp_session = aiohttp.ClientSession(
-        timeout=aiohttp.ClientTimeout(total=settings.TOTAL_TIMEOUT))
+    logger.info("Application startup: Initializing upstream connection pools")
+    app.state.upstreams = UpstreamRegistry(settings.MICRO_SERVICES)
+    app.state.response_cache = ResponseCache(settings.CACHE_MAX_BYTES, settings.CACHE_MAX_ENTRY_BYTES)
+    app.state.single_flight = SingleFlight()
+    app.state.token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+    app.state.rate_limiter = RateLimiter(settings.WORKERS)
+    loop_monitor = None
+    if settings.METRICS_ENABLED:
+        loop_monitor = asyncio.create_task(
+            monitor_event_loop(settings.METRICS_LOOP_LAG_INTERVAL, {"password_hash": password_hasher.executor})
+        )
     await setup_database()  # создаём таблицы в базе при старте
+    token_purge = None
+    if settings.REFRESH_TOKEN_PURGE_INTERVAL > 0:
+        token_purge = asyncio.create_task(run_refresh_token_purge(
+            engine, settings.REFRESH_TOKEN_PURGE_INTERVAL, settings.REFRESH_TOKEN_PURGE_BATCH_SIZE
+        ))
+    app.state.outbox = OutboxDispatcher(
+        async_session_maker,
+        app.state.upstreams,
+        settings.OUTBOX_BATCH_SIZE,
+        settings.OUTBOX_DISPATCH_INTERVAL,
+        settings.OUTBOX_MAX_ATTEMPTS,
+        settings.OUTBOX_RETRY_DELAY,
+        settings.OUTBOX_MAX_RETRY_DELAY,
+        settings.OUTBOX_LEASE,
+    )
+    outbox_dispatch = None
+    if settings.OUTBOX_DISPATCH_INTERVAL > 0:
+        outbox_dispatch = asyncio.create_task(app.state.outbox.run())
     logger.info(f"Application startup complete.")
     if settings.DEBUG:
         host = "127.0.0.1" if settings.HOST == "0.0.0.0" else settings.HOST
@@ -31,13 +77,40 @@ async def lifespan(app: FastAPI):
 
     yield
 
-    logger.info("Application shutdown: Closing aiohttp session")
-    await app.state.aiohttp_session.close()
+    if outbox_dispatch is not None:
+        outbox_dispatch.cancel()
+        with suppress(asyncio.CancelledError):
+            await outbox_dispatch  # недоставленные сообщения остаются в outbox до следующего запуска
+    logger.info("Application shutdown: Closing upstream connection pools")
+    await app.state.upstreams.close()
+    password_hasher.shutdown()
+    if loop_monitor is not None:
+        loop_monitor.cancel()
+        shutdown_metrics()
+    if span_exporter is not None:
+        span_exporter.close()
+    if token_purge is not None:
+        token_purge.cancel()
+        with suppress(asyncio.CancelledError):
+            await token_purge  # очистка снимает блокировку до закрытия соединений
     await engine.dispose()  # закрываем соединение с базой при остановке
     logger.info("Application shutdown complete")
+    shutdown_logging()  # дожидаемся вывода записей из очереди
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=TracedJSONResponse)
 
+# Прокси-маршрут в обход роутера FastAPI (middleware, добавленные позже, оборачивают его)
+if settings.PROXY_FAST_PATH:
+    app.add_middleware(ProxyFastPathMiddleware)
 
-app = FastAPI(lifespan=lifespan)
+# Сжатие ответов, в том числе проксированных
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Ограничение частоты запросов (до сжатия и проксирования)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
 
 # Настройка CORS middleware для разрешённых источников
 if not settings.DEBUG and settings.ALLOWED_ORIGINS:
@@ -51,7 +124,17 @@ if not settings.DEBUG and settings.ALLOWED_ORIGINS:
 else:
     logger.warning("CORS disabled")
 
+# Метрики Prometheus: время обработки всех запросов, включая ответы fast path и rate limit
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+# Трассировка: X-Request-ID, Server-Timing и выгрузка интервалов (внешний слой, учитывает все middleware)
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware, exporter=span_exporter)
+
 app.include_router(main_router)
+app.include_router(internal_router)
 
 # Подключаем обработчики исключений для FastAPI
 app.add_exception_handler(InvalidCredentials, invalid_credentials_handler)
@@ -59,3 +142,4 @@ app.add_exception_handler(UnauthorizedError, unauthorized_handler)
 app.add_exception_handler(ServiceNotFoundError, service_not_found_handler)
 app.add_exception_handler(SQLAlchemyError, sql_error_handler)
 app.add_exception_handler(ServiceUnavailableError, service_unavailable_handler)
+app.add_exception_handler(TooManyRequestsError, too_many_requests_handler)
@@ -0,0 +1,143 @@
+import os
+import hmac
+import time
+import asyncio
+import logging
+from asyncio import to_thread
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.exceptions import UnauthorizedError
+
+logger = logging.getLogger(__name__)
+
+# Воркеры Granian - отдельные процессы: при заданном PROMETHEUS_MULTIPROC_DIR каждый пишет метрики в общий каталог,
+# а /metrics любого воркера суммирует их
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", ["method", "route", "status"]
+)
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Количество выдач соединений из пула SQLAlchemy")
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Соединения, выданные из пула SQLAlchemy", multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Соединения пула SQLAlchemy сверх pool_size", multiprocess_mode="livesum"
+)
+EVENT_LOOP_LAG = Gauge("event_loop_lag_seconds", "Задержка event loop", multiprocess_mode="livemax")
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "executor_queue_depth", "Задачи, ожидающие свободного потока", ["executor"], multiprocess_mode="livesum"
+)
+
+
+class MetricsMiddleware:
+    """
+    Гистограмма времени обработки запросов по методу, шаблону маршрута и статусу ответа.
+    Обработчики в обход роутера FastAPI указывают шаблон маршрута в scope["route_path"].
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_DURATION.labels(scope["method"], route_label(scope), str(status)).observe(
+                time.perf_counter() - started
+            )
+
+
+def route_label(scope: Scope) -> str:
+    """Шаблон маршрута запроса (путь запроса не используется, чтобы не плодить метки)."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return scope.get("route_path", UNMATCHED_ROUTE)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Учитывает выдачу соединений из пула SQLAlchemy и соединения сверх pool_size."""
+    pool = engine.sync_engine.pool
+
+    def update(checked_out: int) -> None:
+        DB_POOL_CHECKED_OUT.set(checked_out)
+        DB_POOL_OVERFLOW.set(max(checked_out - pool.size(), 0))
+
+    def on_checkout(*args) -> None:
+        DB_POOL_CHECKOUTS.inc()
+        if hasattr(pool, "checkedout"):
+            update(pool.checkedout())
+
+    def on_checkin(*args) -> None:
+        if hasattr(pool, "checkedout"):
+            update(pool.checkedout() - 1)  # событие приходит до возврата соединения в пул
+
+    event.listen(engine.sync_engine, "checkout", on_checkout)
+    event.listen(engine.sync_engine, "checkin", on_checkin)
+
+
+async def monitor_event_loop(interval: float, executors: dict | None = None) -> None:
+    """Периодически измеряет задержку event loop и очереди пулов потоков (пул по умолчанию и executors)."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(loop.time() - started - interval, 0))
+        for name, executor in {"default": loop._default_executor, **(executors or {})}.items():
+            if executor is not None:
+                EXECUTOR_QUEUE_DEPTH.labels(name).set(executor._work_queue.qsize())
+
+
+def verify_metrics_token(authorization: str | None) -> None:
+    """Доступ к /metrics только с METRICS_TOKEN в заголовке Authorization: Bearer (без METRICS_TOKEN закрыт)."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if (not settings.METRICS_TOKEN or scheme.lower() != "bearer" or not token
+            or not hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode())):
+        raise UnauthorizedError("Invalid metrics token")
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Метрики в текстовом формате Prometheus."""
+    verify_metrics_token(request.headers.get("authorization"))
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(await to_thread(generate_latest, registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def shutdown_metrics() -> None:
+    """Удаляет значения gauge завершающегося воркера из общего каталога."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,189 @@
+import logging
+from asyncio import to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.exceptions import TooManyRequestsError, lookup_exception_handler
+from app.services.proxy import proxy_request
+from app.utils.auth import bearer_token, verify_access_token
+from app.utils.compression import COMPRESSORS, negotiate_encoding, is_compressible
+from app.utils.rate_limiter import client_key, request_quotas
+
+logger = logging.getLogger(__name__)
+
+PROXY_PREFIX = "/api/"
+
+PROXY_ROUTE_PATH = "/api/{service_name}/{path:path}"
+
+PROXY_METHODS = {"GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS", "HEAD"}
+
+
+class ProxyFastPathMiddleware:
+    """
+    ASGI-обработчик прокси-маршрута /api/{service_name}/{path} в обход роутера FastAPI.
+    Запросы к зарегистрированным микросервисам проксируются без внедрения зависимостей и валидации,
+    остальные (auth, документация, неизвестные сервисы) передаются приложению.
+    Исключения обрабатываются обработчиками, зарегистрированными в приложении.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (scope["type"] != "http" or scope["method"] not in PROXY_METHODS
+                or not scope["path"].startswith(PROXY_PREFIX)):
+            await self.app(scope, receive, send)
+            return
+        service_name, sep, path = scope["path"][len(PROXY_PREFIX):].partition("/")
+        app = scope["app"]
+        if not sep or service_name == "auth" or app.state.upstreams.get(service_name) is None:
+            await self.app(scope, receive, send)
+            return
+
+        logger.info("Proxy endpoint called", extra={"service_name": service_name, "path": path, "method": scope["method"]})
+        scope["route_path"] = PROXY_ROUTE_PATH  # шаблон маршрута для метрик
+        request = Request(scope, receive)
+        try:
+            payload = None
+            token = bearer_token(scope)
+            if token:
+                payload = await verify_access_token(token, app.state.token_cache)
+            response = await proxy_request(service_name, path, request, payload)
+        except Exception as exc:
+            handler = lookup_exception_handler(app.exception_handlers, exc)
+            if handler is None:
+                raise
+            response = await handler(request, exc)
+        logger.info("Proxy response", extra={"status": response.status_code})
+        await response(scope, receive, send)
+
+
+class RateLimitMiddleware:
+    """
+    Ограничивает частоту запросов клиента по квотам маршрута, сервиса и общей квоте /api.
+    Клиент определяется по пользователю из access-токена, а без валидного токена - по IP.
+    Превышение квоты возвращает 429 с заголовком Retry-After.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        quotas = request_quotas(scope["path"])
+        if not quotas:
+            await self.app(scope, receive, send)
+            return
+
+        app = scope["app"]
+        client = await client_key(scope, app)
+        retry_after = app.state.rate_limiter.acquire([((rule, client), quota) for rule, quota in quotas])
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+        logger.info("Rate limit exceeded", extra={"client": client[1], "path": scope["path"]})
+        request = Request(scope, receive)
+        response = await app.exception_handlers[TooManyRequestsError](request, TooManyRequestsError(retry_after))
+        await response(scope, receive, send)
+
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы кодированием, согласованным по Accept-Encoding клиента (br, zstd, gzip).
+    Не сжимаются небольшие ответы, ответы с неподходящим типом содержимого и уже сжатые микросервисом.
+    Потоковые ответы сжимаются по частям; большие части сжимаются в потоке, чтобы не блокировать цикл событий.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"), settings.COMPRESSION_ALGORITHMS)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await CompressionResponder(encoding, send).run(self.app, scope, receive)
+
+
+def _is_large_enough(content_length: str | None) -> bool:
+    """Длина ответа не меньше COMPRESSION_MIN_SIZE или неизвестна; ответ с некорректной длиной не сжимается."""
+    if content_length is None:
+        return True
+    try:
+        return int(content_length) >= settings.COMPRESSION_MIN_SIZE
+    except ValueError:
+        return False
+
+
+class CompressionResponder:
+    """Сжатие одного ответа: откладывает отправку заголовков до первой части тела."""
+
+    def __init__(self, encoding: str, send: Send):
+        self.encoding = encoding
+        self.send = send
+        self.start_message: Message | None = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def run(self, app: ASGIApp, scope: Scope, receive: Receive) -> None:
+        await app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if self.passthrough:
+            await self.send(message)
+            return
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if ("content-encoding" in headers
+                    or message["status"] in (204, 304)
+                    or not is_compressible(headers.get("content-type"), settings.COMPRESSION_CONTENT_TYPES)
+                    or not _is_large_enough(headers.get("content-length"))):
+                self.passthrough = True
+                await self.send(message)
+                return
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            if not more_body and len(body) < settings.COMPRESSION_MIN_SIZE:
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.compressor = COMPRESSORS[self.encoding]()
+            compressed = await self._compress(body, finish=not more_body)
+            await self.send(self._compressed_start(len(compressed) if not more_body else None))
+        else:
+            compressed = await self._compress(body, finish=not more_body)
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+    async def _compress(self, body: bytes, finish: bool) -> bytes:
+        if len(body) >= settings.COMPRESSION_THREAD_THRESHOLD:
+            return await to_thread(self.compressor.compress, body, finish)
+        return self.compressor.compress(body, finish)
+
+    def _compressed_start(self, content_length: int | None) -> Message:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):  # сжатое представление не совпадает побайтно с исходным
+            headers["ETag"] = f"W/{etag}"
+        return self.start_message
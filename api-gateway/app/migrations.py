@@ -0,0 +1,50 @@
+import logging
+from sqlalchemy import Connection, text
+
+logger = logging.getLogger(__name__)
+
+# Ключ pg_advisory_xact_lock: воркеры Granian выполняют миграции по очереди
+MIGRATIONS_LOCK_KEY = 0x6D696772
+
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    result = conn.execute(
+        text("SELECT 1 FROM information_schema.columns WHERE table_name = :table AND column_name = :column"),
+        {"table": table, "column": column},
+    )
+    return result.first() is not None
+
+
+def hash_refresh_tokens(conn: Connection) -> None:
+    """
+    refresh_tokens.token (hex-строка) заменяется на token_hash (SHA-256, 32 байта).
+    Хэши считаются из сохранённых токенов, поэтому выданные клиентам токены продолжают действовать.
+    """
+    if not _has_column(conn, "refresh_tokens", "token"):
+        return
+    logger.info("Migrating refresh tokens to SHA-256 digests")
+    conn.execute(text("ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS token_hash BYTEA"))
+    conn.execute(text("UPDATE refresh_tokens SET token_hash = sha256(convert_to(token, 'UTF8'))"))
+    conn.execute(text("ALTER TABLE refresh_tokens ALTER COLUMN token_hash SET NOT NULL"))
+    conn.execute(text(
+        "ALTER TABLE refresh_tokens ADD CONSTRAINT ck_refresh_tokens_token_hash_length CHECK (length(token_hash) = 32)"
+    ))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_refresh_tokens_token_hash ON refresh_tokens (token_hash)"
+    ))
+    conn.execute(text("ALTER TABLE refresh_tokens DROP COLUMN token"))  # вместе с уникальным индексом по token
+    logger.info("Refresh tokens migrated")
+
+
+def index_refresh_token_expiry(conn: Connection) -> None:
+    """Индекс по refresh_tokens.expires_at для удаления просроченных токенов."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_refresh_tokens_expires_at ON refresh_tokens (expires_at)"))
+
+
+def run_migrations(conn: Connection) -> None:
+    """Изменения существующих таблиц, которые не выполняет create_all (только PostgreSQL)."""
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+    hash_refresh_tokens(conn)
+    index_refresh_token_expiry(conn)
@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey
-from datetime import datetime
+from sqlalchemy import JSON, CheckConstraint, ForeignKey, LargeBinary
+from datetime import datetime, timezone
 from sqlalchemy.types import DateTime
 
 from app.database import Base
@@ -20,10 +20,28 @@ class User(Base):
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"  # Таблица refresh-токенов
+    __table_args__ = (CheckConstraint("length(token_hash) = 32", name="ck_refresh_tokens_token_hash_length"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
-    token: Mapped[str] = mapped_column(unique=True)
-    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # Время истечения токена
+    token_hash: Mapped[bytes] = mapped_column(LargeBinary(32), unique=True, index=True)  # SHA-256 токена
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)  # Время истечения токена
 
     user: Mapped["User"] = relationship(back_populates="refresh_tokens")
+
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox"  # Сообщения микросервисам, записанные в транзакции изменения (transactional outbox)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    topic: Mapped[str]  # тип сообщения, например profile.create
+    payload: Mapped[dict] = mapped_column(JSON)
+    idempotency_key: Mapped[str] = mapped_column(unique=True)  # повторная доставка не создаёт дубликатов
+    attempts: Mapped[int] = mapped_column(default=0)
+    next_attempt_at: Mapped[datetime | None] = mapped_column(
+        DateTime, index=True, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None)
+    )  # NULL - доставка прекращена
+    last_error: Mapped[str | None]
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None)
+    )
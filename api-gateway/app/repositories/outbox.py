@@ -0,0 +1,72 @@
+import logging
+from sqlalchemy import select, delete, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta, timezone
+
+from app.models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+def add_outbox_message(db: AsyncSession, topic: str, payload: dict, idempotency_key: str) -> None:
+    """Добавляет сообщение в текущую транзакцию: оно сохраняется вместе с изменением, которое его вызвало."""
+    logger.debug("Adding outbox message", extra={"topic": topic, "idempotency_key": idempotency_key})
+    db.add(OutboxMessage(topic=topic, payload=payload, idempotency_key=idempotency_key))
+
+
+async def claim_outbox_messages(db: AsyncSession, batch_size: int, lease: float) -> list[Row]:
+    """
+    Забирает до batch_size сообщений, время доставки которых наступило, и откладывает их на lease секунд.
+    Одновременно работающие воркеры получают разные сообщения (SKIP LOCKED в PostgreSQL), а сообщения
+    завершившегося во время доставки воркера снова доставляются по истечении lease.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    due = (
+        select(OutboxMessage.id)
+        .where(OutboxMessage.next_attempt_at <= now)
+        .order_by(OutboxMessage.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    try:
+        result = await db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(due.scalar_subquery()))
+            .values(attempts=OutboxMessage.attempts + 1, next_attempt_at=now + timedelta(seconds=lease))
+            .returning(
+                OutboxMessage.id,
+                OutboxMessage.topic,
+                OutboxMessage.payload,
+                OutboxMessage.idempotency_key,
+                OutboxMessage.attempts,
+            )
+        )
+        messages = result.all()
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return messages
+
+
+async def complete_outbox_messages(
+        db: AsyncSession, delivered: list[int], failed: dict[int, tuple[datetime | None, str]]
+) -> None:
+    """
+    Удаляет доставленные сообщения и переносит следующую попытку недоставленных одной транзакцией.
+    failed: id -> (время следующей попытки или None - доставка прекращена, ошибка).
+    """
+    try:
+        if delivered:
+            await db.execute(delete(OutboxMessage).where(OutboxMessage.id.in_(delivered)))
+        for message_id, (next_attempt_at, error) in failed.items():
+            await db.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id == message_id)
+                .values(next_attempt_at=next_attempt_at, last_error=error)
+            )
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
@@ -1,11 +1,11 @@
 import logging
-from sqlalchemy import select, delete
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, insert, literal
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 from datetime import datetime, timedelta, timezone
-from sqlalchemy.orm import joinedload
 
-from app.models import RefreshToken
+from app.models import RefreshToken, User
 from app.config import settings
+from app.utils.auth import hash_refresh_token
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +14,7 @@ async def store_refresh_token(db: AsyncSession, user_id: int, token: str) -> Non
     """Сохраняет refresh-токен с expiration."""
     logger.debug("Storing refresh token", extra={"user_id": user_id})
     expire = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=settings.REFRESH_TOKEN_EXPIRE)
-    db_token = RefreshToken(user_id=user_id, token=token, expires_at=expire)
+    db_token = RefreshToken(user_id=user_id, token_hash=hash_refresh_token(token), expires_at=expire)
     try:
         db.add(db_token)
         await db.commit()
@@ -24,25 +24,82 @@ async def store_refresh_token(db: AsyncSession, user_id: int, token: str) -> Non
     logger.debug("Refresh token stored successfully", extra={"user_id": user_id})
 
 
-async def get_refresh_token(db: AsyncSession, token: str, joined_load: bool = False) -> RefreshToken | None:
-    """Возвращает refresh-токен, если валиден и не expired."""
-    logger.debug("Fetching refresh token", extra={"token": token[:10] + "..."})
-    stmt = select(RefreshToken).filter(RefreshToken.token == token)
-    if joined_load:
-        stmt = stmt.options(joinedload(RefreshToken.user))
-    result = await db.execute(stmt)
-    db_token = result.scalar_one_or_none()
-    if db_token and db_token.expires_at >= datetime.now(timezone.utc).replace(tzinfo=None):
-        logger.debug("Valid refresh token found")
-        return db_token
-    return None
+async def replace_refresh_tokens(db: AsyncSession, user_id: int, token: str) -> int:
+    """Удаляет все refresh-токены пользователя и сохраняет новый одной транзакцией, возвращает id нового токена."""
+    logger.debug("Replacing refresh tokens", extra={"user_id": user_id})
+    expire = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=settings.REFRESH_TOKEN_EXPIRE)
+    try:
+        await db.execute(delete(RefreshToken).where(RefreshToken.user_id == user_id))
+        result = await db.execute(
+            insert(RefreshToken)
+            .values(user_id=user_id, token_hash=hash_refresh_token(token), expires_at=expire)
+            .returning(RefreshToken.id)
+        )
+        token_id = result.scalar_one()
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    logger.debug("Refresh tokens replaced", extra={"user_id": user_id})
+    return token_id
+
+
+def _claim_token_stmt(token: str, now: datetime):
+    """Удаление действующего токена с возвратом его пользователя."""
+    return (
+        delete(RefreshToken)
+        .where(RefreshToken.token_hash == hash_refresh_token(token), RefreshToken.expires_at >= now)
+        .returning(RefreshToken.user_id)
+    )
+
+
+def rotate_refresh_token_stmt(token: str, new_token: str, now: datetime, expire: datetime):
+    """Ротация одним запросом (PostgreSQL): DELETE ... RETURNING и INSERT в CTE, пользователь - по новому токену."""
+    old_token = _claim_token_stmt(token, now).cte("old_token")
+    new_token_row = (
+        insert(RefreshToken)
+        .from_select(
+            ["user_id", "token_hash", "expires_at"],
+            select(old_token.c.user_id, literal(hash_refresh_token(new_token)), literal(expire)),
+        )
+        .returning(RefreshToken.user_id)
+        .cte("new_token")
+    )
+    return select(User).join(new_token_row, User.id == new_token_row.c.user_id)
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str, new_token: str) -> User | None:
+    """
+    Заменяет refresh-токен новым в одной транзакции и возвращает его пользователя (None - токен не найден или истёк).
+    Старый токен удаляется с проверкой срока в SQL: при одновременных запросах его получит только один из них.
+    """
+    logger.debug("Rotating refresh token", extra={"token": token[:10] + "..."})
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    expire = now + timedelta(seconds=settings.REFRESH_TOKEN_EXPIRE)
+    try:
+        if db.bind.dialect.name == "postgresql":
+            result = await db.execute(rotate_refresh_token_stmt(token, new_token, now, expire))
+            user = result.scalar_one_or_none()
+        else:
+            # Без DML в CTE (SQLite): те же шаги в одной транзакции
+            user_id = (await db.execute(_claim_token_stmt(token, now))).scalar_one_or_none()
+            user = None
+            if user_id is not None:
+                db.add(RefreshToken(user_id=user_id, token_hash=hash_refresh_token(new_token), expires_at=expire))
+                user = await db.get(User, user_id)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    logger.debug("Refresh token rotated", extra={"rotated": user is not None})
+    return user
 
 
 async def delete_refresh_token(db: AsyncSession, token: str) -> None:
     """Удаляет конкретный refresh-токен."""
     logger.debug("Deleting refresh token", extra={"token": token[:10] + "..."})
     try:
-        await db.execute(delete(RefreshToken).filter(RefreshToken.token == token))
+        await db.execute(delete(RefreshToken).filter(RefreshToken.token_hash == hash_refresh_token(token)))
         await db.commit()
     except Exception:
         await db.rollback()
@@ -50,13 +107,14 @@ async def delete_refresh_token(db: AsyncSession, token: str) -> None:
     logger.debug("Refresh token deleted")
 
 
-async def delete_all_refresh_tokens_for_user(db: AsyncSession, user_id: int) -> None:
-    """Удаляет все refresh-токены для пользователя."""
-    logger.debug("Deleting all refresh tokens for user", extra={"user_id": user_id})
+async def delete_expired_refresh_tokens(conn: AsyncConnection, batch_size: int) -> int:
+    """Удаляет до batch_size просроченных refresh-токенов одной транзакцией, возвращает их количество."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    expired = select(RefreshToken.id).where(RefreshToken.expires_at < now).limit(batch_size)
     try:
-        await db.execute(delete(RefreshToken).filter(RefreshToken.user_id == user_id))
-        await db.commit()
+        result = await conn.execute(delete(RefreshToken).where(RefreshToken.id.in_(expired.scalar_subquery())))
+        await conn.commit()
     except Exception:
-        await db.rollback()
+        await conn.rollback()
         raise
-    logger.debug("All refresh tokens deleted for user", extra={"user_id": user_id})
+    return result.rowcount
@@ -1,26 +1,24 @@
 import logging
-from asyncio import to_thread
-from sqlalchemy import select, delete
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import User
-from app.utils.auth import get_password_hash, verify_password
+from app.utils.hashing import password_hasher
 
 logger = logging.getLogger(__name__)
 
 
 async def create_user(db: AsyncSession, username: str, password: str) -> User:
-    """Создает нового пользователя с хэшированным паролем."""
+    """Создает нового пользователя с хэшированным паролем в текущей транзакции (commit выполняет вызывающий код)."""
     logger.debug("Creating user", extra={"username": username})
-    hashed_password = await to_thread(get_password_hash, password)
+    hashed_password = await password_hasher.hash(password)
     db_user = User(username=username, hashed_password=hashed_password, role="user")
     try:
         db.add(db_user)
-        await db.commit()
+        await db.flush()  # id пользователя нужен до commit
     except Exception:
         await db.rollback()
         raise
-    await db.refresh(db_user)
     logger.debug("User created", extra={"user_id": db_user.id, "username": username})
     return db_user
 
@@ -53,19 +51,23 @@ async def authenticate_user(db: AsyncSession, username: str, password: str) -> U
     """Аутентифицирует пользователя по username и password."""
     logger.debug("Authenticating user", extra={"username": username})
     user = await get_user_by_username(db, username)
-    if not user or not await to_thread(verify_password, password, user.hashed_password):
+    if not user or not await password_hasher.verify(password, user.hashed_password):
         return None
     logger.debug("User authenticated successfully", extra={"user_id": user.id})
     return user
 
 
-async def _delete_user_by_id(db: AsyncSession, user_id: int) -> None:
-    """Удаляет пользователя по ID. Используется для отката при ошибках регистрации."""
-    logger.warning("Compensating transaction: deleting user", extra={"user_id": user_id})
+async def update_password_hash(db: AsyncSession, user_id: int, old_hash: str, new_hash: str) -> bool:
+    """Заменяет хэш пароля, если он не изменился с момента проверки."""
     try:
-        await db.execute(delete(User).where(User.id == user_id))
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id, User.hashed_password == old_hash)
+            .values(hashed_password=new_hash)
+        )
         await db.commit()
-        logger.info("User deleted successfully during compensation", extra={"user_id": user_id})
     except Exception as e:
         await db.rollback()
-        logger.error("Failed to delete user during compensation", extra={"user_id": user_id, "error": str(e)})
+        logger.error("Password hash update failed", extra={"user_id": user_id, "error": str(e)})
+        raise
+    return result.rowcount > 0
@@ -2,13 +2,22 @@ import logging
 from fastapi import APIRouter
 
 from app.routers.auth import router as auth_router
+from app.routers.batch import router as batch_router
+from app.routers.pages import router as pages_router
 from app.routers.proxy import router as proxy_router
+from app.routers.stats import router as stats_router
 
 logger = logging.getLogger(__name__)
 
 main_router = APIRouter(prefix="/api")  # главный роутер
 
 main_router.include_router(auth_router, prefix="/auth", tags=["auth"])  # роутер аутентефикации
+main_router.include_router(batch_router, tags=["batch"])  # роутер пакетных запросов
+main_router.include_router(pages_router, prefix="/pages", tags=["pages"])  # роутер составных страниц
 main_router.include_router(proxy_router, tags=["proxy"])  # роутер прокси
 
+internal_router = APIRouter()  # служебный роутер (вне /api, не предназначен для внешних клиентов)
+
+internal_router.include_router(stats_router, prefix="/stats", tags=["stats"])  # роутер статистики
+
 logger.debug("Main router initialized with auth and proxy routers")
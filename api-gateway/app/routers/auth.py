@@ -1,5 +1,5 @@
 import logging
-from fastapi import APIRouter, Depends, Response, Cookie, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, Response, Cookie, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_session
@@ -18,9 +18,13 @@ async def register(user: UserSchema, response: Response, request: Request, db: A
 
 
 @router.post("/login", response_model=TokenSchema)
-async def login(user: UserSchema, response: Response, db: AsyncSession = Depends(get_session)):
+async def login(
+        user: UserSchema,
+        response: Response,
+        background_tasks: BackgroundTasks,
+        db: AsyncSession = Depends(get_session)):
     logger.info("Login endpoint called", extra={"username": user.username})
-    return await login_user(db, user, response)
+    return await login_user(db, user, response, background_tasks)
 
 
 @router.post("/refresh", response_model=TokenSchema)
@@ -0,0 +1,27 @@
+import logging
+from fastapi import APIRouter, Depends, Request
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+
+from app.schemas import BatchRequestSchema, BatchResponseSchema
+from app.services.batch import execute_batch
+from app.utils.auth import verify_access_token
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+security = HTTPBearer(auto_error=False)
+
+
+@router.post("/batch", response_model=BatchResponseSchema)
+async def batch(
+        batch_request: BatchRequestSchema,
+        request: Request,
+        credentials: HTTPAuthorizationCredentials | None = Depends(security)
+):
+    """Выполняет несколько проксируемых запросов за один вызов."""
+    logger.info("Batch endpoint called", extra={"requests": len(batch_request.requests)})
+    payload = None
+    if credentials:
+        payload = await verify_access_token(credentials.credentials, request.app.state.token_cache)
+    return await execute_batch(batch_request, request, payload)
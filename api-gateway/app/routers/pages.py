@@ -0,0 +1,16 @@
+import logging
+from fastapi import APIRouter, Request
+
+from app.schemas import ProductPageSchema
+from app.services.pages import get_product_page
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/products/{product_id}", response_model=ProductPageSchema)
+async def product_page(product_id: int, request: Request):
+    """Страница товара с именами владельца и авторов отзывов за один вызов."""
+    logger.info("Product page endpoint called", extra={"product_id": product_id})
+    return await get_product_page(product_id, request)
@@ -1,9 +1,8 @@
 import logging
-from fastapi import APIRouter, Depends, Request, Response
+from fastapi import APIRouter, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from asyncio import to_thread
 
-from app.utils.auth import decode_access_token
+from app.utils.auth import verify_access_token
 from app.services.proxy import proxy_request
 
 logger = logging.getLogger(__name__)
@@ -29,7 +28,7 @@ async def proxy(
     token = credentials.credentials if credentials else None
     payload = None
     if token:
-        payload = await to_thread(decode_access_token, token)
-    status, content, headers = await proxy_request(service_name, path, request, payload)
-    logger.info("Proxy response", extra={"status": status})
-    return Response(content=content, status_code=status, headers=headers)
+        payload = await verify_access_token(token, request.app.state.token_cache)
+    response = await proxy_request(service_name, path, request, payload)
+    logger.info("Proxy response", extra={"status": response.status_code})
+    return response
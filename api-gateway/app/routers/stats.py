@@ -0,0 +1,76 @@
+import hmac
+import logging
+from fastapi import APIRouter, Depends, Request
+from fastapi.security import APIKeyHeader
+
+from app.config import settings
+from app.exceptions import UnauthorizedError
+
+logger = logging.getLogger(__name__)
+
+stats_token_header = APIKeyHeader(name="X-Stats-Token", auto_error=False)
+
+
+async def verify_stats_token(token: str | None = Depends(stats_token_header)) -> None:
+    """Доступ к /stats только с STATS_TOKEN в заголовке X-Stats-Token (без STATS_TOKEN эндпоинты закрыты)."""
+    if not settings.STATS_TOKEN or not token or not hmac.compare_digest(token.encode(), settings.STATS_TOKEN.encode()):
+        raise UnauthorizedError("Invalid stats token")
+
+
+router = APIRouter(dependencies=[Depends(verify_stats_token)])
+
+
+@router.get("/upstreams")
+async def upstreams_stats(request: Request):
+    """Состояние пулов соединений с микросервисами."""
+    logger.debug("Upstreams stats endpoint called")
+    return request.app.state.upstreams.pool_stats()
+
+
+@router.get("/breakers")
+async def breakers_stats(request: Request):
+    """Состояние circuit breaker каждого микросервиса."""
+    logger.debug("Breakers stats endpoint called")
+    return request.app.state.upstreams.breaker_stats()
+
+
+@router.get("/concurrency")
+async def concurrency_stats(request: Request):
+    """Адаптивный лимит, выполняемые, ожидающие в очереди и отклонённые запросы по сервисам."""
+    logger.debug("Concurrency stats endpoint called")
+    return request.app.state.upstreams.concurrency_stats()
+
+
+@router.get("/retries")
+async def retries_stats(request: Request):
+    """Счётчики повторов и hedge-запросов по сервисам и состояние бюджета повторов."""
+    logger.debug("Retries stats endpoint called")
+    return request.app.state.upstreams.retry_stats()
+
+
+@router.get("/cache")
+async def cache_stats(request: Request):
+    """Счётчики кэша ответов: попадания, промахи, ревалидации и вытеснения."""
+    logger.debug("Cache stats endpoint called")
+    return request.app.state.response_cache.stats()
+
+
+@router.get("/coalescing")
+async def coalescing_stats(request: Request):
+    """Счётчики объединения одновременных одинаковых запросов."""
+    logger.debug("Coalescing stats endpoint called")
+    return request.app.state.single_flight.stats()
+
+
+@router.get("/tokens")
+async def tokens_stats(request: Request):
+    """Счётчики кэша проверенных access-токенов."""
+    logger.debug("Tokens stats endpoint called")
+    return request.app.state.token_cache.stats()
+
+
+@router.get("/rate_limits")
+async def rate_limits_stats(request: Request):
+    """Количество отклонённых по квотам запросов и активных корзин."""
+    logger.debug("Rate limits stats endpoint called")
+    return request.app.state.rate_limiter.stats()
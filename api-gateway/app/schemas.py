@@ -1,4 +1,7 @@
-from pydantic import BaseModel
+from typing import Any, Dict, List, Literal
+from pydantic import BaseModel, Field, field_validator
+
+from app.config import settings
 
 
 class UserSchema(BaseModel):
@@ -11,3 +14,69 @@ class TokenSchema(BaseModel):
     """Схема для access-токена."""
     access_token: str
     token_type: str = "bearer"  # Тип токена (по умолчанию 'bearer')
+
+
+class BatchSubRequestSchema(BaseModel):
+    """Подзапрос пакета: путь указывается относительно /api (пример: 'goods/products/1?limit=10')."""
+    id: str | None = None  # идентификатор подзапроса, возвращается в ответе
+    method: Literal["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str
+    headers: Dict[str, str] = {}
+    body: Any = None  # тело запроса в формате JSON
+
+    @field_validator("headers")
+    @classmethod
+    def validate_headers(cls, v):
+        """Имена и значения HTTP-заголовков должны кодироваться в latin-1."""
+        for name, value in v.items():
+            try:
+                name.encode("latin-1"), value.encode("latin-1")
+            except UnicodeEncodeError:
+                raise ValueError(f"Header {name!r} is not latin-1 encodable")
+        return v
+
+
+class BatchRequestSchema(BaseModel):
+    """Схема пакетного запроса."""
+    requests: List[BatchSubRequestSchema] = Field(min_length=1, max_length=settings.BATCH_MAX_REQUESTS)
+
+
+class BatchSubResponseSchema(BaseModel):
+    """Ответ на подзапрос пакета."""
+    id: str | None = None
+    status: int
+    headers: Dict[str, str]
+    body: Any = None  # JSON-ответ разбирается, остальные передаются строкой
+
+
+class BatchResponseSchema(BaseModel):
+    """Схема ответа на пакетный запрос (в порядке подзапросов)."""
+    responses: List[BatchSubResponseSchema]
+
+
+class PageUserSchema(BaseModel):
+    """Пользователь на странице товара (display_name пуст, если профиль не получен)."""
+    user_id: int
+    display_name: str | None = None
+
+
+class PageReviewSchema(BaseModel):
+    """Отзыв на странице товара."""
+    id: int
+    rating: int
+    text: str | None = None
+    user: PageUserSchema
+
+
+class ProductPageSchema(BaseModel):
+    """Страница товара: товар из goods с именами владельца и авторов отзывов из profiles."""
+    id: int
+    name: str
+    description: str | None = None
+    price: float
+    image_url: str | None = None
+    rating: float
+    reviews_count: int
+    owner: PageUserSchema
+    reviews: List[PageReviewSchema] = []
+    degraded: bool = False  # часть имён пользователей не получена (profiles недоступен)
@@ -1,94 +1,98 @@
 import logging
-import aiohttp
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import Response, Request
-
-from app.repositories.user import create_user, get_user_by_username, authenticate_user, _delete_user_by_id
+from fastapi import BackgroundTasks, Response, Request
+
+from app.database import async_session_maker
+from app.repositories.user import (
+    create_user,
+    get_user_by_username,
+    authenticate_user,
+    update_password_hash,
+)
 from app.repositories.refresh_token import (
-    get_refresh_token,
+    store_refresh_token,
+    replace_refresh_tokens,
+    rotate_refresh_token,
     delete_refresh_token,
-    delete_all_refresh_tokens_for_user
 )
-from app.repositories.refresh_token import store_refresh_token
-from app.utils.auth import create_access_token, create_refresh_token, set_refresh_cookie
+from app.repositories.outbox import add_outbox_message
+from app.services.outbox import PROFILE_CREATE
+from app.utils.auth import create_access_token, create_refresh_token, password_needs_update, set_refresh_cookie
+from app.utils.hashing import password_hasher
 from app.schemas import UserSchema, TokenSchema
-from app.exceptions import InvalidCredentials, ServiceUnavailableError, UnauthorizedError
-from app.config import settings
+from app.exceptions import InvalidCredentials, UnauthorizedError
 
 logger = logging.getLogger(__name__)
 
 
 async def register_user(db: AsyncSession, user: UserSchema, response: Response, request: Request) -> TokenSchema:
+    """
+    Бизнес-логика регистрации: пользователь, сообщение outbox о создании профиля и refresh-токен одной транзакцией.
+    Профиль в profiles создаёт OutboxDispatcher после ответа, повторяя запрос до успеха.
+    """
     existing_user = await get_user_by_username(db, user.username)
     if existing_user:
         raise InvalidCredentials("Username already exists")
     db_user = await create_user(db, user.username, user.password)
-    try:
-        profile_url = f"{settings.MICRO_SERVICES['profiles']}/profile/"
-        profile_data = {
-            "username": db_user.username,
-            "display_name": db_user.username,
-        }
-
-        headers = {"X-Auth-User-ID": str(db_user.id)}
-        session = request.app.state.aiohttp_session
-
-        logger.info(f"Registering user in profiles service", extra={"user": db_user.id})
-        async with session.post(profile_url, json=profile_data, headers=headers) as resp:
-            if resp.status != 201 and resp.status != 200:
-                raise ServiceUnavailableError("Profiles service failed")
-            else:
-                logger.debug(f"Profiles service returned {resp.status}", extra={"user": db_user.id})
-
-    except Exception as e:
-        logger.warning(f"Rolling back registration: deleting user due to profile creation failure", extra={"user": db_user.id})
-        await _delete_user_by_id(db, db_user.id)
-
-        if isinstance(e, ServiceUnavailableError):
-            raise e
-        raise ServiceUnavailableError(f"External service error: {str(e)}")
+    add_outbox_message(
+        db,
+        PROFILE_CREATE,
+        {"user_id": db_user.id, "body": {"username": db_user.username, "display_name": db_user.username}},
+        f"{PROFILE_CREATE}:{db_user.id}",
+    )
 
     access_token = create_access_token(db_user)
     refresh_token = create_refresh_token()
-    await store_refresh_token(db, db_user.id, refresh_token)
+    await store_refresh_token(db, db_user.id, refresh_token)  # commit всей регистрации
+    request.app.state.outbox.notify()
     set_refresh_cookie(response, refresh_token)
 
     logger.info(f"User registered successfully", extra={"user_id": db_user.id})
     return TokenSchema(access_token=access_token)
 
 
-async def login_user(db: AsyncSession, user: UserSchema, response: Response) -> TokenSchema:
+async def login_user(
+        db: AsyncSession, user: UserSchema, response: Response, background_tasks: BackgroundTasks
+) -> TokenSchema:
     """Бизнес-логика логина: аутентификация, удаление старых токенов, новые токены."""
     logger.info("Logging in user", extra={"username": user.username})
     db_user = await authenticate_user(db, user.username, user.password)
     if not db_user:
         raise InvalidCredentials("Invalid username or password")
-    await delete_all_refresh_tokens_for_user(db, db_user.id)
+    if password_needs_update(db_user.hashed_password):
+        # Хэш пересчитывается после отправки ответа и не влияет на время входа
+        background_tasks.add_task(rehash_password, db_user.id, user.password, db_user.hashed_password)
     access_token = create_access_token(db_user)
     refresh_token = create_refresh_token()
-    await store_refresh_token(db, db_user.id, refresh_token)
+    await replace_refresh_tokens(db, db_user.id, refresh_token)  # прежние сессии завершаются
     set_refresh_cookie(response, refresh_token)
     logger.info("User logged in successfully", extra={"user_id": db_user.id})
     return TokenSchema(access_token=access_token)
 
 
+async def rehash_password(user_id: int, password: str, old_hash: str) -> None:
+    """Пересчитывает хэш пароля с текущими алгоритмом и стоимостью."""
+    try:
+        new_hash = await password_hasher.hash(password)
+        async with async_session_maker() as db:
+            updated = await update_password_hash(db, user_id, old_hash, new_hash)
+        logger.info("Password hash updated", extra={"user_id": user_id, "updated": updated})
+    except Exception as e:
+        logger.warning("Failed to update password hash", extra={"user_id": user_id, "error": str(e)})
+
+
 async def refresh_access_token(db: AsyncSession, refresh_token: str | None, response: Response) -> TokenSchema:
     """Бизнес-логика рефреша: валидация, ротация токена, новый access."""
     logger.info("Refreshing access token")
     if not refresh_token:
         raise UnauthorizedError("Refresh token missing")
-    db_token = await get_refresh_token(db, refresh_token, joined_load=True)
-    if not db_token:
-        raise UnauthorizedError("Invalid or expired refresh token")
-    user = db_token.user
+    new_refresh_token = create_refresh_token()
+    user = await rotate_refresh_token(db, refresh_token, new_refresh_token)
     if not user:
-        raise UnauthorizedError("User not found")
+        raise UnauthorizedError("Invalid or expired refresh token")
     access_token = create_access_token(user)
-    new_refresh_token = create_refresh_token()
-    await store_refresh_token(db, db_token.user_id, new_refresh_token)
-    await delete_refresh_token(db, refresh_token)  # Ротация
     set_refresh_cookie(response, new_refresh_token)
-    logger.info("Access token refreshed", extra={"user_id": db_token.user_id})
+    logger.info("Access token refreshed", extra={"user_id": user.id})
     return TokenSchema(access_token=access_token)
 
 
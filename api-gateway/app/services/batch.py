@@ -0,0 +1,106 @@
+import json
+import asyncio
+import logging
+from fastapi import Request, Response
+
+from app.config import settings
+from app.exceptions import TooManyRequestsError, lookup_exception_handler
+from app.schemas import BatchRequestSchema, BatchSubRequestSchema, BatchSubResponseSchema, BatchResponseSchema
+from app.services.proxy import proxy_request
+from app.utils.rate_limiter import client_key, request_quotas
+
+logger = logging.getLogger(__name__)
+
+# Заголовки подзапроса, которые gateway не передаёт: тело ответа должно быть несжатым,
+# длина тела вычисляется заново, а авторизация берётся из пакетного запроса
+SUB_REQUEST_HEADERS_BLACKLIST = {"accept-encoding", "content-length", "authorization"}
+
+SUB_RESPONSE_HEADERS_BLACKLIST = {"content-length"}
+
+# Параметры соединения, которые подзапрос наследует от пакетного запроса
+INHERITED_SCOPE_KEYS = {"type", "asgi", "http_version", "scheme", "server", "client", "root_path", "app"}
+
+
+async def execute_batch(batch: BatchRequestSchema, request: Request, payload: dict | None) -> BatchResponseSchema:
+    """
+    Выполняет подзапросы пакета одновременно (не больше BATCH_CONCURRENCY) через прокси.
+    Токен проверяется один раз для всего пакета; ошибка подзапроса возвращается в его ответе.
+    """
+    logger.info("Executing batch", extra={"requests": len(batch.requests)})
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+    client = await client_key(request.scope, request.app)
+
+    async def run(sub_request: BatchSubRequestSchema) -> BatchSubResponseSchema:
+        async with semaphore:
+            return await _execute(sub_request, request, payload, client)
+
+    responses = await asyncio.gather(*(run(sub_request) for sub_request in batch.requests))
+    return BatchResponseSchema(responses=responses)
+
+
+async def _execute(
+        sub_request: BatchSubRequestSchema, request: Request, payload: dict | None, client: tuple[str, str]
+) -> BatchSubResponseSchema:
+    path, _, query = sub_request.path.lstrip("/").partition("?")
+    service_name, _, service_path = path.partition("/")
+    body = json.dumps(sub_request.body).encode() if sub_request.body is not None else b""
+    proxied = build_sub_request(request, sub_request.method, f"/api/{path}", query, sub_request.headers, body)
+
+    try:
+        quotas = request_quotas(f"/api/{path}")
+        if quotas:
+            retry_after = request.app.state.rate_limiter.acquire([((rule, client), quota) for rule, quota in quotas])
+            if retry_after:
+                raise TooManyRequestsError(retry_after)
+        response = await proxy_request(service_name, service_path, proxied, payload, buffered=True)
+    except Exception as exc:
+        handler = lookup_exception_handler(request.app.exception_handlers, exc)
+        if handler is None:
+            raise
+        response = await handler(proxied, exc)
+
+    return BatchSubResponseSchema(
+        id=sub_request.id,
+        status=response.status_code,
+        headers={k: v for k, v in response.headers.items() if k not in SUB_RESPONSE_HEADERS_BLACKLIST},
+        body=_decode_body(response),
+    )
+
+
+def build_sub_request(request: Request, method: str, path: str, query: str, headers: dict, body: bytes) -> Request:
+    """Создаёт запрос к прокси для подзапроса пакета в контексте исходного запроса."""
+    raw_headers = [
+        (k.lower().encode("latin-1"), v.encode("latin-1"))
+        for k, v in headers.items()
+        if k.lower() not in SUB_REQUEST_HEADERS_BLACKLIST
+    ]
+    if body:
+        if not any(k == b"content-type" for k, _ in raw_headers):
+            raw_headers.append((b"content-type", b"application/json"))
+        raw_headers.append((b"content-length", str(len(body)).encode()))
+    scope = {
+        **{k: v for k, v in request.scope.items() if k in INHERITED_SCOPE_KEYS},
+        "method": method,
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": raw_headers,
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request(scope, receive)
+
+
+def _decode_body(response: Response):
+    if not response.body:
+        return None
+    content_type = response.headers.get("content-type", "")
+    text = response.body.decode(response.charset or "utf-8", errors="replace")
+    if "json" in content_type:
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    return text
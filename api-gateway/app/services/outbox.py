@@ -0,0 +1,124 @@
+import json
+import asyncio
+import logging
+from contextlib import suppress
+from prometheus_client import Counter
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from datetime import datetime, timedelta, timezone
+
+from app.repositories.outbox import claim_outbox_messages, complete_outbox_messages
+from app.services.proxy import fetch_upstream
+from app.utils.upstream import UpstreamRegistry
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CREATE = "profile.create"
+
+# Куда доставляются сообщения: topic -> (сервис, метод, путь)
+TOPICS = {
+    PROFILE_CREATE: ("profiles", "POST", "profile/"),
+}
+
+# Ответы 4xx, после которых доставку имеет смысл повторить
+RETRYABLE_CLIENT_ERRORS = {408, 429}
+
+OUTBOX_MESSAGES = Counter(
+    "outbox_messages_total", "Попытки доставки сообщений outbox по результату", ["topic", "result"]
+)
+
+
+class OutboxDispatcher:
+    """
+    Доставляет сообщения outbox микросервисам пакетами по batch_size с повторами и ключом идемпотентности.
+    Новые сообщения доставляются сразу после notify(), остальные (в том числе других воркеров) - раз в interval.
+    Недоставленное сообщение повторяется с экспоненциальной задержкой от retry_delay до max_retry_delay,
+    после max_attempts попыток или ответа 4xx (кроме 408 и 429) доставка прекращается (next_attempt_at = NULL).
+    """
+
+    def __init__(
+            self,
+            session_maker: async_sessionmaker[AsyncSession],
+            upstreams: UpstreamRegistry,
+            batch_size: int,
+            interval: float,
+            max_attempts: int,
+            retry_delay: float,
+            max_retry_delay: float,
+            lease: float,
+    ):
+        self.session_maker = session_maker
+        self.upstreams = upstreams
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.lease = lease
+        self.wakeup = asyncio.Event()
+
+    def notify(self) -> None:
+        """Сообщает о новом сообщении, не дожидаясь interval."""
+        self.wakeup.set()
+
+    async def run(self) -> None:
+        """Доставляет сообщения, пока не будет отменена (задача lifespan)."""
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self.wakeup.wait(), self.interval)
+            self.wakeup.clear()
+            try:
+                while await self.dispatch() == self.batch_size:
+                    pass
+            except Exception as e:
+                logger.warning("Failed to dispatch outbox messages", extra={"error": str(e)})
+
+    async def dispatch(self) -> int:
+        """Доставляет один пакет сообщений, возвращает количество взятых сообщений."""
+        async with self.session_maker() as db:
+            messages = await claim_outbox_messages(db, self.batch_size, self.lease)
+            if not messages:
+                return 0
+            errors = await asyncio.gather(*(self._deliver(message) for message in messages))
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            delivered, failed = [], {}
+            for message, (error, retryable) in zip(messages, errors):
+                if error is None:
+                    delivered.append(message.id)
+                    OUTBOX_MESSAGES.labels(message.topic, "delivered").inc()
+                elif retryable and message.attempts < self.max_attempts:
+                    failed[message.id] = (now + timedelta(seconds=self._retry_delay(message.attempts)), error)
+                    OUTBOX_MESSAGES.labels(message.topic, "retried").inc()
+                else:
+                    failed[message.id] = (None, error)
+                    OUTBOX_MESSAGES.labels(message.topic, "dead").inc()
+                    logger.error("Outbox message delivery abandoned", extra={
+                        "idempotency_key": message.idempotency_key, "attempts": message.attempts, "error": error,
+                    })
+            await complete_outbox_messages(db, delivered, failed)
+        logger.debug("Outbox messages dispatched", extra={"delivered": len(delivered), "failed": len(failed)})
+        return len(messages)
+
+    def _retry_delay(self, attempts: int) -> float:
+        return min(self.retry_delay * 2 ** (attempts - 1), self.max_retry_delay)
+
+    async def _deliver(self, message: Row) -> tuple[str | None, bool]:
+        """Отправляет сообщение, возвращает ошибку (None - доставлено) и возможность повтора."""
+        service_name, method, path = TOPICS[message.topic]
+        upstream = self.upstreams.get(service_name)
+        if upstream is None:
+            return f"Service {service_name} is not configured", True
+        headers = {
+            "X-Auth-User-ID": str(message.payload["user_id"]),
+            "Idempotency-Key": message.idempotency_key,
+            "Content-Type": "application/json",
+        }
+        try:
+            status, _, _ = await fetch_upstream(
+                upstream, method, path, headers, data=json.dumps(message.payload["body"]).encode()
+            )
+        except Exception as e:
+            return str(e) or type(e).__name__, True
+        if status < 300:
+            return None, False
+        return f"Service {service_name} returned {status}", status >= 500 or status in RETRYABLE_CLIENT_ERRORS
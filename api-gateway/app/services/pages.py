@@ -0,0 +1,85 @@
+import json
+import asyncio
+import logging
+from urllib.parse import urlencode
+from fastapi import Request, Response
+
+from app.config import settings
+from app.exceptions import ServiceNotFoundError, ServiceUnavailableError
+from app.schemas import PageUserSchema, PageReviewSchema, ProductPageSchema
+from app.services.batch import build_sub_request
+from app.services.proxy import proxy_request
+
+logger = logging.getLogger(__name__)
+
+GOODS_SERVICE = "goods"
+PROFILES_SERVICE = "profiles"
+
+# Ошибки разбора ответа микросервиса: некорректный JSON или неожиданная структура
+RESPONSE_ERRORS = (ValueError, KeyError, TypeError)
+
+
+async def get_product_page(product_id: int, request: Request) -> ProductPageSchema | Response:
+    """
+    Собирает страницу товара: товар из goods, затем имена владельца и авторов отзывов из profiles
+    одновременными пакетными запросами. Если profiles недоступен, страница отдаётся без имён.
+    """
+    logger.info("Composing product page", extra={"product_id": product_id})
+    response = await _get(request, GOODS_SERVICE, str(product_id))
+    if response.status_code != 200:
+        return response  # ошибка goods (например, 404) передаётся клиенту как есть
+    try:
+        product = json.loads(response.body)
+        user_ids = list(dict.fromkeys([product["user_id"], *(review["user_id"] for review in product["reviews"])]))
+    except RESPONSE_ERRORS as e:
+        raise _invalid_goods_response(product_id, e)
+
+    size = settings.PAGES_PROFILES_BATCH_SIZE
+    chunks = await asyncio.gather(
+        *(_get_display_names(request, user_ids[i:i + size]) for i in range(0, len(user_ids), size))
+    )
+    names = {}
+    for chunk in chunks:
+        names.update(chunk or {})
+
+    def user(user_id: int) -> PageUserSchema:
+        return PageUserSchema(user_id=user_id, display_name=names.get(user_id))
+
+    try:
+        return ProductPageSchema(
+            **{k: v for k, v in product.items() if k not in {"user_id", "reviews"}},
+            owner=user(product["user_id"]),
+            reviews=[
+                PageReviewSchema(
+                    id=review["id"], rating=review["rating"], text=review.get("text"), user=user(review["user_id"])
+                )
+                for review in product["reviews"]
+            ],
+            degraded=any(chunk is None for chunk in chunks),
+        )
+    except RESPONSE_ERRORS as e:
+        raise _invalid_goods_response(product_id, e)
+
+
+def _invalid_goods_response(product_id: int, error: Exception) -> ServiceUnavailableError:
+    logger.error("Invalid goods response", extra={"product_id": product_id, "error": str(error)})
+    return ServiceUnavailableError("Goods service returned an invalid response")
+
+
+async def _get_display_names(request: Request, user_ids: list[int]) -> dict[int, str] | None:
+    """Имена пользователей одним запросом к profiles; None, если profiles не ответил."""
+    try:
+        async with asyncio.timeout(settings.PAGES_PROFILES_TIMEOUT):
+            query = urlencode([("user_id", user_id) for user_id in user_ids])
+            response = await _get(request, PROFILES_SERVICE, "profile/brief", query)
+        if response.status_code != 200:
+            raise ServiceUnavailableError(f"Profiles service returned {response.status_code}")
+        return {user["user_id"]: user["display_name"] for user in json.loads(response.body)}
+    except (ServiceNotFoundError, ServiceUnavailableError, TimeoutError, *RESPONSE_ERRORS) as e:
+        logger.warning("Product page rendered without display names", extra={"error": str(e)})
+        return None
+
+
+async def _get(request: Request, service_name: str, path: str, query: str = "") -> Response:
+    sub_request = build_sub_request(request, "GET", f"/api/{service_name}/{path}", query, {}, b"")
+    return await proxy_request(service_name, path, sub_request, None, buffered=True)
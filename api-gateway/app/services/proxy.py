@@ -1,8 +1,24 @@
+import time
+import asyncio
 import aiohttp
-from fastapi import Request
+from contextlib import AsyncExitStack
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from prometheus_client import Histogram
 
 from app.exceptions import ServiceNotFoundError, ServiceUnavailableError
 from app.config import settings
+from app.tracing import current_request_id, merge_server_timing, record_span
+from app.utils.upstream import Upstream
+from app.utils.balancer import UpstreamInstance
+from app.utils.cache import (
+    ResponseCache,
+    CacheEntry,
+    CACHEABLE_STATUSES,
+    make_request_key,
+    parse_cache_control,
+    freshness_lifetime,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,19 +37,81 @@ RESPONSE_HEADERS_BLACKLIST = {
     "set-cookie",
     "connection",
     "transfer-encoding",
+    "server-timing",  # интервалы микросервиса объединяются с интервалами gateway
 }
 
+CACHEABLE_METHODS = {"GET", "HEAD"}
+
+UPSTREAM_ERRORS = (
+    aiohttp.ClientConnectorError,
+    aiohttp.ClientOSError,
+    aiohttp.client_exceptions.ServerDisconnectedError,
+    asyncio.TimeoutError,
+)
+
+# Ошибки, после которых идемпотентный запрос можно повторить на другом экземпляре
+CONNECTION_ERRORS = (
+    aiohttp.ClientConnectorError,
+    aiohttp.ConnectionTimeoutError,
+    aiohttp.client_exceptions.ServerDisconnectedError,
+)
+
+UPSTREAM_DURATION = Histogram(
+    "upstream_request_duration_seconds",
+    "Время ответа микросервиса до получения заголовков (status error - ошибка соединения или таймаут)",
+    ["service", "status"],
+)
+
+
+class UpstreamStreamingResponse(StreamingResponse):
+    """Потоковый ответ, который освобождает соединение с микросервисом после отправки."""
+
+    def __init__(self, exit_stack: AsyncExitStack, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.exit_stack = exit_stack
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.exit_stack.aclose()
+
+
+def _has_body(request: Request) -> bool:
+    """Проверяет, передаёт ли клиент тело запроса."""
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        return content_length != "0"
+    return "transfer-encoding" in request.headers
+
+
+def _filter_response_headers(headers) -> dict:
+    return {
+        k: v for k, v in headers.items()
+        if k.lower() not in RESPONSE_HEADERS_BLACKLIST
+    }
+
+
+def _get_header(headers: dict, name: str) -> str | None:
+    """Регистронезависимый поиск заголовка в словаре."""
+    for k, v in headers.items():
+        if k.lower() == name:
+            return v
+    return None
+
 
 async def proxy_request(
-        service_name: str, path: str, request: Request, payload: dict | None
-) -> tuple[int, bytes, dict]:
-    """Перенаправляет HTTP-запрос к микросервису и возвращает ответ."""
+        service_name: str, path: str, request: Request, payload: dict | None, buffered: bool = False
+) -> Response:
+    """
+    Перенаправляет HTTP-запрос к микросервису и возвращает ответ.
+    При buffered ответ читается целиком независимо от настроек сервиса.
+    """
     logger.debug("Proxying request", extra={"service_name": service_name, "path": path, "method": request.method})
-    service_url = settings.MICRO_SERVICES.get(service_name)
-    if not service_url:
+    upstream: Upstream | None = request.app.state.upstreams.get(service_name)
+    if not upstream:
         raise ServiceNotFoundError(f"Service {service_name} not found")
 
-    url = f"{service_url}/{path}"
     headers = {
         k: v
         for k, v in request.headers.items()
@@ -44,22 +122,244 @@ async def proxy_request(
         headers["X-Auth-User-ID"] = str(payload["sub"])
         headers["X-Auth-User-Role"] = payload["role"]
 
+    if request.method in CACHEABLE_METHODS:
+        if upstream.settings.cache:
+            return await _cached_request(upstream, path, headers, request)
+        if upstream.settings.coalesce:
+            key = make_request_key(service_name, request.method, path, request.query_params, headers)
+            status, response_headers, content = await _fetch_idempotent(upstream, key, path, headers, request)
+            return Response(content=content, status_code=status, headers=response_headers)
+
+    if buffered or upstream.settings.buffered:
+        response = await _buffered_request(upstream, path, headers, request)
+    else:
+        response = await _streaming_request(upstream, path, headers, request)
+
+    if upstream.settings.cache and request.method not in CACHEABLE_METHODS and response.status_code < 400:
+        request.app.state.response_cache.invalidate(service_name, path)
+    return response
+
+
+async def _cached_request(upstream: Upstream, path: str, headers: dict, request: Request) -> Response:
+    """Отдаёт ответ из кэша, ревалидирует устаревший или запрашивает микросервис и сохраняет ответ."""
+    cache: ResponseCache = request.app.state.response_cache
+    request_cache_control = parse_cache_control(request.headers.get("cache-control"))
+    if "no-store" in request_cache_control:
+        return await _buffered_request(upstream, path, headers, request)
+
+    key = make_request_key(upstream.name, request.method, path, request.query_params, headers)
+    entry = cache.get(key)
+    if entry and entry.is_fresh() and "no-cache" not in request_cache_control:
+        cache.hits += 1
+        logger.debug("Cache hit", extra={"service_name": upstream.name, "path": path})
+        return _cached_response(entry, "HIT")
+
+    upstream_headers = headers
+    if entry and entry.etag:
+        upstream_headers = {**headers, "If-None-Match": entry.etag}
+    status, response_headers, content = await _fetch_idempotent(
+        upstream, key + (upstream_headers.get("If-None-Match"),), path, upstream_headers, request
+    )
+
+    cache_control = parse_cache_control(_get_header(response_headers, "cache-control"))
+    ttl = freshness_lifetime(cache_control, upstream.settings.cache_ttl)
+    if entry and status == 304:
+        cache.refresh(entry, response_headers, ttl or 0)
+        logger.debug("Cache entry revalidated", extra={"service_name": upstream.name, "path": path})
+        return _cached_response(entry, "REVALIDATED")
+
+    cache.misses += 1
+    private = "private" in cache_control and "X-Auth-User-ID" not in headers
+    if status in CACHEABLE_STATUSES and ttl is not None and not private:
+        cache.store(key, status, response_headers, content, _get_header(response_headers, "etag"), ttl)
+    return Response(content=content, status_code=status, headers={**response_headers, "X-Cache": "MISS"})
+
+
+def _cached_response(entry: CacheEntry, cache_status: str) -> Response:
+    headers = {**entry.headers, "Age": str(entry.age()), "X-Cache": cache_status}
+    return Response(content=entry.body, status_code=entry.status, headers=headers)
+
+
+async def _fetch_idempotent(
+        upstream: Upstream, key: tuple, path: str, headers: dict, request: Request
+) -> tuple[int, dict, bytes]:
+    """
+    Выполняет GET/HEAD-запрос к микросервису. Если для сервиса включено объединение запросов (coalesce),
+    одновременные запросы с одинаковым ключом (включая заголовки авторизации) разделяют один вызов.
+    """
+    def fetch():
+        return fetch_upstream(upstream, request.method, path, headers, request.query_params)
+
+    if not upstream.settings.coalesce:
+        return await fetch()
+    return await request.app.state.single_flight.do(key, fetch)
+
+
+async def _buffered_request(upstream: Upstream, path: str, headers: dict, request: Request) -> Response:
+    """Читает тело запроса и ответа целиком (режим buffered)."""
     body = await request.body()
-    session = request.app.state.aiohttp_session
-    try:
-        async with session.request(
-                method=request.method,
-                url=url,
-                headers=headers,
-                params=request.query_params,
-                data=body if body else None,
-        ) as r:
+    status, response_headers, content = await fetch_upstream(
+        upstream, request.method, path, headers, request.query_params, body or None
+    )
+    return Response(content=content, status_code=status, headers=response_headers)
+
+
+async def fetch_upstream(
+        upstream: Upstream, method: str, path: str, headers: dict, params=None, data: bytes | None = None
+) -> tuple[int, dict, bytes]:
+    """Выполняет запрос к микросервису и возвращает статус, заголовки и тело ответа целиком."""
+    exit_stack, r = await _send(upstream, method, path, headers, params, data)
+    async with exit_stack:
+        try:
             content = await r.read()
-            logger.debug("Proxy response received", extra={"status": r.status, "service_name": service_name})
-            response_headers = {
-                k: v for k, v in r.headers.items()
-                if k.lower() not in RESPONSE_HEADERS_BLACKLIST
-            }
-            return r.status, content, response_headers
-    except (aiohttp.ClientConnectorError, aiohttp.ClientOSError, aiohttp.client_exceptions.ServerDisconnectedError):
-        raise ServiceUnavailableError(f"Service {service_name} is unavailable")
+        except UPSTREAM_ERRORS:
+            raise ServiceUnavailableError(f"Service {upstream.name} is unavailable")
+    logger.debug("Proxy response received", extra={"status": r.status, "service_name": upstream.name})
+    return r.status, _filter_response_headers(r.headers), content
+
+
+async def _streaming_request(upstream: Upstream, path: str, headers: dict, request: Request) -> Response:
+    """Передаёт тело запроса и ответа по частям, не накапливая их в памяти."""
+    data = request.stream() if _has_body(request) else None
+    exit_stack, r = await _send(upstream, request.method, path, headers, request.query_params, data)
+    logger.debug("Proxy response headers received", extra={"status": r.status, "service_name": upstream.name})
+    return UpstreamStreamingResponse(
+        exit_stack,
+        r.content.iter_chunked(settings.PROXY_CHUNK_SIZE),
+        status_code=r.status,
+        headers=_filter_response_headers(r.headers),
+    )
+
+
+async def _send(
+        upstream: Upstream, method: str, path: str, headers: dict, params, data
+) -> tuple[AsyncExitStack, aiohttp.ClientResponse]:
+    """
+    Отправляет запрос микросервису и дожидается заголовков ответа.
+    Соединение освобождается закрытием exit_stack.
+    """
+    request_id = current_request_id()
+    if request_id:
+        headers = {**headers, "x-request-id": request_id}
+    if data is None and upstream.retry.applies(method):
+        return await _send_with_retries(upstream, method, path, headers, params)
+    return await _attempt(upstream, upstream.balancer.pick(), method, path, headers, params, data)
+
+
+async def _send_with_retries(
+        upstream: Upstream, method: str, path: str, headers: dict, params
+) -> tuple[AsyncExitStack, aiohttp.ClientResponse]:
+    """
+    Отправляет идемпотентный запрос с повтором на другом экземпляре при ошибке соединения и hedging:
+    если ответ задерживается дольше перцентиля задержек сервиса, запрос дублируется на другой экземпляр.
+    Используется первый полученный ответ, остальные попытки отменяются.
+    Дополнительные попытки ограничены глобальным бюджетом повторов.
+    """
+    policy = upstream.retry
+    pending: dict[asyncio.Task, str] = {}  # попытка -> её вид (first, hedge, retry)
+    tried: list[UpstreamInstance] = []
+
+    def start(kind: str) -> None:
+        instance = upstream.balancer.pick(exclude=tried)
+        tried.append(instance)
+        task = asyncio.create_task(_attempt(upstream, instance, method, path, headers, params, None))
+        if kind != "first":
+            task.add_done_callback(lambda _: policy.budget.release())
+        pending[task] = kind
+
+    def can_retry() -> bool:
+        return len(tried) < policy.settings.max_attempts and policy.acquire_attempt()
+
+    policy.budget.active_requests += 1
+    try:
+        start("first")
+        hedge_delay = policy.hedge_delay()
+        while True:
+            done, _ = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                hedge_delay = None
+                if can_retry():
+                    policy.hedges += 1
+                    start("hedge")
+                continue
+            for task in done:
+                kind = pending.pop(task)
+                error = task.exception()
+                if error is None:
+                    if kind == "hedge":
+                        policy.hedge_wins += 1
+                    return task.result()
+                if policy.settings.retry_on_connection_error and _is_connection_error(error) and can_retry():
+                    policy.retries += 1
+                    start("retry")
+                elif not pending:
+                    raise error
+    finally:
+        policy.budget.active_requests -= 1
+        for task in pending:
+            task.cancel()
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, tuple):  # попытка успела получить ответ одновременно с победившей
+                await result[0].aclose()
+
+
+def _is_connection_error(error: BaseException) -> bool:
+    return isinstance(error, ServiceUnavailableError) and isinstance(error.__cause__, CONNECTION_ERRORS)
+
+
+async def _attempt(
+        upstream: Upstream, instance: UpstreamInstance, method: str, path: str, headers: dict, params, data
+) -> tuple[AsyncExitStack, aiohttp.ClientResponse]:
+    """
+    Отправляет запрос экземпляру микросервиса и дожидается заголовков ответа.
+    При исчерпании лимита одновременных запросов сервиса ожидает в очереди.
+    Учитывает результат в circuit breaker, лимите одновременных запросов и балансировщике;
+    соединение и место в лимите освобождаются (а запрос перестаёт считаться незавершённым) закрытием exit_stack.
+    """
+    upstream.breaker.acquire()
+    try:
+        await upstream.limiter.acquire()
+    except BaseException:
+        upstream.breaker.release()
+        raise
+    instance.in_flight += 1
+    exit_stack = AsyncExitStack()
+    exit_stack.callback(upstream.limiter.release)
+    exit_stack.callback(_release_instance, instance)
+    started = time.monotonic()
+    try:
+        r = await exit_stack.enter_async_context(upstream.session.request(
+            method=method,
+            url=f"{instance.url}/{path}",
+            headers=headers,
+            params=params,
+            data=data,
+        ))
+    except UPSTREAM_ERRORS as e:
+        await exit_stack.aclose()
+        latency = time.monotonic() - started
+        upstream.balancer.record(instance, success=False)
+        upstream.breaker.record(success=False, latency=latency)
+        upstream.limiter.record(latency, None)
+        UPSTREAM_DURATION.labels(upstream.name, "error").observe(latency)
+        record_span("upstream", latency)
+        raise ServiceUnavailableError(f"Service {upstream.name} is unavailable") from e
+    except BaseException:
+        await exit_stack.aclose()
+        upstream.breaker.release()
+        raise
+    latency = time.monotonic() - started
+    success = r.status < 500
+    upstream.balancer.record(instance, success=success)
+    upstream.breaker.record(success=success, latency=latency)
+    upstream.limiter.record(latency, r.status)
+    UPSTREAM_DURATION.labels(upstream.name, str(r.status)).observe(latency)
+    record_span("upstream", latency)
+    merge_server_timing(upstream.name, r.headers.get("server-timing"))
+    if success and upstream.retry.applies(method):
+        upstream.retry.latency.record(latency)
+    return exit_stack, r
+
+
+def _release_instance(instance: UpstreamInstance) -> None:
+    instance.in_flight -= 1
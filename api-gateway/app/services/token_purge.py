@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from prometheus_client import Counter
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.repositories.refresh_token import delete_expired_refresh_tokens
+
+logger = logging.getLogger(__name__)
+
+# Ключ pg_try_advisory_lock: очистку выполняет только один воркер Granian
+PURGE_LOCK_KEY = 0x70757267
+
+REFRESH_TOKENS_PURGED = Counter("refresh_tokens_purged_total", "Удалённые просроченные refresh-токены")
+
+
+async def purge_expired_refresh_tokens(engine: AsyncEngine, batch_size: int) -> int | None:
+    """
+    Удаляет просроченные refresh-токены пакетами по batch_size (каждый пакет - отдельная короткая транзакция).
+    Возвращает количество удалённых токенов или None, если очистку уже выполняет другой воркер.
+    """
+    purged = 0
+    async with engine.connect() as conn:
+        # Блокировка уровня сессии удерживается соединением между транзакциями пакетов
+        postgresql = conn.dialect.name == "postgresql"
+        if postgresql:
+            locked = (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": PURGE_LOCK_KEY})).scalar()
+            await conn.commit()
+            if not locked:
+                return None
+        try:
+            while True:
+                deleted = await delete_expired_refresh_tokens(conn, batch_size)
+                purged += deleted
+                REFRESH_TOKENS_PURGED.inc(deleted)
+                if deleted < batch_size:
+                    break
+        finally:
+            if postgresql:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": PURGE_LOCK_KEY})
+                await conn.commit()
+    return purged
+
+
+async def run_refresh_token_purge(engine: AsyncEngine, interval: float, batch_size: int) -> None:
+    """Периодически удаляет просроченные refresh-токены (задача lifespan)."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            purged = await purge_expired_refresh_tokens(engine, batch_size)
+        except Exception as e:
+            logger.warning("Failed to purge expired refresh tokens", extra={"error": str(e)})
+            continue
+        if purged:
+            logger.info("Expired refresh tokens purged", extra={"purged": purged})
@@ -3,16 +3,31 @@ import logging
 from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 from fastapi import Response
+from starlette.types import Scope
 import secrets
+import hashlib
+from asyncio import to_thread
 
 from app.config import settings
 from app.exceptions import UnauthorizedError
 from app.models import User
+from app.tracing import span
+from app.utils.token_cache import TokenCache
 
 logger = logging.getLogger(__name__)
 
+
+def password_context_settings(algorithm: str, rounds: int | None) -> dict:
+    """Параметры CryptContext: при заданной стоимости хэши с другой стоимостью считаются устаревшими."""
+    if rounds is None:
+        return {}
+    return {f"{algorithm}__rounds": rounds, f"{algorithm}__min_rounds": rounds, f"{algorithm}__max_rounds": rounds}
+
+
 pwd_context = CryptContext(
-    schemes=[settings.PASSWORD_HASH_ALGORITHM], deprecated="auto"
+    schemes=[settings.PASSWORD_HASH_ALGORITHM, *settings.PASSWORD_HASH_DEPRECATED],
+    deprecated="auto",
+    **password_context_settings(settings.PASSWORD_HASH_ALGORITHM, settings.PASSWORD_HASH_ROUNDS),
 )
 
 
@@ -28,6 +43,11 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def password_needs_update(hashed_password: str) -> bool:
+    """Проверяет, нужно ли пересчитать хеш (устаревший алгоритм или другая стоимость)."""
+    return pwd_context.needs_update(hashed_password)
+
+
 def create_access_token(user: User) -> str:
     """Создаёт JWT access-токен с ID и ролью пользователя."""
     logger.debug("Creating access token", extra={"user_id": user.id})
@@ -46,6 +66,11 @@ def create_refresh_token() -> str:
     return token
 
 
+def hash_refresh_token(token: str) -> bytes:
+    """SHA-256 refresh-токена: в БД хранится только он, сам токен знает лишь клиент."""
+    return hashlib.sha256(token.encode()).digest()
+
+
 def decode_access_token(token: str) -> dict:
     """Декодирует JWT access-токен и проверяет валидность."""
     logger.debug("Decoding access token")
@@ -61,6 +86,27 @@ def decode_access_token(token: str) -> dict:
         raise UnauthorizedError("Invalid token")
 
 
+async def verify_access_token(token: str, token_cache: TokenCache) -> dict:
+    """Проверяет access-токен; уже проверенный токен берётся из кэша без обращения к пулу потоков."""
+    with span("auth"):
+        payload = token_cache.get(token)
+        if payload is None:
+            payload = await to_thread(decode_access_token, token)
+            token_cache.store(token, payload)
+    return payload
+
+
+def bearer_token(scope: Scope) -> str | None:
+    """Токен из заголовка Authorization: Bearer (как HTTPBearer с auto_error=False)."""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token
+            return None
+    return None
+
+
 def set_refresh_cookie(response: Response, refresh_token: str) -> None:
     """Установка cookie."""
     response.set_cookie(
@@ -0,0 +1,89 @@
+import time
+import random
+import logging
+
+from app.config import LoadBalancerSettings
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamInstance:
+    """Экземпляр (реплика) микросервиса."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.in_flight = 0  # запросы, отправленные экземпляру и ещё не завершённые
+        self.consecutive_failures = 0
+        self.ejections = 0  # сколько раз подряд экземпляр исключался из балансировки
+        self.ejected_until = 0.0
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def stats(self, now: float) -> dict:
+        return {
+            "url": self.url,
+            "in_flight": self.in_flight,
+            "ejected": not self.is_available(now),
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+class LoadBalancer:
+    """
+    Балансировщик между экземплярами микросервиса по числу незавершённых запросов
+    (least outstanding requests или power of two choices).
+    Экземпляры, подряд отвечающие ошибками, временно исключаются (пассивная проверка здоровья):
+    по истечении времени исключения экземпляр снова получает запросы, а повторные ошибки увеличивают это время.
+    """
+
+    def __init__(self, service_name: str, urls: list[str], balancer_settings: LoadBalancerSettings):
+        self.service_name = service_name
+        self.settings = balancer_settings
+        self.instances = [UpstreamInstance(url) for url in urls]
+
+    def pick(self, exclude: list[UpstreamInstance] = ()) -> UpstreamInstance:
+        """Выбирает экземпляр для следующего запроса, по возможности не из exclude (уже опрошенные экземпляры)."""
+        if len(self.instances) == 1:
+            return self.instances[0]
+        now = time.monotonic()
+        available = [instance for instance in self.instances if instance.is_available(now)]
+        if exclude:
+            available = [instance for instance in available if instance not in exclude] or available
+        if not available:
+            # Все экземпляры исключены - отправляем туда, где исключение закончится раньше всего
+            return min(self.instances, key=lambda instance: instance.ejected_until)
+        if self.settings.strategy == "p2c" and len(available) > 2:
+            first, second = random.sample(available, 2)
+            return first if first.in_flight <= second.in_flight else second
+        least = min(instance.in_flight for instance in available)
+        return random.choice([instance for instance in available if instance.in_flight == least])
+
+    def record(self, instance: UpstreamInstance, success: bool) -> None:
+        """Учитывает результат запроса к экземпляру."""
+        if success:
+            instance.consecutive_failures = 0
+            instance.ejections = 0
+            return
+        instance.consecutive_failures += 1
+        if instance.consecutive_failures >= self.settings.consecutive_failures and self._can_eject():
+            self._eject(instance)
+
+    def _can_eject(self) -> bool:
+        now = time.monotonic()
+        ejected = sum(not instance.is_available(now) for instance in self.instances)
+        return (ejected + 1) / len(self.instances) <= self.settings.max_ejected_percent
+
+    def _eject(self, instance: UpstreamInstance) -> None:
+        instance.ejections += 1
+        ejection_time = min(self.settings.ejection_time * instance.ejections, self.settings.max_ejection_time)
+        instance.ejected_until = time.monotonic() + ejection_time
+        instance.consecutive_failures = 0
+        logger.warning(
+            "Upstream instance ejected",
+            extra={"service_name": self.service_name, "url": instance.url, "ejection_time": ejection_time},
+        )
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        return [instance.stats(now) for instance in self.instances]
@@ -0,0 +1,172 @@
+import time
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# Заголовки, от которых зависит ответ микросервиса (в т.ч. личность пользователя)
+KEY_HEADERS = ("accept", "accept-encoding", "X-Auth-User-ID", "X-Auth-User-Role")
+
+CACHEABLE_STATUSES = {200, 203}
+
+# Заголовки ответа 304, которые обновляют сохранённую запись
+REVALIDATION_HEADERS = {"cache-control", "etag", "expires"}
+
+ENTRY_OVERHEAD = 256  # Примерный расход памяти на служебные структуры записи (в байтах)
+
+
+def make_request_key(service_name: str, method: str, path: str, query_params, headers: dict) -> tuple:
+    """Ключ запроса: сервис, метод, путь, отсортированная строка запроса и личность пользователя."""
+    query = tuple(sorted(query_params.multi_items()))
+    return service_name, method, path, query, tuple(headers.get(h) for h in KEY_HEADERS)
+
+
+def _path_key(key: tuple) -> tuple[str, str]:
+    service_name, _, path, *_ = key
+    return service_name, path
+
+
+def _collection_paths(path: str) -> set[str]:
+    """Путь и родительские пути-коллекции с '/' на конце и без: products/1 -> products/1, products, products/ и т.д."""
+    lead = "/" if path.startswith("/") else ""
+    parts = path.strip("/").split("/")
+    paths = set()
+    for i in range(len(parts), 0, -1):
+        prefix = lead + "/".join(parts[:i])
+        paths.update((prefix, prefix + "/"))
+    return paths
+
+
+def parse_cache_control(value: str | None) -> dict[str, str | None]:
+    """Разбирает заголовок Cache-Control в словарь директив."""
+    directives = {}
+    if not value:
+        return directives
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def freshness_lifetime(cache_control: dict, default_ttl: int) -> int | None:
+    """Время свежести ответа в секундах или None, если ответ нельзя сохранять."""
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0
+    for directive in ("s-maxage", "max-age"):
+        if directive in cache_control:
+            try:
+                return max(int(cache_control[directive]), 0)
+            except (TypeError, ValueError):
+                return 0
+    return default_ttl
+
+
+@dataclass
+class CacheEntry:
+    status: int
+    headers: dict
+    body: bytes
+    etag: str | None
+    stored_at: float
+    expires_at: float
+    size: int = field(init=False)
+
+    def __post_init__(self):
+        self.size = (len(self.body) + ENTRY_OVERHEAD +
+                     sum(len(k) + len(v) for k, v in self.headers.items()))
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    def age(self) -> int:
+        return int(time.monotonic() - self.stored_at)
+
+
+class ResponseCache:
+    """LRU-кэш ответов микросервисов с ограничением по памяти."""
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+        self.paths: dict[tuple[str, str], set[tuple]] = {}  # индекс для инвалидации по пути
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> CacheEntry | None:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key: tuple, status: int, headers: dict, body: bytes, etag: str | None, ttl: int) -> bool:
+        """Сохраняет ответ, вытесняя давно не использованные записи при превышении бюджета памяти."""
+        if ttl <= 0 and not etag:  # нечего переиспользовать: ни свежести, ни валидатора
+            return False
+        now = time.monotonic()
+        entry = CacheEntry(status, headers, body, etag, stored_at=now, expires_at=now + ttl)
+        if entry.size > self.max_entry_bytes or entry.size > self.max_bytes:
+            return False
+
+        self._remove(key)
+        self.entries[key] = entry
+        self.paths.setdefault(_path_key(key), set()).add(key)
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+        return True
+
+    def refresh(self, entry: CacheEntry, headers: dict, ttl: int) -> None:
+        """Продлевает свежесть записи после успешной ревалидации (304 Not Modified)."""
+        now = time.monotonic()
+        entry.stored_at = now
+        entry.expires_at = now + ttl
+        updated = {k: v for k, v in headers.items() if k.lower() in REVALIDATION_HEADERS}
+        if updated:
+            updated_names = {k.lower() for k in updated}
+            entry.headers = {k: v for k, v in entry.headers.items() if k.lower() not in updated_names}
+            entry.headers.update(updated)
+        self.revalidations += 1
+
+    def invalidate(self, service_name: str, path: str) -> None:
+        """
+        Удаляет все сохранённые ответы для пути и родительских коллекций (после изменяющего запроса):
+        PUT products/1 удаляет и products/1, и список products. Вложенные пути (products/1/reviews) не удаляются.
+        """
+        keys = [key for collection in _collection_paths(path) for key in self.paths.get((service_name, collection), ())]
+        for key in keys:
+            self._remove(key)
+        if keys:
+            logger.debug("Cache entries invalidated", extra={"service_name": service_name, "path": path})
+
+    def _remove(self, key: tuple) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= entry.size
+        path_key = _path_key(key)
+        keys = self.paths.get(path_key)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.paths[path_key]
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "size_bytes": self.size,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,108 @@
+import time
+import logging
+from collections import deque
+from enum import Enum
+
+from app.config import CircuitBreakerSettings
+from app.exceptions import ServiceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"  # запросы проходят, результаты накапливаются в окне
+    OPEN = "open"  # запросы отклоняются сразу, без обращения к сервису
+    HALF_OPEN = "half_open"  # пропускается ограниченное число пробных запросов
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker микросервиса.
+    Размыкается, когда в скользящем окне последних вызовов доля ошибок или медленных ответов
+    превышает порог, и через open_timeout пропускает пробные запросы.
+    """
+
+    def __init__(self, service_name: str, breaker_settings: CircuitBreakerSettings):
+        self.service_name = service_name
+        self.settings = breaker_settings
+        self.state = CircuitState.CLOSED
+        self.window: deque[tuple[bool, bool]] = deque(maxlen=breaker_settings.window_size)  # (ошибка, медленный)
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.probes_succeeded = 0
+        self.rejected = 0
+
+    def acquire(self) -> None:
+        """Проверяет, можно ли отправить запрос; при разомкнутой цепи сразу возвращает 503."""
+        if not self.settings.enabled:
+            return
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self.opened_at < self.settings.open_timeout:
+                self._reject()
+            self._transition(CircuitState.HALF_OPEN)
+        if self.state == CircuitState.HALF_OPEN:
+            if self.probes_in_flight >= self.settings.half_open_probes:
+                self._reject()
+            self.probes_in_flight += 1
+
+    def record(self, success: bool, latency: float) -> None:
+        """Учитывает результат запроса, разрешённого через acquire()."""
+        if not self.settings.enabled:
+            return
+        threshold = self.settings.slow_call_threshold
+        slow = threshold is not None and latency >= threshold
+        if self.state == CircuitState.HALF_OPEN:
+            self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+            if not success or slow:
+                self._open()
+                return
+            self.probes_succeeded += 1
+            if self.probes_succeeded >= self.settings.half_open_probes:
+                self._transition(CircuitState.CLOSED)
+            return
+        if self.state == CircuitState.CLOSED:
+            self.window.append((not success, slow))
+            if self._should_trip():
+                self._open()
+
+    def release(self) -> None:
+        """Освобождает разрешение без учёта результата (запрос отменён)."""
+        if self.state == CircuitState.HALF_OPEN:
+            self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+
+    def _should_trip(self) -> bool:
+        calls = len(self.window)
+        if calls < self.settings.min_calls:
+            return False
+        failures = sum(failed for failed, _ in self.window)
+        slow_calls = sum(slow for _, slow in self.window)
+        return (failures / calls >= self.settings.error_rate or
+                slow_calls / calls >= self.settings.slow_call_rate)
+
+    def _open(self) -> None:
+        self.opened_at = time.monotonic()
+        self._transition(CircuitState.OPEN)
+
+    def _reject(self) -> None:
+        self.rejected += 1
+        raise ServiceUnavailableError(f"Service {self.service_name} is unavailable")
+
+    def _transition(self, state: CircuitState) -> None:
+        logger.warning(
+            "Circuit breaker state changed",
+            extra={"service_name": self.service_name, "from_state": self.state.value, "to_state": state.value},
+        )
+        self.state = state
+        self.window.clear()
+        self.probes_in_flight = 0
+        self.probes_succeeded = 0
+
+    def stats(self) -> dict:
+        calls = len(self.window)
+        return {
+            "state": self.state.value,
+            "calls": calls,
+            "failure_rate": sum(failed for failed, _ in self.window) / calls if calls else 0.0,
+            "slow_call_rate": sum(slow for _, slow in self.window) / calls if calls else 0.0,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,89 @@
+import zlib
+import logging
+
+try:
+    import brotli
+except ImportError:  # brotli не установлен - кодирование br недоступно
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard не установлен - кодирование zstd недоступно
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # уровни выше заметно медленнее при небольшом выигрыше в размере
+ZSTD_LEVEL = 3
+
+
+class GzipCompressor:
+    def __init__(self):
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, finish: bool) -> bytes:
+        compressed = self.compressor.compress(data)
+        return compressed + self.compressor.flush(zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH)
+
+
+class BrotliCompressor:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes, finish: bool) -> bytes:
+        compressed = self.compressor.process(data)
+        return compressed + (self.compressor.finish() if finish else self.compressor.flush())
+
+
+class ZstdCompressor:
+    def __init__(self):
+        self.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes, finish: bool) -> bytes:
+        compressed = self.compressor.compress(data)
+        flush_mode = zstandard.COMPRESSOBJ_FLUSH_FINISH if finish else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return compressed + self.compressor.flush(flush_mode)
+
+
+COMPRESSORS = {"gzip": GzipCompressor}
+if brotli is not None:
+    COMPRESSORS["br"] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS["zstd"] = ZstdCompressor
+
+
+def negotiate_encoding(accept_encoding: str | None, preferred: list[str]) -> str | None:
+    """
+    Выбирает кодирование ответа по заголовку Accept-Encoding клиента.
+    Из приемлемых для клиента (q > 0) кодирований выбирается первое доступное в порядке предпочтения сервера.
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for encoding in preferred:
+        if encoding in COMPRESSORS and accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def is_compressible(content_type: str | None, allowed_types: list[str]) -> bool:
+    """Проверяет тип содержимого по списку разрешённых (значения с '/' на конце - префиксы)."""
+    if not content_type:
+        return False
+    media_type = content_type.partition(";")[0].strip().lower()
+    return any(
+        media_type.startswith(allowed) if allowed.endswith("/") else media_type == allowed
+        for allowed in allowed_types
+    )
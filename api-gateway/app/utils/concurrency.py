@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from collections import deque
+
+from app.config import ConcurrencyLimitSettings
+from app.exceptions import ServiceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+OVERLOAD_STATUSES = {429, 503, 504}
+
+
+class ConcurrencyLimiter:
+    """
+    Адаптивный лимит одновременных запросов к микросервису (AIMD).
+    Лимит растёт на единицу за успешный ответ, пока он используется хотя бы наполовину, и уменьшается
+    в backoff_ratio раз при ошибке, таймауте или медленном ответе. Запросы сверх лимита ждут в ограниченной
+    очереди (FIFO); при переполнении очереди или истечении queue_timeout сразу возвращается 503.
+    """
+
+    def __init__(self, service_name: str, limit_settings: ConcurrencyLimitSettings):
+        self.service_name = service_name
+        self.settings = limit_settings
+        self.limit = limit_settings.initial_limit
+        self.in_flight = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        self.shed = 0
+
+    async def acquire(self) -> None:
+        """Занимает место для запроса, при необходимости ожидая в очереди."""
+        if not self.settings.enabled:
+            return
+        if self.in_flight < self.limit and not self.waiters:
+            self.in_flight += 1
+            return
+        if len(self.waiters) >= self.settings.max_queue:
+            self._shed("queue is full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.settings.queue_timeout)
+        except asyncio.TimeoutError:
+            if not self._cancel(waiter):
+                return  # место передано одновременно с истечением таймаута
+            self._shed("queue timeout")
+        except BaseException:
+            if not self._cancel(waiter):
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Освобождает место и передаёт его следующему запросу из очереди."""
+        if not self.settings.enabled:
+            return
+        self.in_flight -= 1
+        self._wake()
+
+    def record(self, latency: float, status: int | None) -> None:
+        """Изменяет лимит по результату запроса (status None - ошибка соединения или таймаут)."""
+        if not self.settings.enabled:
+            return
+        if status is None or status in OVERLOAD_STATUSES or latency >= self.settings.latency_threshold:
+            limit = max(int(self.limit * self.settings.backoff_ratio), self.settings.min_limit)
+            if limit < self.limit:
+                logger.info(
+                    "Concurrency limit decreased",
+                    extra={"service_name": self.service_name, "limit": limit, "in_flight": self.in_flight},
+                )
+            self.limit = limit
+        elif self.limit < self.settings.max_limit and self.in_flight * 2 >= self.limit:
+            self.limit += 1
+            self._wake()
+
+    def _wake(self) -> None:
+        while self.waiters and self.in_flight < self.limit:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _cancel(self, waiter: asyncio.Future) -> bool:
+        """Убирает запрос из очереди; возвращает False, если место уже было ему передано."""
+        if waiter.done() and not waiter.cancelled():
+            return False
+        waiter.cancel()
+        if waiter in self.waiters:
+            self.waiters.remove(waiter)
+        return True
+
+    def _shed(self, reason: str) -> None:
+        self.shed += 1
+        logger.warning(
+            "Request shed by concurrency limit",
+            extra={"service_name": self.service_name, "reason": reason, "limit": self.limit},
+        )
+        raise ServiceUnavailableError(f"Service {self.service_name} is overloaded")
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": len(self.waiters),
+            "shed": self.shed,
+        }
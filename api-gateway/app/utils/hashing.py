@@ -0,0 +1,72 @@
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from prometheus_client import Counter, Histogram
+
+from app.config import settings
+from app.exceptions import ServiceUnavailableError
+from app.tracing import span
+from app.utils.auth import get_password_hash, verify_password
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds", "Время хеширования и проверки паролей с ожиданием в очереди", ["operation"]
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total", "Операции с паролями, отклонённые из-за переполнения очереди"
+)
+
+
+class PasswordHasher:
+    """
+    Хеширование и проверка паролей в отдельном пуле потоков (bcrypt освобождает GIL на время вычисления),
+    чтобы всплеск входов не занимал пул потоков по умолчанию.
+    Операции сверх workers + max_queue сразу отклоняются с 503.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0  # выполняемые и ожидающие в очереди операции
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, password, hashed_password)
+
+    async def _run(self, operation: str, func, *args):
+        if self.pending >= self.workers + self.max_queue:
+            PASSWORD_HASH_REJECTED.inc()
+            logger.warning("Password hashing queue is full", extra={"pending": self.pending})
+            raise ServiceUnavailableError("Password hashing is overloaded")
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            with span("password_hash"):
+                return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+            PASSWORD_HASH_DURATION.labels(operation).observe(time.perf_counter() - started)
+
+    def shutdown(self) -> None:
+        """Останавливает пул потоков (при следующем использовании создаётся новый)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS or max((os.cpu_count() or 1) // settings.WORKERS, 1),
+    settings.PASSWORD_HASH_MAX_QUEUE,
+)
@@ -0,0 +1,117 @@
+import math
+import time
+import logging
+from starlette.datastructures import Headers
+from starlette.types import Scope
+
+from app.config import settings, RateLimitQuota
+from app.exceptions import UnauthorizedError
+from app.utils.auth import bearer_token, verify_access_token
+
+logger = logging.getLogger(__name__)
+
+PROXY_PREFIX = "/api/"
+
+
+class RateLimiter:
+    """
+    Token bucket на каждую пару (правило, клиент).
+    Корзины разбиты на шарды: заполнившиеся (простаивающие) корзины удаляются по одному шарду за раз,
+    без полного обхода на каждом запросе. Квоты делятся поровну между воркерами.
+    """
+
+    def __init__(self, workers: int = 1, shards: int = 16, sweep_every: int = 1024):
+        self.workers = max(workers, 1)
+        self.shards: list[dict[tuple, list[float]]] = [{} for _ in range(shards)]  # ключ -> [токены, время, заполнится]
+        self.sweep_every = sweep_every
+        self.calls = 0
+        self.next_sweep = 0
+        self.limited = 0
+
+    def worker_limits(self, quota: RateLimitQuota) -> tuple[float, float]:
+        """Скорость пополнения (токенов в секунду) и ёмкость корзины в пределах одного воркера."""
+        burst = quota.burst if quota.burst is not None else quota.requests
+        return quota.requests / quota.period / self.workers, max(math.ceil(burst / self.workers), 1)
+
+    def acquire(self, checks: list[tuple[tuple, RateLimitQuota]]) -> float:
+        """
+        Списывает по токену из корзины каждой квоты (ключ корзины, квота).
+        Возвращает 0, если запрос разрешён всеми квотами, иначе время в секундах до появления токена;
+        в этом случае токены не списываются.
+        """
+        now = time.monotonic()
+        buckets = []
+        retry_after = 0.0
+        for key, quota in checks:
+            rate, capacity = self.worker_limits(quota)
+            shard = self.shards[hash(key) % len(self.shards)]
+            bucket = shard.get(key)
+            if bucket is None:
+                bucket = shard[key] = [capacity, now, now]
+            else:
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] < 1:
+                retry_after = max(retry_after, (1 - bucket[0]) / rate)
+            buckets.append((bucket, rate, capacity))
+
+        if retry_after:
+            self.limited += 1
+            return retry_after
+        for bucket, rate, capacity in buckets:
+            bucket[0] -= 1
+            bucket[2] = now + (capacity - bucket[0]) / rate
+        self._maybe_sweep(now)
+        return 0.0
+
+    def _maybe_sweep(self, now: float) -> None:
+        self.calls += 1
+        if self.calls % self.sweep_every:
+            return
+        shard = self.shards[self.next_sweep]
+        for key in [key for key, bucket in shard.items() if bucket[2] <= now]:
+            del shard[key]
+        self.next_sweep = (self.next_sweep + 1) % len(self.shards)
+
+    def stats(self) -> dict:
+        return {
+            "limited": self.limited,
+            "buckets": sum(len(shard) for shard in self.shards),
+            "workers": self.workers,
+        }
+
+
+def request_quotas(path: str) -> list[tuple[str, RateLimitQuota]]:
+    """Квоты, которые действуют для запроса: (имя правила, квота)."""
+    quotas = []
+    route_quota = settings.RATE_LIMIT_ROUTES.get(path)
+    if route_quota is not None:
+        quotas.append((path, route_quota))
+    if path.startswith(PROXY_PREFIX):
+        if settings.RATE_LIMIT_DEFAULT is not None:
+            quotas.append(("default", settings.RATE_LIMIT_DEFAULT))
+        service_name = path[len(PROXY_PREFIX):].partition("/")[0]
+        if service_name in settings.MICRO_SERVICES:
+            service_quota = settings.get_service_settings(service_name).rate_limit
+            if service_quota is not None:
+                quotas.append((f"service:{service_name}", service_quota))
+    return quotas
+
+
+async def client_key(scope: Scope, app) -> tuple[str, str]:
+    """Пользователь из валидного access-токена или IP клиента."""
+    token = bearer_token(scope)
+    if token:
+        try:
+            payload = await verify_access_token(token, app.state.token_cache)
+            return "user", str(payload["sub"])
+        except UnauthorizedError:
+            pass  # запрос будет отклонён обработчиком маршрута, квота считается по IP
+    if settings.RATE_LIMIT_TRUSTED_PROXIES:
+        headers = Headers(scope=scope).getlist("x-forwarded-for")
+        forwarded_for = [ip.strip() for header in headers for ip in header.split(",") if ip.strip()]
+        if forwarded_for:
+            # Каждый доверенный прокси дописывает адрес своего клиента в конец, левые записи задаёт сам клиент
+            return "ip", forwarded_for[-min(settings.RATE_LIMIT_TRUSTED_PROXIES, len(forwarded_for))]
+    client = scope.get("client")
+    return "ip", client[0] if client else "unknown"
@@ -0,0 +1,95 @@
+import logging
+from collections import deque
+
+from app.config import RetrySettings
+
+logger = logging.getLogger(__name__)
+
+
+class RetryBudget:
+    """
+    Глобальный бюджет повторов и hedge-запросов.
+    Одновременно выполняемых дополнительных попыток может быть не больше доли ratio от выполняемых запросов
+    (но не меньше min_concurrency), поэтому при деградации сервиса повторы не умножают нагрузку на него.
+    """
+
+    def __init__(self, ratio: float, min_concurrency: int):
+        self.ratio = ratio
+        self.min_concurrency = min_concurrency
+        self.active_requests = 0
+        self.active_retries = 0
+
+    def try_acquire(self) -> bool:
+        limit = max(self.min_concurrency, self.ratio * self.active_requests)
+        if self.active_retries + 1 > limit:
+            return False
+        self.active_retries += 1
+        return True
+
+    def release(self) -> None:
+        self.active_retries -= 1
+
+    def stats(self) -> dict:
+        return {
+            "active_requests": self.active_requests,
+            "active_retries": self.active_retries,
+        }
+
+
+class LatencyTracker:
+    """Задержки последних успешных запросов к сервису; перцентиль пересчитывается раз в refresh_every замеров."""
+
+    def __init__(self, percentile: float, window: int = 1000, refresh_every: int = 50):
+        self.percentile = percentile
+        self.samples: deque[float] = deque(maxlen=window)
+        self.refresh_every = refresh_every
+        self.since_refresh = 0
+        self.value: float | None = None
+
+    def record(self, latency: float) -> None:
+        self.samples.append(latency)
+        self.since_refresh += 1
+        if self.value is None or self.since_refresh >= self.refresh_every:
+            ordered = sorted(self.samples)
+            self.value = ordered[min(int(self.percentile * len(ordered)), len(ordered) - 1)]
+            self.since_refresh = 0
+
+
+class RetryPolicy:
+    """Политика повторов и hedging идемпотентных запросов микросервиса."""
+
+    def __init__(self, service_name: str, retry_settings: RetrySettings, budget: RetryBudget):
+        self.service_name = service_name
+        self.settings = retry_settings
+        self.budget = budget
+        self.latency = LatencyTracker(retry_settings.hedge_percentile)
+        self.hedges = 0  # отправлено hedge-запросов
+        self.hedge_wins = 0  # hedge-запросов, ответивших раньше исходного
+        self.retries = 0  # повторов после ошибки соединения
+        self.budget_exhausted = 0  # дополнительных попыток, не отправленных из-за бюджета
+
+    def applies(self, method: str) -> bool:
+        return method in self.settings.methods
+
+    def hedge_delay(self) -> float | None:
+        """Задержка перед hedge-запросом или None, если hedging выключен или замеров ещё недостаточно."""
+        if not self.settings.hedge or len(self.latency.samples) < self.settings.hedge_min_samples:
+            return None
+        return max(self.latency.value, self.settings.hedge_min_delay)
+
+    def acquire_attempt(self) -> bool:
+        """Резервирует дополнительную попытку в глобальном бюджете."""
+        if self.budget.try_acquire():
+            return True
+        self.budget_exhausted += 1
+        logger.debug("Retry budget exhausted", extra={"service_name": self.service_name})
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "retries": self.retries,
+            "budget_exhausted": self.budget_exhausted,
+            "hedge_delay": self.hedge_delay(),
+        }
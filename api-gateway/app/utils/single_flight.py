@@ -0,0 +1,42 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Объединяет одновременные одинаковые запросы в один вызов микросервиса."""
+
+    def __init__(self):
+        self.calls: dict[tuple, asyncio.Task] = {}
+        self.executions = 0  # выполнено вызовов микросервиса
+        self.shared = 0  # запросов, получивших результат чужого вызова
+
+    async def do(self, key: tuple, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполняет fn один раз для всех одновременных вызовов с одинаковым ключом.
+        Вызов выполняется в отдельной задаче: отмена одного из ожидающих не прерывает его для остальных.
+        """
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self.calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.executions += 1
+        else:
+            self.shared += 1
+            logger.debug("Joined in-flight request", extra={"in_flight": len(self.calls)})
+        return await asyncio.shield(task)
+
+    def _done(self, key: tuple, task: asyncio.Task) -> None:
+        self.calls.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # помечаем исключение обработанным, даже если все ожидающие отменены
+
+    def stats(self) -> dict:
+        return {
+            "executions": self.executions,
+            "shared": self.shared,
+            "in_flight": len(self.calls),
+        }
@@ -0,0 +1,50 @@
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+    """
+    LRU-кэш проверенных access-токенов: дайджест токена -> payload.
+    Запись действительна до exp токена. Ключ и алгоритм подписи не меняются во время работы:
+    смена JWT_SECRET_KEY или JWT_ALGORITHM требует перезапуска, который очищает кэш.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[bytes, dict] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> dict | None:
+        """Возвращает payload ранее проверенного токена или None."""
+        digest = hashlib.sha256(token.encode()).digest()
+        payload = self.entries.get(digest)
+        if payload is None:
+            self.misses += 1
+            return None
+        if payload["exp"] <= time.time():
+            del self.entries[digest]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(digest)
+        self.hits += 1
+        return payload
+
+    def store(self, token: str, payload: dict) -> None:
+        if self.max_entries <= 0 or "exp" not in payload:
+            return
+        self.entries[hashlib.sha256(token.encode()).digest()] = payload
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+        }
@@ -0,0 +1,94 @@
+import aiohttp
+import logging
+
+from app.config import settings, ServiceSettings
+from app.utils.balancer import LoadBalancer
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.concurrency import ConcurrencyLimiter
+from app.utils.retry import RetryBudget, RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class Upstream:
+    """Микросервис за gateway с собственным пулом соединений, общим для всех его экземпляров."""
+
+    def __init__(self, name: str, urls: list[str], service_settings: ServiceSettings, retry_budget: RetryBudget):
+        self.name = name
+        self.settings = service_settings
+        self.balancer = LoadBalancer(name, urls, service_settings.balancer)
+        self.breaker = CircuitBreaker(name, service_settings.breaker)
+        self.retry = RetryPolicy(name, service_settings.retry, retry_budget)
+        self.limiter = ConcurrencyLimiter(name, service_settings.concurrency)
+        self.connector = aiohttp.TCPConnector(
+            limit=service_settings.pool_limit,
+            keepalive_timeout=service_settings.keepalive_timeout,
+            ttl_dns_cache=service_settings.dns_cache_ttl,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=self.connector,
+            timeout=aiohttp.ClientTimeout(
+                total=settings.TOTAL_TIMEOUT,
+                connect=service_settings.connect_timeout,
+                sock_read=service_settings.read_timeout,
+            ),
+            auto_decompress=False,  # сжатые ответы микросервисов передаются клиенту как есть
+        )
+
+    def pool_stats(self) -> dict:
+        """Текущее состояние пула соединений: занятые, свободные и ожидающие."""
+        return {"limit": self.connector.limit, **_connector_stats(self.connector), "instances": self.balancer.stats()}
+
+    async def close(self) -> None:
+        await self.session.close()
+
+
+def _connector_stats(connector: aiohttp.TCPConnector) -> dict:
+    """
+    Счётчики пула из внутренних полей aiohttp (публичного API для них нет).
+    Если версия aiohttp их не содержит, вместо значений возвращается None, а не ошибка.
+    """
+    try:
+        return {
+            "acquired": len(connector._acquired),
+            "idle": sum(len(conns) for conns in connector._conns.values()),
+            "waiting": sum(len(waiters) for waiters in connector._waiters.values()),
+        }
+    except (AttributeError, TypeError):
+        return {"acquired": None, "idle": None, "waiting": None}
+
+
+class UpstreamRegistry:
+    """Реестр микросервисов из settings.MICRO_SERVICES."""
+
+    def __init__(self, services: dict[str, str | list[str]]):
+        self.retry_budget = RetryBudget(settings.RETRY_BUDGET_RATIO, settings.RETRY_BUDGET_MIN_CONCURRENCY)
+        self.upstreams = {
+            name: Upstream(
+                name, [urls] if isinstance(urls, str) else urls, settings.get_service_settings(name), self.retry_budget
+            )
+            for name, urls in services.items()
+        }
+        logger.debug("Upstream registry initialized", extra={"services": list(self.upstreams)})
+
+    def get(self, service_name: str) -> Upstream | None:
+        return self.upstreams.get(service_name)
+
+    def pool_stats(self) -> dict:
+        return {name: upstream.pool_stats() for name, upstream in self.upstreams.items()}
+
+    def breaker_stats(self) -> dict:
+        return {name: upstream.breaker.stats() for name, upstream in self.upstreams.items()}
+
+    def concurrency_stats(self) -> dict:
+        return {name: upstream.limiter.stats() for name, upstream in self.upstreams.items()}
+
+    def retry_stats(self) -> dict:
+        return {
+            "budget": self.retry_budget.stats(),
+            "services": {name: upstream.retry.stats() for name, upstream in self.upstreams.items()},
+        }
+
+    async def close(self) -> None:
+        for upstream in self.upstreams.values():
+            await upstream.close()
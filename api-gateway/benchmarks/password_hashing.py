@@ -0,0 +1,50 @@
+"""
+Пропускная способность хеширования (регистрация) и проверки (вход) паролей в зависимости от числа потоков пула.
+
+Запуск из каталога api-gateway:
+    python benchmarks/password_hashing.py [--operations 64] [--workers 1 2 4]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+for name, value in {
+    "DB_USER": "bench",
+    "DB_PASSWORD": "bench",
+    "DB_NAME": "bench",
+    "JWT_SECRET_KEY": "benchmarksecretkeyatleast32charslong1234",
+}.items():
+    os.environ.setdefault(name, value)
+
+from app.utils.auth import get_password_hash
+from app.utils.hashing import PasswordHasher
+
+
+async def run(operation, operations: int) -> float:
+    """Выполняет operations операций одновременно, возвращает количество операций в секунду."""
+    started = time.perf_counter()
+    await asyncio.gather(*(operation() for _ in range(operations)))
+    return operations / (time.perf_counter() - started)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--operations", type=int, default=64)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    hashed_password = get_password_hash("benchmark-password")
+    print(f"cpu_count={os.cpu_count()} operations={args.operations}")
+    for workers in args.workers:
+        hasher = PasswordHasher(workers, max_queue=args.operations)
+        register = await run(lambda: hasher.hash("benchmark-password"), args.operations)
+        login = await run(lambda: hasher.verify("benchmark-password", hashed_password), args.operations)
+        hasher.shutdown()
+        print(f"workers={workers:<3} register: {register:7.1f} ops/s   login: {login:7.1f} ops/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
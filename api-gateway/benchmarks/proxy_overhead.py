@@ -0,0 +1,124 @@
+"""
+Накладные расходы gateway на проксируемый запрос: роутер FastAPI против ASGI-обработчика ProxyFastPathMiddleware.
+Микросервис подменяется заглушкой, отвечающей сразу, поэтому измеряется только работа самого gateway.
+
+Запуск из каталога api-gateway:
+    python benchmarks/proxy_overhead.py [--requests 20000]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+for name, value in {
+    "DB_USER": "bench",
+    "DB_PASSWORD": "bench",
+    "DB_NAME": "bench",
+    "JWT_SECRET_KEY": "benchmarksecretkeyatleast32charslong1234",
+    "MICRO_SERVICES": '{"goods": "http://goods:8000"}',
+    "PROXY_FAST_PATH": "false",  # обходной путь подключается вручную
+    "LOG_LEVEL": "error",
+}.items():
+    os.environ.setdefault(name, value)
+
+from app.config import settings
+from app.main import app
+from app.middleware import ProxyFastPathMiddleware
+from app.models import User
+from app.utils.auth import create_access_token
+from app.utils.cache import ResponseCache
+from app.utils.single_flight import SingleFlight
+from app.utils.token_cache import TokenCache
+from app.utils.upstream import UpstreamRegistry
+
+BODY = b'{"id": 1, "name": "item"}'
+
+
+class StubContent:
+    async def iter_chunked(self, size: int):
+        yield BODY
+
+
+class StubResponse:
+    status = 200
+    headers = {"Content-Type": "application/json", "Content-Length": str(len(BODY))}
+    content = StubContent()
+
+    async def read(self) -> bytes:
+        return BODY
+
+
+class StubRequest:
+    async def __aenter__(self):
+        return StubResponse()
+
+    async def __aexit__(self, *args):
+        return False
+
+
+async def run(asgi_app, scope: dict, requests: int) -> float:
+    """Выполняет requests запросов, возвращает среднее время на запрос в мкс."""
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.Event().wait()  # клиент не отключается до конца ответа
+
+        await asgi_app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    app.state.upstreams = UpstreamRegistry(settings.MICRO_SERVICES)
+    app.state.response_cache = ResponseCache(settings.CACHE_MAX_BYTES, settings.CACHE_MAX_ENTRY_BYTES)
+    app.state.single_flight = SingleFlight()
+    app.state.token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+
+    token = create_access_token(User(id=1, role="user"))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("gateway", 8000),
+        "client": ("127.0.0.1", 50000),
+        "root_path": "",
+        "path": "/api/goods/products/1",
+        "raw_path": b"/api/goods/products/1",
+        "query_string": b"",
+        "headers": [(b"host", b"gateway"), (b"accept", b"application/json"),
+                    (b"authorization", f"Bearer {token}".encode())],
+        "app": app,
+    }
+
+    with patch("aiohttp.ClientSession.request", lambda *a, **kw: StubRequest()):
+        fast_app = ProxyFastPathMiddleware(app)
+        await run(app, scope, 1000)  # прогрев
+        await run(fast_app, scope, 1000)
+        router = await run(app, scope, args.requests)
+        fast_path = await run(fast_app, scope, args.requests)
+
+    await app.state.upstreams.close()
+    print(f"requests={args.requests}")
+    print(f"fastapi router: {router:8.1f} us/request")
+    print(f"asgi fast path: {fast_path:8.1f} us/request (x{router / fast_path:.1f})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+"""
+Сравнение затрат на проверку access-токена в прокси с кэшем проверенных токенов и без него.
+
+Запуск из каталога api-gateway:
+    python benchmarks/token_cache.py [--requests 20000] [--concurrency 100]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+for name, value in {
+    "DB_USER": "bench",
+    "DB_PASSWORD": "bench",
+    "DB_NAME": "bench",
+    "JWT_SECRET_KEY": "benchmarksecretkeyatleast32charslong1234",
+}.items():
+    os.environ.setdefault(name, value)
+
+from app.models import User
+from app.utils.auth import create_access_token, verify_access_token
+from app.utils.token_cache import TokenCache
+
+
+async def run(token_cache: TokenCache, tokens: list[str], requests: int, concurrency: int) -> float:
+    """Проверяет токены requests раз (concurrency одновременно), возвращает среднее время на запрос в мкс."""
+    async def worker(offset: int):
+        for i in range(offset, requests, concurrency):
+            await verify_access_token(tokens[i % len(tokens)], token_cache)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--users", type=int, default=1000, help="количество различных токенов")
+    args = parser.parse_args()
+
+    tokens = [create_access_token(User(id=i, role="user")) for i in range(args.users)]
+    uncached = await run(TokenCache(0), tokens, args.requests, args.concurrency)
+    cached = await run(TokenCache(args.users), tokens, args.requests, args.concurrency)
+
+    print(f"requests={args.requests} concurrency={args.concurrency} tokens={args.users}")
+    print(f"uncached: {uncached:8.1f} us/request")
+    print(f"cached:   {cached:8.1f} us/request (x{uncached / cached:.1f})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
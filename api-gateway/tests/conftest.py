@@ -2,8 +2,10 @@ import logging
 import sys
 import os
 from typing import AsyncGenerator
+import aiohttp
 from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, patch, MagicMock
+import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
@@ -13,17 +15,52 @@ from asgi_lifespan import LifespanManager
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from app.config import settings as app_settings
+from app.config import settings as app_settings, ServiceSettings
 from app.database import Base, get_session
 from app.main import app
-from app.models import RefreshToken, User
-from app.utils.auth import get_password_hash
+from app.tracing import trace_engine
+from app.models import OutboxMessage, RefreshToken, User
+from app.utils.auth import get_password_hash, hash_refresh_token
 
 # Настройка тестовых значений
-app_settings.MICRO_SERVICES = {"mock_service": "http://mock_service:8000", "profiles": "http://mock-profile-service"}
+app_settings.MICRO_SERVICES = {
+    "mock_service": "http://mock_service:8000",
+    "buffered_service": "http://buffered_service:8000",
+    "cached_service": "http://cached_service:8000",
+    "coalesced_service": "http://coalesced_service:8000",
+    "fragile_service": "http://fragile_service:8000",
+    "replicated_service": ["http://replicated_service_1:8000", "http://replicated_service_2:8000"],
+    "retried_service": ["http://retried_service_1:8000", "http://retried_service_2:8000"],
+    "limited_service": "http://limited_service:8000",
+    "throttled_service": "http://throttled_service:8000",
+    "profiles": "http://mock-profile-service",
+    "goods": "http://mock-goods-service",
+}
+app_settings.MICRO_SERVICES_SETTINGS = {
+    "buffered_service": ServiceSettings(buffered=True, pool_limit=5, connect_timeout="1 second", read_timeout=2),
+    "cached_service": ServiceSettings(cache=True, cache_ttl=60),
+    "coalesced_service": ServiceSettings(coalesce=True),
+    "fragile_service": ServiceSettings(breaker={"window_size": 4, "min_calls": 2, "open_timeout": "1 minute"}),
+    "replicated_service": ServiceSettings(
+        breaker={"enabled": False}, balancer={"consecutive_failures": 2, "ejection_time": "1 minute"}
+    ),
+    "limited_service": ServiceSettings(rate_limit={"requests": 2, "period": "1 minute"}),
+    "throttled_service": ServiceSettings(
+        concurrency={"enabled": True, "initial_limit": 1, "max_limit": 1, "max_queue": 1, "queue_timeout": "1 second"}
+    ),
+    "retried_service": ServiceSettings(
+        breaker={"enabled": False}, retry={"methods": ["GET"], "hedge": True, "hedge_min_delay": 0.05}
+    ),
+}
 app_settings.JWT_SECRET_KEY = "testsecretkeyatleast32charslong1234567890"
 app_settings.DEBUG = True
 app_settings.LOG_LEVEL = logging.ERROR
+app_settings.STATS_TOKEN = "teststatstoken"
+app_settings.METRICS_TOKEN = "testmetricstoken"
+app_settings.OUTBOX_DISPATCH_INTERVAL = 0  # сообщения outbox доставляются в тестах вызовом dispatch()
+
+STATS_HEADERS = {"X-Stats-Token": app_settings.STATS_TOKEN}
+METRICS_HEADERS = {"Authorization": f"Bearer {app_settings.METRICS_TOKEN}"}
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
@@ -33,6 +70,7 @@ test_engine = create_async_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
+trace_engine(test_engine)  # SQL-запросы тестовой БД учитываются в Server-Timing, как в приложении
 test_async_session_maker = async_sessionmaker(
     test_engine, expire_on_commit=False, class_=AsyncSession
 )
@@ -51,6 +89,7 @@ app.dependency_overrides[get_session] = override_get_session
 @pytest_asyncio.fixture(autouse=True)
 def override_engine(monkeypatch):
     monkeypatch.setattr("app.database.engine", test_engine)
+    monkeypatch.setattr("app.services.auth.async_session_maker", test_async_session_maker)
 
 
 @pytest_asyncio.fixture(scope="session", autouse=True)
@@ -65,10 +104,11 @@ async def setup_database():
 
 @pytest_asyncio.fixture(scope="function", autouse=True)
 async def clear_tables():
-    """Очищает таблицы RefreshToken и User после каждого теста."""
+    """Очищает таблицы RefreshToken, OutboxMessage и User после каждого теста."""
     yield
     async with test_async_session_maker() as session:
         async with session.begin():
+            await session.execute(delete(OutboxMessage))
             await session.execute(delete(RefreshToken))
             await session.execute(delete(User))
         await session.commit()
@@ -106,7 +146,7 @@ async def test_refresh_token(test_user: User) -> RefreshToken:
     async with test_async_session_maker() as session:
         expire = datetime.now(timezone.utc) + timedelta(days=7)
         token = RefreshToken(
-            user_id=test_user.id, token="testrefreshtoken", expires_at=expire
+            user_id=test_user.id, token_hash=hash_refresh_token("testrefreshtoken"), expires_at=expire
         )
         session.add(token)
         await session.commit()
@@ -116,16 +156,53 @@ async def test_refresh_token(test_user: User) -> RefreshToken:
 @pytest_asyncio.fixture(autouse=True)
 async def mock_profile_service():
     """
-    Перехватывает вызовы aiohttp.ClientSession.post.
-    Имитирует успешный ответ (201 Created) от сервиса профилей.
+    Перехватывает вызовы aiohttp.ClientSession.request к сервису профилей.
+    Имитирует успешный ответ (201 Created), остальные запросы передаёт дальше.
+    """
+    original_request = aiohttp.ClientSession.request
+
+    def request(self, method, url, **kwargs):
+        if str(url).startswith(app_settings.MICRO_SERVICES["profiles"]):
+            return mock_upstream_response(201, b'{"id": 1, "username": "testuser"}')
+        return original_request(self, method, url, **kwargs)
+
+    with patch("aiohttp.ClientSession.request", request):
+        yield
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    """Подменяет time.monotonic управляемыми из теста часами."""
+    fake_clock = FakeClock()
+    monkeypatch.setattr("time.monotonic", fake_clock)
+    return fake_clock
+
+
+def mock_upstream_response(status: int = 200, body: bytes = b"", headers: dict | None = None) -> MagicMock:
+    """
+    Создаёт контекстный менеджер, имитирующий ответ aiohttp от микросервиса.
+    Поддерживает как буферизованное чтение, так и потоковое (iter_chunked).
     """
     mock_response = MagicMock()
-    mock_response.status = 201
-    mock_response.text = AsyncMock(return_value='{"id": 1, "username": "testuser"}')
+    mock_response.status = status
+    mock_response.read = AsyncMock(return_value=body)
+    mock_response.headers = headers if headers is not None else {}
+
+    async def iter_chunked(size: int):
+        for i in range(0, len(body), size):
+            yield body[i:i + size]
+
+    mock_response.content.iter_chunked = iter_chunked
 
     mock_context = MagicMock()
     mock_context.__aenter__ = AsyncMock(return_value=mock_response)
-    mock_context.__aexit__ = AsyncMock(return_value=None)
-
-    with patch("aiohttp.ClientSession.post", return_value=mock_context):
-        yield
+    mock_context.__aexit__ = AsyncMock(return_value=False)
+    return mock_context
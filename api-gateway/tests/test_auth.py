@@ -1,6 +1,17 @@
+import asyncio
+import hashlib
 import pytest
+from datetime import datetime, timedelta, timezone
 from httpx import AsyncClient
-from app.utils.auth import decode_access_token
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models import RefreshToken, User
+from app.repositories.refresh_token import rotate_refresh_token, rotate_refresh_token_stmt
+from app.utils.auth import decode_access_token, hash_refresh_token
+from conftest import test_async_session_maker, test_engine
 
 
 @pytest.mark.asyncio
@@ -52,6 +63,35 @@ async def test_login_invalid_credentials(async_client: AsyncClient):
     assert response.json()["detail"] == "Invalid username or password"
 
 
+@pytest.mark.asyncio
+async def test_login_single_transaction(async_client: AsyncClient):
+    """Вход: выборка пользователя, удаление прежних токенов и вставка нового - одна транзакция с одним commit."""
+    user_data = {"username": "testuser", "password": "testpass"}
+    await async_client.post("/api/auth/register", json=user_data)
+    statements, commits = [], []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement.split()[0])
+
+    def count_commit(conn):
+        commits.append(conn)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", count_statement)
+    event.listen(test_engine.sync_engine, "commit", count_commit)
+    try:
+        response = await async_client.post("/api/auth/login", json=user_data)
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", count_statement)
+        event.remove(test_engine.sync_engine, "commit", count_commit)
+
+    assert response.status_code == 200
+    assert statements == ["SELECT", "DELETE", "INSERT"]
+    assert len(commits) == 1
+    async with test_async_session_maker() as session:
+        stored = (await session.execute(select(RefreshToken))).scalars().all()
+    assert [token.token_hash for token in stored] == [hash_refresh_token(response.cookies["refresh_token"])]
+
+
 @pytest.mark.asyncio
 async def test_refresh_success(async_client: AsyncClient):
     """Проверка успешного обновления access-токена с refresh-токеном."""
@@ -87,6 +127,86 @@ async def test_refresh_invalid_token(async_client: AsyncClient):
     assert response.json()["detail"] == "Invalid or expired refresh token"
 
 
+@pytest.mark.asyncio
+async def test_refresh_token_single_use(async_client: AsyncClient, test_refresh_token):
+    """Refresh-токен действует один раз, новый токен после ротации действует."""
+    headers = {"Cookie": "refresh_token=testrefreshtoken"}
+    responses = [await async_client.post("/api/auth/refresh", headers=headers) for _ in range(3)]
+    assert sorted(response.status_code for response in responses) == [200, 401, 401]
+
+    new_refresh = next(response for response in responses if response.status_code == 200).cookies["refresh_token"]
+    response = await async_client.post("/api/auth/refresh", headers={"Cookie": f"refresh_token={new_refresh}"})
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_concurrent_rotation(tmp_path):
+    """Из одновременных ротаций одного refresh-токена успешна только одна."""
+    # Отдельное соединение на сессию: общая БД тестов (StaticPool) не даёт транзакциям выполняться параллельно
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'auth.db'}")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as session:
+            user = User(username="testuser", hashed_password="hash", role="user")
+            session.add(user)
+            await session.flush()
+            expire = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=7)
+            session.add(RefreshToken(user_id=user.id, token_hash=hash_refresh_token("token"), expires_at=expire))
+            await session.commit()
+
+        async def rotate(new_token: str) -> User | None:
+            async with session_maker() as session:
+                return await rotate_refresh_token(session, "token", new_token)
+
+        new_tokens = ["newtoken1", "newtoken2"]
+        users = await asyncio.gather(*(rotate(new_token) for new_token in new_tokens))
+        winners = [new_token for new_token, user in zip(new_tokens, users) if user is not None]
+        assert len(winners) == 1
+
+        async with session_maker() as session:
+            stored = (await session.execute(select(RefreshToken.token_hash))).scalars().all()
+        assert stored == [hash_refresh_token(winners[0])]
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_stored_hashed(async_client: AsyncClient):
+    """В БД хранится только SHA-256 refresh-токена."""
+    user_data = {"username": "testuser", "password": "testpass"}
+    response = await async_client.post("/api/auth/register", json=user_data)
+    refresh_token = response.cookies["refresh_token"]
+
+    async with test_async_session_maker() as session:
+        stored = (await session.execute(select(RefreshToken))).scalars().all()
+    assert [token.token_hash for token in stored] == [hashlib.sha256(refresh_token.encode()).digest()]
+    assert len(stored[0].token_hash) == 32
+
+
+@pytest.mark.asyncio
+async def test_refresh_expired_token(async_client: AsyncClient, test_user):
+    """Просроченный refresh-токен отклоняется."""
+    async with test_async_session_maker() as session:
+        expired = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=1)
+        session.add(RefreshToken(user_id=test_user.id, token_hash=hash_refresh_token("expired"), expires_at=expired))
+        await session.commit()
+
+    response = await async_client.post("/api/auth/refresh", headers={"Cookie": "refresh_token=expired"})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid or expired refresh token"
+
+
+def test_rotate_refresh_token_single_statement():
+    """В PostgreSQL ротация выполняется одним запросом."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    sql = str(rotate_refresh_token_stmt("old", "new", now, now).compile(dialect=postgresql.dialect()))
+    assert sql.startswith("WITH old_token AS")
+    assert "DELETE FROM refresh_tokens" in sql and "INSERT INTO refresh_tokens" in sql
+    assert "refresh_tokens.expires_at >=" in sql
+
+
 @pytest.mark.asyncio
 async def test_logout_success(async_client: AsyncClient):
     """Проверка успешного выхода пользователя и удаления refresh-токена."""
@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+import aiohttp
+from httpx import AsyncClient
+from unittest.mock import patch
+
+from app.config import LoadBalancerSettings
+from app.utils.balancer import LoadBalancer
+from conftest import STATS_HEADERS, mock_upstream_response
+
+REPLICAS = ["http://replicated_service_1:8000", "http://replicated_service_2:8000"]
+
+
+def make_balancer(urls: list[str], **kwargs) -> LoadBalancer:
+    balancer_settings = LoadBalancerSettings(consecutive_failures=2, ejection_time=10, max_ejection_time=30)
+    return LoadBalancer("goods", urls, balancer_settings.model_copy(update=kwargs))
+
+
+@pytest.mark.parametrize("strategy", ["least_requests", "p2c"])
+def test_balancer_picks_least_loaded_instance(strategy: str):
+    """Запрос уходит экземпляру с наименьшим числом незавершённых запросов."""
+    balancer = make_balancer(["http://a", "http://b", "http://c"], strategy=strategy)
+    for instance, in_flight in zip(balancer.instances, [5, 0, 5]):
+        instance.in_flight = in_flight
+    picked = {balancer.pick().url for _ in range(50)}
+    # p2c никогда не выбирает самый загруженный из двух случайных экземпляров
+    assert "http://b" in picked
+    if strategy == "least_requests":
+        assert picked == {"http://b"}
+
+
+def test_balancer_ejects_and_readmits_instance(clock):
+    """Экземпляр исключается после ошибок подряд и возвращается по истечении времени исключения."""
+    balancer = make_balancer(["http://a", "http://b"])
+    failing, healthy = balancer.instances
+    balancer.record(failing, success=False)
+    balancer.record(failing, success=False)
+    assert all(balancer.pick() is healthy for _ in range(10))
+
+    clock.now += 10
+    healthy.in_flight = 1
+    assert balancer.pick() is failing
+
+    # Повторное исключение длится дольше
+    balancer.record(failing, success=False)
+    balancer.record(failing, success=False)
+    clock.now += 10
+    assert balancer.pick() is healthy
+    clock.now += 10
+    assert balancer.pick() is failing
+
+
+def test_balancer_keeps_instances_within_max_ejected_percent(clock):
+    """Исключается не больше max_ejected_percent экземпляров, даже если ошибки на всех."""
+    balancer = make_balancer(["http://a", "http://b"])
+    for instance in balancer.instances:
+        balancer.record(instance, success=False)
+        balancer.record(instance, success=False)
+    assert [instance.stats(clock.now)["ejected"] for instance in balancer.instances] == [True, False]
+
+
+@pytest.mark.asyncio
+async def test_proxy_balances_across_replicas(async_client: AsyncClient):
+    """Одновременные запросы распределяются между экземплярами по числу незавершённых запросов."""
+    release = asyncio.Event()
+
+    def request(*args, **kwargs):
+        context = mock_upstream_response(200, b"ok")
+        response = context.__aenter__.return_value
+
+        async def wait_and_respond(*args):
+            await release.wait()
+            return response
+
+        context.__aenter__.side_effect = wait_and_respond
+        return context
+
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request) as mock_request:
+        tasks = [asyncio.create_task(async_client.get("/api/replicated_service/items")) for _ in range(4)]
+        while mock_request.call_count < 4:
+            await asyncio.sleep(0)
+        release.set()
+        responses = await asyncio.gather(*tasks)
+
+    assert all(response.status_code == 200 for response in responses)
+    urls = sorted(call.kwargs["url"] for call in mock_request.call_args_list)
+    assert urls == sorted(f"{replica}/items" for replica in REPLICAS * 2)
+
+    response = await async_client.get("/stats/upstreams", headers=STATS_HEADERS)
+    assert [instance["in_flight"] for instance in response.json()["replicated_service"]["instances"]] == [0, 0]
+
+
+@pytest.mark.asyncio
+async def test_proxy_routes_around_failing_replica(async_client: AsyncClient):
+    """Экземпляр с ошибками соединения исключается, запросы уходят на исправный."""
+    def request(*args, url: str, **kwargs):
+        if url.startswith(REPLICAS[0]):
+            raise aiohttp.ClientConnectorError(connection_key=None, os_error=OSError("Connection refused"))
+        return mock_upstream_response(200, b"ok")
+
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request) as mock_request:
+        statuses = [(await async_client.get("/api/replicated_service/items")).status_code for _ in range(20)]
+        assert statuses.count(503) == 2
+        assert statuses[-5:] == [200] * 5
+
+        mock_request.reset_mock()
+        for _ in range(5):
+            await async_client.get("/api/replicated_service/items")
+        assert all(call.kwargs["url"].startswith(REPLICAS[1]) for call in mock_request.call_args_list)
+
+    response = await async_client.get("/stats/upstreams", headers=STATS_HEADERS)
+    instances = response.json()["replicated_service"]["instances"]
+    assert [instance["ejected"] for instance in instances] == [True, False]
@@ -0,0 +1,149 @@
+import json
+import asyncio
+import pytest
+import aiohttp
+from httpx import AsyncClient
+from unittest.mock import patch
+
+from app.models import User
+from app.utils.auth import create_access_token, decode_access_token
+from conftest import mock_upstream_response
+
+
+def auth_header(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(User(id=user_id, role='user'))}"}
+
+
+@pytest.mark.asyncio
+async def test_batch_executes_sub_requests(async_client: AsyncClient):
+    """Подзапросы выполняются через прокси с одной проверкой токена, ответы возвращаются по порядку."""
+    def request(*args, method: str, url: str, **kwargs):
+        body = json.dumps({"method": method, "url": url, "user": kwargs["headers"].get("X-Auth-User-ID")}).encode()
+        return mock_upstream_response(200, body, {"Content-Type": "application/json"})
+
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request), \
+            patch("app.utils.auth.decode_access_token", wraps=decode_access_token) as mock_decode:
+        response = await async_client.post("/api/batch", headers=auth_header(5), json={"requests": [
+            {"id": "product", "path": "mock_service/products/1?fields=name"},
+            {"id": "profile", "path": "/profiles/profile/me"},
+        ]})
+
+    assert response.status_code == 200
+    product, profile = response.json()["responses"]
+    assert product["id"] == "product"
+    assert product["status"] == 200
+    assert product["body"] == {"method": "GET", "url": "http://mock_service:8000/products/1", "user": "5"}
+    assert profile["body"]["url"] == "http://mock-profile-service/profile/me"
+    assert mock_decode.call_count == 1
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_batch_forwards_json_body(mock_request, async_client: AsyncClient):
+    """Тело подзапроса передаётся микросервису в формате JSON."""
+    mock_request.return_value = mock_upstream_response(201, b"created", {"Content-Type": "text/plain"})
+
+    response = await async_client.post("/api/batch", json={"requests": [
+        {"method": "POST", "path": "mock_service/items", "body": {"name": "item"}},
+    ]})
+
+    sub_response = response.json()["responses"][0]
+    assert sub_response["status"] == 201
+    assert sub_response["body"] == "created"
+    kwargs = mock_request.call_args.kwargs
+    assert kwargs["method"] == "POST"
+    assert kwargs["data"] == b'{"name": "item"}'
+    assert kwargs["headers"]["content-type"] == "application/json"
+
+
+@pytest.mark.asyncio
+async def test_batch_sub_request_errors(async_client: AsyncClient):
+    """Ошибка подзапроса возвращается в его ответе и не влияет на остальные."""
+    def request(*args, url: str, **kwargs):
+        if url.startswith("http://buffered_service"):
+            raise aiohttp.ClientConnectorError(connection_key=None, os_error=OSError("Connection refused"))
+        return mock_upstream_response(200, b"ok")
+
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request):
+        response = await async_client.post("/api/batch", json={"requests": [
+            {"path": "unknown_service/items"},
+            {"path": "buffered_service/items"},
+            {"path": "mock_service/items"},
+        ]})
+
+    assert response.status_code == 200
+    not_found, unavailable, ok = response.json()["responses"]
+    assert not_found["status"] == 404
+    assert not_found["body"]["error"] == "ServiceNotFoundError"
+    assert unavailable["status"] == 503
+    assert ok["status"] == 200
+
+
+@pytest.mark.asyncio
+async def test_batch_concurrency_limit(async_client: AsyncClient, monkeypatch):
+    """Одновременно выполняется не больше BATCH_CONCURRENCY подзапросов."""
+    monkeypatch.setattr("app.services.batch.settings.BATCH_CONCURRENCY", 2)
+    active = {"now": 0, "max": 0}
+
+    def request(*args, **kwargs):
+        context = mock_upstream_response(200, b"ok")
+        response = context.__aenter__.return_value
+
+        async def respond(*args):
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+            return response
+
+        context.__aenter__.side_effect = respond
+        return context
+
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request):
+        response = await async_client.post(
+            "/api/batch", json={"requests": [{"path": f"mock_service/items/{i}"} for i in range(6)]}
+        )
+
+    assert [sub["status"] for sub in response.json()["responses"]] == [200] * 6
+    assert active["max"] == 2
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_batch_respects_service_quota(mock_request, async_client: AsyncClient):
+    """Квота сервиса применяется к каждому подзапросу пакета."""
+    mock_request.return_value = mock_upstream_response(200, b"ok")
+
+    response = await async_client.post(
+        "/api/batch", headers=auth_header(1), json={"requests": [{"path": "limited_service/items"}] * 3}
+    )
+    assert [sub["status"] for sub in response.json()["responses"]] == [200, 200, 429]
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_batch_quota_client_from_trusted_proxy(mock_request, async_client: AsyncClient, monkeypatch):
+    """Анонимный клиент пакета за доверенным прокси определяется по X-Forwarded-For, как и в прокси."""
+    mock_request.return_value = mock_upstream_response(200, b"ok")
+    monkeypatch.setattr("app.utils.rate_limiter.settings.RATE_LIMIT_TRUSTED_PROXIES", 1)
+
+    async def batch(forwarded_for: str) -> list[int]:
+        response = await async_client.post(
+            "/api/batch", headers={"X-Forwarded-For": forwarded_for},
+            json={"requests": [{"path": "limited_service/items"}] * 2},
+        )
+        return [sub["status"] for sub in response.json()["responses"]]
+
+    assert await batch("10.0.0.1") == [200, 200]
+    assert await batch("1.1.1.1, 10.0.0.1") == [429, 429]
+    assert await batch("10.0.0.2") == [200, 200]
+
+
+@pytest.mark.asyncio
+async def test_batch_validation(async_client: AsyncClient):
+    """Пустой пакет, пакет больше BATCH_MAX_REQUESTS и заголовки не в latin-1 отклоняются."""
+    assert (await async_client.post("/api/batch", json={"requests": []})).status_code == 422
+    too_many = [{"path": "mock_service/items"}] * 21
+    assert (await async_client.post("/api/batch", json={"requests": too_many})).status_code == 422
+    not_latin1 = [{"path": "mock_service/items", "headers": {"X-Name": "имя"}}]
+    assert (await async_client.post("/api/batch", json={"requests": not_latin1})).status_code == 422
@@ -0,0 +1,129 @@
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+from starlette.datastructures import QueryParams
+
+from app.models import User
+from app.utils.auth import create_access_token
+from app.utils.cache import ResponseCache, make_request_key, parse_cache_control, freshness_lifetime
+from conftest import STATS_HEADERS, mock_upstream_response
+
+
+def auth_header(user_id: int) -> dict:
+    token = create_access_token(User(id=user_id, role="user"))
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_cache_hit_for_repeated_get(mock_request, async_client: AsyncClient):
+    """Повторный GET отдаётся из кэша без обращения к микросервису."""
+    mock_request.return_value = mock_upstream_response(200, b'{"id": 1}', {"Content-Type": "application/json"})
+
+    first = await async_client.get("/api/cached_service/1", params={"a": "1", "b": "2"})
+    second = await async_client.get("/api/cached_service/1", params={"b": "2", "a": "1"})
+
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "HIT"
+    assert second.content == b'{"id": 1}'
+    assert second.headers["content-type"] == "application/json"
+    assert mock_request.call_count == 1
+
+    stats = (await async_client.get("/stats/cache", headers=STATS_HEADERS)).json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_cache_separates_users(mock_request, async_client: AsyncClient):
+    """Ответы разным пользователям и анонимам кэшируются раздельно."""
+    mock_request.return_value = mock_upstream_response(200, b"data")
+
+    await async_client.get("/api/cached_service/profile")
+    await async_client.get("/api/cached_service/profile", headers=auth_header(1))
+    await async_client.get("/api/cached_service/profile", headers=auth_header(2))
+    response = await async_client.get("/api/cached_service/profile", headers=auth_header(1))
+
+    assert response.headers["x-cache"] == "HIT"
+    assert mock_request.call_count == 3
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_cache_respects_no_store(mock_request, async_client: AsyncClient):
+    """Ответы с Cache-Control: no-store не сохраняются."""
+    mock_request.return_value = mock_upstream_response(200, b"secret", {"Cache-Control": "no-store"})
+
+    await async_client.get("/api/cached_service/secret")
+    response = await async_client.get("/api/cached_service/secret")
+
+    assert response.headers["x-cache"] == "MISS"
+    assert mock_request.call_count == 2
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_cache_revalidates_with_etag(mock_request, async_client: AsyncClient):
+    """Устаревшая запись ревалидируется через If-None-Match, при 304 тело берётся из кэша."""
+    mock_request.return_value = mock_upstream_response(
+        200, b"product", {"Cache-Control": "no-cache", "ETag": '"v1"'}
+    )
+    await async_client.get("/api/cached_service/2")
+
+    mock_request.return_value = mock_upstream_response(304, b"", {"ETag": '"v1"'})
+    response = await async_client.get("/api/cached_service/2")
+
+    assert response.status_code == 200
+    assert response.content == b"product"
+    assert response.headers["x-cache"] == "REVALIDATED"
+    assert mock_request.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_cache_invalidated_by_write(mock_request, async_client: AsyncClient):
+    """Изменяющий запрос к тому же пути удаляет сохранённый ответ."""
+    mock_request.return_value = mock_upstream_response(200, b"old")
+    await async_client.get("/api/cached_service/3")
+    await async_client.put("/api/cached_service/3", json={"name": "new"}, headers=auth_header(1))
+    response = await async_client.get("/api/cached_service/3")
+
+    assert response.headers["x-cache"] == "MISS"
+    assert mock_request.call_count == 3
+
+
+def test_cache_invalidates_parent_collections():
+    """Изменение элемента удаляет сохранённые ответы его коллекций, но не соседних элементов."""
+    cache = ResponseCache(max_bytes=10000, max_entry_bytes=1000)
+    paths = ["products", "products/", "products/1", "products/2", "reviews"]
+    keys = {path: make_request_key("goods", "GET", path, QueryParams("page=1"), {}) for path in paths}
+    for key in keys.values():
+        cache.store(key, 200, {}, b"x", None, 60)
+
+    cache.invalidate("goods", "products/1")
+    assert [path for path, key in keys.items() if cache.get(key) is not None] == ["products/2", "reviews"]
+
+
+def test_cache_lru_eviction():
+    """При превышении бюджета памяти вытесняются давно не использованные записи."""
+    cache = ResponseCache(max_bytes=2000, max_entry_bytes=1000)
+    keys = [make_request_key("goods", "GET", str(i), QueryParams(""), {}) for i in range(3)]
+    assert cache.store(keys[0], 200, {}, b"x" * 500, None, 60)
+    assert cache.store(keys[1], 200, {}, b"x" * 500, None, 60)
+    cache.get(keys[0])  # keys[1] становится самым давним
+    assert cache.store(keys[2], 200, {}, b"x" * 500, None, 60)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.evictions == 1
+    assert cache.size <= cache.max_bytes
+
+
+def test_cache_control_freshness():
+    """Время свежести определяется s-maxage/max-age, no-store запрещает сохранение."""
+    assert freshness_lifetime(parse_cache_control("public, max-age=30"), 5) == 30
+    assert freshness_lifetime(parse_cache_control("max-age=30, s-maxage=10"), 5) == 10
+    assert freshness_lifetime(parse_cache_control("no-store"), 5) is None
+    assert freshness_lifetime(parse_cache_control(None), 5) == 5
@@ -0,0 +1,99 @@
+import pytest
+import aiohttp
+from httpx import AsyncClient
+from unittest.mock import patch
+
+from app.config import CircuitBreakerSettings
+from app.exceptions import ServiceUnavailableError
+from app.utils.circuit_breaker import CircuitBreaker, CircuitState
+from conftest import STATS_HEADERS, mock_upstream_response
+
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    breaker_settings = CircuitBreakerSettings(window_size=4, min_calls=4, open_timeout=10, half_open_probes=2)
+    return CircuitBreaker("goods", breaker_settings.model_copy(update=kwargs))
+
+
+def call(breaker: CircuitBreaker, success: bool = True, latency: float = 0.01) -> None:
+    breaker.acquire()
+    breaker.record(success=success, latency=latency)
+
+
+def test_breaker_opens_on_error_rate(clock):
+    """Цепь размыкается, когда доля ошибок в окне достигает порога."""
+    breaker = make_breaker()
+    call(breaker)
+    call(breaker, success=False)
+    call(breaker)
+    assert breaker.state == CircuitState.CLOSED  # окно ещё не заполнено до min_calls
+    call(breaker, success=False)
+
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(ServiceUnavailableError):
+        breaker.acquire()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_breaker_opens_on_slow_calls(clock):
+    """Цепь размыкается, когда слишком много ответов медленнее порога."""
+    breaker = make_breaker(slow_call_threshold=1.0, slow_call_rate=0.75)
+    call(breaker, latency=0.1)
+    for _ in range(3):
+        call(breaker, latency=2.0)
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_breaker_half_open_probes(clock):
+    """После open_timeout пропускаются пробные запросы; успешные замыкают цепь, ошибка снова размыкает."""
+    breaker = make_breaker()
+    for _ in range(4):
+        call(breaker, success=False)
+    assert breaker.state == CircuitState.OPEN
+
+    clock.now += 10
+    breaker.acquire()
+    breaker.acquire()
+    assert breaker.state == CircuitState.HALF_OPEN
+    with pytest.raises(ServiceUnavailableError):
+        breaker.acquire()  # пробных запросов не больше half_open_probes
+    breaker.record(success=True, latency=0.01)
+    breaker.record(success=False, latency=0.01)
+    assert breaker.state == CircuitState.OPEN
+
+    clock.now += 10
+    call(breaker)
+    call(breaker)
+    assert breaker.state == CircuitState.CLOSED
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_open_breaker_fails_fast(mock_request, async_client: AsyncClient):
+    """При разомкнутой цепи gateway сразу отвечает 503, не обращаясь к сервису."""
+    mock_request.side_effect = aiohttp.ClientConnectorError(
+        connection_key=None, os_error=OSError("Connection failed")
+    )
+    for _ in range(2):
+        response = await async_client.get("/api/fragile_service/path")
+        assert response.status_code == 503
+
+    response = await async_client.get("/api/fragile_service/path")
+    assert response.status_code == 503
+    assert response.json()["error"] == "ServiceUnavailableError"
+    assert mock_request.call_count == 2
+
+    stats = (await async_client.get("/stats/breakers", headers=STATS_HEADERS)).json()
+    assert stats["fragile_service"]["state"] == "open"
+    assert stats["mock_service"]["state"] == "closed"
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_upstream_5xx_counts_as_failure(mock_request, async_client: AsyncClient):
+    """Ответы 5xx микросервиса учитываются как ошибки и передаются клиенту как есть."""
+    mock_request.return_value = mock_upstream_response(502, b"bad gateway")
+    response = await async_client.get("/api/fragile_service/path")
+    assert response.status_code == 502
+
+    stats = (await async_client.get("/stats/breakers", headers=STATS_HEADERS)).json()
+    assert stats["fragile_service"]["failure_rate"] == 1.0
@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+
+from app.utils.single_flight import SingleFlight
+from conftest import STATS_HEADERS, mock_upstream_response
+from test_cache import auth_header
+
+
+def slow_upstream_response(release: asyncio.Event, body: bytes = b"shared"):
+    """Ответ микросервиса, который приходит только после release.set()."""
+    mock_context = mock_upstream_response(200, body)
+    upstream_response = mock_context.__aenter__.return_value
+
+    async def wait_for_release(*args, **kwargs):
+        await release.wait()
+        return upstream_response
+
+    mock_context.__aenter__.side_effect = wait_for_release
+    return mock_context
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_concurrent_gets_share_upstream_call(mock_request, async_client: AsyncClient):
+    """Одновременные одинаковые GET-запросы выполняются одним вызовом микросервиса."""
+    release = asyncio.Event()
+    mock_request.return_value = slow_upstream_response(release)
+
+    requests = [asyncio.create_task(async_client.get("/api/coalesced_service/1")) for _ in range(5)]
+    await asyncio.sleep(0.05)
+    release.set()
+    responses = await asyncio.gather(*requests)
+
+    assert [r.content for r in responses] == [b"shared"] * 5
+    assert mock_request.call_count == 1
+    stats = (await async_client.get("/stats/coalescing", headers=STATS_HEADERS)).json()
+    assert stats == {"executions": 1, "shared": 4, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_coalescing_never_merges_different_users(mock_request, async_client: AsyncClient):
+    """Запросы с разными заголовками авторизации не объединяются."""
+    release = asyncio.Event()
+    mock_request.return_value = slow_upstream_response(release)
+
+    requests = [
+        asyncio.create_task(async_client.get("/api/coalesced_service/me", headers=auth_header(1))),
+        asyncio.create_task(async_client.get("/api/coalesced_service/me", headers=auth_header(2))),
+        asyncio.create_task(async_client.get("/api/coalesced_service/me")),
+    ]
+    await asyncio.sleep(0.05)
+    release.set()
+    await asyncio.gather(*requests)
+
+    assert mock_request.call_count == 3
+    user_ids = {call.kwargs["headers"].get("X-Auth-User-ID") for call in mock_request.call_args_list}
+    assert user_ids == {"1", "2", None}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_leader_cancellation():
+    """Отмена первого ожидающего не прерывает общий вызов для остальных."""
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def call():
+        await release.wait()
+        return "result"
+
+    leader = asyncio.create_task(single_flight.do(("key",), call))
+    follower = asyncio.create_task(single_flight.do(("key",), call))
+    await asyncio.sleep(0)
+    leader.cancel()
+    release.set()
+
+    assert await follower == "result"
+    assert single_flight.executions == 1
+    assert single_flight.calls == {}
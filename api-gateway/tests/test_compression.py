@@ -0,0 +1,129 @@
+import gzip
+import json
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+from asyncio import to_thread
+
+from app.middleware import CompressionMiddleware
+from app.utils.compression import negotiate_encoding, is_compressible
+from conftest import mock_upstream_response
+
+PRODUCTS = json.dumps([{"id": i, "name": f"product {i}", "description": "x" * 50} for i in range(100)]).encode()
+JSON_HEADERS = {"Content-Type": "application/json", "Content-Length": str(len(PRODUCTS)), "ETag": '"v1"'}
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_compress_large_json(mock_request, async_client: AsyncClient):
+    """Большой JSON-ответ сжимается согласованным кодированием."""
+    mock_request.return_value = mock_upstream_response(200, PRODUCTS, JSON_HEADERS)
+
+    response = await async_client.get("/api/buffered_service/products", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert response.headers["etag"] == 'W/"v1"'
+    assert int(response.headers["content-length"]) < len(PRODUCTS)
+    assert response.content == PRODUCTS
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_compress_streamed_response_without_length(mock_request, async_client: AsyncClient, monkeypatch):
+    """Потоковый ответ без Content-Length сжимается по частям."""
+    monkeypatch.setattr("app.services.proxy.settings.PROXY_CHUNK_SIZE", 1024)
+    mock_request.return_value = mock_upstream_response(200, PRODUCTS, {"Content-Type": "application/json"})
+
+    response = await async_client.get("/api/mock_service/products", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.content == PRODUCTS
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("body, headers, accept_encoding", [
+    (b'{"id": 1}', {"Content-Type": "application/json", "Content-Length": "9"}, "gzip"),
+    (PRODUCTS, {"Content-Type": "image/png", "Content-Length": str(len(PRODUCTS))}, "gzip"),
+    (PRODUCTS, JSON_HEADERS, "identity"),
+    (PRODUCTS, JSON_HEADERS, "gzip;q=0"),
+])
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_no_compression(mock_request, body, headers, accept_encoding, async_client: AsyncClient):
+    """Небольшие ответы, неподходящие типы и клиенты без поддержки сжатия получают ответ как есть."""
+    mock_request.return_value = mock_upstream_response(200, body, headers)
+
+    response = await async_client.get("/api/mock_service/products", headers={"Accept-Encoding": accept_encoding})
+    assert "content-encoding" not in response.headers
+    assert response.content == body
+
+
+@pytest.mark.asyncio
+async def test_malformed_content_length_passthrough():
+    """Ответ с некорректным Content-Length передаётся без сжатия, а не завершается ошибкой."""
+    async def app(scope, receive, send):
+        headers = [(b"content-type", b"application/json"), (b"content-length", b"abc")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": PRODUCTS})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "headers": [(b"accept-encoding", b"gzip")]}
+    await CompressionMiddleware(app)(scope, None, send)
+    assert (b"content-length", b"abc") in messages[0]["headers"]
+    assert messages[1]["body"] == PRODUCTS
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_upstream_compressed_response_passthrough(mock_request, async_client: AsyncClient):
+    """Ответ, уже сжатый микросервисом, передаётся без повторного сжатия."""
+    compressed = gzip.compress(PRODUCTS)
+    mock_request.return_value = mock_upstream_response(200, compressed, {
+        "Content-Type": "application/json",
+        "Content-Encoding": "gzip",
+        "Content-Length": str(len(compressed)),
+    })
+
+    response = await async_client.get("/api/mock_service/products", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-length"] == str(len(compressed))
+    assert response.content == PRODUCTS
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_large_body_compressed_in_thread(mock_request, async_client: AsyncClient, monkeypatch):
+    """Части ответа больше порога сжимаются в отдельном потоке."""
+    monkeypatch.setattr("app.middleware.settings.COMPRESSION_THREAD_THRESHOLD", 1024)
+    mock_request.return_value = mock_upstream_response(200, PRODUCTS, JSON_HEADERS)
+
+    with patch("app.middleware.to_thread", wraps=to_thread) as mock_to_thread:
+        response = await async_client.get("/api/mock_service/products", headers={"Accept-Encoding": "gzip"})
+
+    assert response.content == PRODUCTS
+    mock_to_thread.assert_called()
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip, deflate", "gzip"),
+    ("br;q=1.0, gzip;q=0.5", "gzip"),  # br выбирается только если установлен brotli
+    ("*", "gzip"),
+    ("*, gzip;q=0", None),
+    ("deflate", None),
+    (None, None),
+])
+def test_negotiate_encoding(accept_encoding, expected, monkeypatch):
+    monkeypatch.setattr("app.utils.compression.COMPRESSORS", {"gzip": object})
+    assert negotiate_encoding(accept_encoding, ["br", "zstd", "gzip"]) == expected
+
+
+def test_is_compressible():
+    allowed = ["application/json", "text/"]
+    assert is_compressible("application/json; charset=utf-8", allowed)
+    assert is_compressible("text/html", allowed)
+    assert not is_compressible("application/octet-stream", allowed)
+    assert not is_compressible(None, allowed)
@@ -0,0 +1,153 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+
+from app.config import ConcurrencyLimitSettings
+from app.exceptions import ServiceUnavailableError
+from app.main import app
+from app.utils.concurrency import ConcurrencyLimiter
+from conftest import STATS_HEADERS, mock_upstream_response
+
+
+def make_limiter(**kwargs) -> ConcurrencyLimiter:
+    limit_settings = ConcurrencyLimitSettings(
+        enabled=True, initial_limit=2, max_limit=4, max_queue=1, queue_timeout=0.05
+    )
+    return ConcurrencyLimiter("goods", limit_settings.model_copy(update=kwargs))
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_and_hands_over():
+    """Запрос сверх лимита ждёт в очереди и получает место освободившегося."""
+    limiter = make_limiter()
+    await limiter.acquire()
+    await limiter.acquire()
+
+    waiting = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.stats() == {"limit": 2, "in_flight": 2, "queued": 1, "shed": 0}
+
+    limiter.release()
+    await waiting
+    assert limiter.stats() == {"limit": 2, "in_flight": 2, "queued": 0, "shed": 0}
+
+
+@pytest.mark.asyncio
+async def test_limiter_sheds_when_queue_is_full_or_times_out():
+    """При переполнении очереди и по таймауту ожидания запрос сразу отклоняется с 503."""
+    limiter = make_limiter()
+    await limiter.acquire()
+    await limiter.acquire()
+    waiting = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(ServiceUnavailableError):
+        await limiter.acquire()  # очередь заполнена
+    with pytest.raises(ServiceUnavailableError):
+        await waiting  # истёк queue_timeout
+    assert limiter.stats() == {"limit": 2, "in_flight": 2, "queued": 0, "shed": 2}
+
+
+@pytest.mark.asyncio
+async def test_limiter_cancelled_waiter_leaves_queue():
+    """Отменённый запрос покидает очередь и не занимает место."""
+    limiter = make_limiter(initial_limit=1, queue_timeout=10)
+    await limiter.acquire()
+    waiting = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    limiter.release()
+    assert limiter.stats()["queued"] == 0
+    assert limiter.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_aimd():
+    """Лимит растёт при успешных ответах под нагрузкой и уменьшается при перегрузке сервиса."""
+    limiter = make_limiter(backoff_ratio=0.5, latency_threshold=1.0)
+    limiter.record(0.01, 200)
+    assert limiter.limit == 2  # лимит не используется, рост не нужен
+
+    await limiter.acquire()
+    limiter.record(0.01, 200)
+    assert limiter.limit == 3
+    limiter.record(0.01, 200)
+    assert limiter.limit == 3  # используется меньше половины лимита
+    await limiter.acquire()
+    limiter.record(0.01, 200)
+    limiter.record(0.01, 200)
+    assert limiter.limit == 4  # не выше max_limit
+
+    limiter.record(2.0, 200)
+    assert limiter.limit == 2
+    limiter.record(0.01, 503)
+    assert limiter.limit == 1
+    limiter.record(0.01, None)
+    assert limiter.limit == 1  # не ниже min_limit
+
+
+@pytest.mark.asyncio
+async def test_proxy_sheds_excess_requests(async_client: AsyncClient):
+    """Запросы сверх лимита и очереди сервиса отклоняются с 503, не обращаясь к сервису."""
+    release = asyncio.Event()
+
+    def request(*args, **kwargs):
+        context = mock_upstream_response(200, b"ok")
+        response = context.__aenter__.return_value
+
+        async def respond(*args):
+            await release.wait()
+            return response
+
+        context.__aenter__.side_effect = respond
+        return context
+
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request) as mock_request:
+        first = asyncio.create_task(async_client.get("/api/throttled_service/items"))
+        queued = asyncio.create_task(async_client.get("/api/throttled_service/items"))
+        await asyncio.sleep(0.05)
+
+        response = await async_client.get("/api/throttled_service/items")
+        assert response.status_code == 503
+        assert response.json()["detail"] == "Service throttled_service is overloaded"
+        stats = (await async_client.get("/stats/concurrency", headers=STATS_HEADERS)).json()["throttled_service"]
+        assert stats == {"limit": 1, "in_flight": 1, "queued": 1, "shed": 1}
+
+        release.set()
+        assert (await first).status_code == 200
+        assert (await queued).status_code == 200
+        assert mock_request.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_streamed_response_holds_slot(async_client: AsyncClient, monkeypatch):
+    """Потоковый ответ занимает место в лимите, пока тело не передано клиенту целиком."""
+    monkeypatch.setattr("app.services.proxy.settings.PROXY_CHUNK_SIZE", 4)
+    limiter = app.state.upstreams.get("throttled_service").limiter
+    in_flight = []
+
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()  # клиент не отключается
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            in_flight.append(limiter.stats()["in_flight"])
+
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http", "root_path": "",
+        "path": "/api/throttled_service/download", "raw_path": b"/api/throttled_service/download",
+        "query_string": b"", "headers": [], "client": ("127.0.0.1", 1234), "server": ("test", 80),
+    }
+    with patch("app.services.proxy.aiohttp.ClientSession.request", return_value=mock_upstream_response(200, b"x" * 10)):
+        await app(scope, receive, send)
+
+    assert in_flight and set(in_flight) == {1}
+    assert limiter.stats()["in_flight"] == 0
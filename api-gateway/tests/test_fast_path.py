@@ -0,0 +1,58 @@
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+
+from app.models import User
+from app.services.proxy import proxy_request
+from app.utils.auth import create_access_token
+from conftest import mock_upstream_response
+
+
+@pytest.mark.asyncio
+async def test_fast_path_bypasses_router(async_client: AsyncClient):
+    """Запрос к зарегистрированному сервису проксируется без роутера FastAPI."""
+    token = create_access_token(User(id=7, role="user"))
+    with patch("app.routers.proxy.proxy_request") as router_proxy, \
+            patch("app.services.proxy.aiohttp.ClientSession.request") as mock_request:
+        mock_request.return_value = mock_upstream_response(200, b"ok", {"Content-Type": "text/plain"})
+        response = await async_client.get(
+            "/api/mock_service/items/1", params={"q": "x"}, headers={"Authorization": f"Bearer {token}"}
+        )
+
+    assert response.status_code == 200
+    assert response.content == b"ok"
+    router_proxy.assert_not_called()
+    kwargs = mock_request.call_args.kwargs
+    assert kwargs["url"] == "http://mock_service:8000/items/1"
+    assert kwargs["params"]["q"] == "x"
+    assert kwargs["headers"]["X-Auth-User-ID"] == "7"
+
+
+@pytest.mark.asyncio
+async def test_fast_path_uses_app_exception_handlers(async_client: AsyncClient):
+    """Ошибки в обходном пути возвращаются обработчиками исключений приложения."""
+    response = await async_client.get("/api/mock_service/items", headers={"Authorization": "Bearer invalid"})
+    assert response.status_code == 401
+    assert response.json()["error"] == "UnauthorizedError"
+
+
+@pytest.mark.asyncio
+async def test_fast_path_ignores_non_bearer_authorization(async_client: AsyncClient):
+    """Заголовок Authorization с другой схемой не считается токеном."""
+    with patch("app.services.proxy.aiohttp.ClientSession.request") as mock_request:
+        mock_request.return_value = mock_upstream_response(200, b"ok")
+        response = await async_client.get("/api/mock_service/items", headers={"Authorization": "Basic dXNlcjpwYXNz"})
+
+    assert response.status_code == 200
+    assert "X-Auth-User-ID" not in mock_request.call_args.kwargs["headers"]
+
+
+@pytest.mark.asyncio
+async def test_unknown_service_handled_by_router(async_client: AsyncClient):
+    """Запросы к незарегистрированным сервисам обрабатывает роутер FastAPI."""
+    with patch("app.routers.proxy.proxy_request", wraps=proxy_request) as router_proxy:
+        response = await async_client.get("/api/unknown_service/items")
+
+    assert response.status_code == 404
+    assert response.json()["error"] == "ServiceNotFoundError"
+    router_proxy.assert_called_once()
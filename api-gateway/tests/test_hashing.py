@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+from passlib.context import CryptContext
+
+from app.exceptions import ServiceUnavailableError
+from app.repositories.user import get_user_by_username, update_password_hash
+from app.utils.auth import password_context_settings
+from app.utils.hashing import PasswordHasher, password_hasher
+from conftest import test_async_session_maker
+
+
+@pytest.mark.asyncio
+async def test_hasher_uses_own_pool():
+    """Хеширование и проверка выполняются в отдельном пуле потоков."""
+    hasher = PasswordHasher(workers=1, max_queue=0)
+    threads = []
+
+    def hash_password(password):
+        threads.append(threading.current_thread().name)
+        return f"hashed-{password}"
+
+    with patch("app.utils.hashing.get_password_hash", hash_password):
+        assert await hasher.hash("secret") == "hashed-secret"
+    assert threads[0].startswith("password-hash")
+    assert hasher.pending == 0
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hasher_rejects_when_saturated():
+    """Операции сверх потоков и очереди сразу отклоняются."""
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    release = threading.Event()
+
+    def hash_password(password):
+        release.wait()
+        return password
+
+    with patch("app.utils.hashing.get_password_hash", hash_password):
+        running = [asyncio.create_task(hasher.hash("first")), asyncio.create_task(hasher.hash("second"))]
+        await asyncio.sleep(0)
+        with pytest.raises(ServiceUnavailableError):
+            await hasher.hash("third")
+        release.set()
+        assert await asyncio.gather(*running) == ["first", "second"]
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_login_overloaded(async_client: AsyncClient, monkeypatch):
+    """При переполненной очереди хеширования вход отвечает 503."""
+    user_data = {"username": "busy", "password": "testpass"}
+    await async_client.post("/api/auth/register", json=user_data)
+    monkeypatch.setattr(password_hasher, "pending", password_hasher.workers + password_hasher.max_queue)
+
+    response = await async_client.post("/api/auth/login", json=user_data)
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Password hashing is overloaded"
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_password(async_client: AsyncClient, monkeypatch):
+    """После входа хэш с другой стоимостью пересчитывается с текущими параметрами."""
+    user_data = {"username": "rehash", "password": "testpass"}
+    await async_client.post("/api/auth/register", json=user_data)
+    async with test_async_session_maker() as session:
+        old_hash = (await get_user_by_username(session, "rehash")).hashed_password
+    monkeypatch.setattr(
+        "app.utils.auth.pwd_context", CryptContext(schemes=["bcrypt"], **password_context_settings("bcrypt", 4))
+    )
+
+    response = await async_client.post("/api/auth/login", json=user_data)
+    assert response.status_code == 200
+    async with test_async_session_maker() as session:
+        new_hash = (await get_user_by_username(session, "rehash")).hashed_password
+    assert new_hash != old_hash
+    assert new_hash.startswith("$2b$04$")
+
+    assert (await async_client.post("/api/auth/login", json=user_data)).status_code == 200
+    async with test_async_session_maker() as session:
+        assert (await get_user_by_username(session, "rehash")).hashed_password == new_hash
+
+
+@pytest.mark.asyncio
+async def test_update_password_hash_rolls_back(async_client: AsyncClient):
+    """Ошибка commit при замене хэша откатывает транзакцию, хэш остаётся прежним."""
+    await async_client.post("/api/auth/register", json={"username": "rollback", "password": "testpass"})
+    async with test_async_session_maker() as session:
+        user = await get_user_by_username(session, "rollback")
+        user_id, old_hash = user.id, user.hashed_password
+        with patch.object(session, "commit", side_effect=RuntimeError("commit failed")):
+            with pytest.raises(RuntimeError):
+                await update_password_hash(session, user_id, old_hash, "new-hash")
+        assert not session.in_transaction()
+
+    async with test_async_session_maker() as session:
+        assert (await get_user_by_username(session, "rollback")).hashed_password == old_hash
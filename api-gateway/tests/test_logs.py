@@ -0,0 +1,59 @@
+import json
+import logging
+import threading
+import pytest
+
+from app import logs
+from app.config import settings
+from app.logs import SamplingFilter, setup_logging, shutdown_logging
+from app.tracing import Trace, current_trace
+
+
+def make_record(name: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord(name, level, "", 0, "message", (), None)
+
+
+@pytest.fixture
+def queued_logging():
+    """Настраивает очередь логов в рамках теста и восстанавливает настройки приложения."""
+    yield setup_logging
+    setup_logging(debug=settings.DEBUG, level=settings.LOG_LEVEL, exclude_extra_fields=["message", "asctime"],
+                  sampling=settings.LOG_SAMPLING)
+
+
+def test_sampling_filter():
+    """Частота логгера действует на его потомков и только на записи уровня INFO и ниже."""
+    sampling = SamplingFilter({"app.middleware": 0, "app.middleware.audit": 1})
+    assert not sampling.filter(make_record("app.middleware"))
+    assert not sampling.filter(make_record("app.middleware.proxy", logging.DEBUG))
+    assert sampling.filter(make_record("app.middleware.audit"))
+    assert sampling.filter(make_record("app.middleware", logging.WARNING))
+    assert sampling.filter(make_record("app.main"))
+
+
+def test_queued_logging(queued_logging, capsys):
+    """Записи выводятся в отдельном потоке с request_id вызывающего кода и дописываются при остановке."""
+    output_threads = []
+
+    class ThreadFilter(logging.Filter):
+        def filter(self, record):
+            output_threads.append(threading.current_thread())
+            return True
+
+    queued_logging(debug=False, level=logging.INFO, sampling={"test.sampled": 0})
+    logs._listener.handlers[0].addFilter(ThreadFilter())
+    token = current_trace.set(Trace("queued-id"))
+    try:
+        logging.getLogger("test.queued").info("first %s", "record", extra={"status": 200})
+        logging.getLogger("test.sampled").info("dropped")
+    finally:
+        current_trace.reset(token)
+    shutdown_logging()
+    logging.getLogger("test.queued").warning("after shutdown")
+
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [record["message"] for record in records] == ["first record", "after shutdown"]
+    assert records[0]["request_id"] == "queued-id"
+    assert records[0]["status"] == 200
+    assert output_threads[0] is not threading.current_thread()  # вывод в потоке QueueListener
+    assert output_threads[1] is threading.current_thread()  # после остановки - синхронный вывод
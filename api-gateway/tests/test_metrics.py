@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.metrics import instrument_engine, monitor_event_loop
+from conftest import METRICS_HEADERS, mock_upstream_response
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_request_and_upstream_metrics(mock_request, async_client: AsyncClient):
+    """Запросы учитываются по шаблону маршрута и статусу, вызовы микросервисов - по сервису."""
+    mock_request.return_value = mock_upstream_response(200, b"ok")
+    proxy_route = {"method": "GET", "route": "/api/{service_name}/{path:path}", "status": "200"}
+    requests_before = sample("http_request_duration_seconds_count", **proxy_route)
+    upstream_before = sample("upstream_request_duration_seconds_count", service="mock_service", status="200")
+
+    await async_client.get("/api/mock_service/items/1")
+    await async_client.get("/api/mock_service/items/2")
+
+    assert sample("http_request_duration_seconds_count", **proxy_route) == requests_before + 2
+    upstream_after = sample("upstream_request_duration_seconds_count", service="mock_service", status="200")
+    assert upstream_after == upstream_before + 2
+
+    assert (await async_client.get("/metrics")).status_code == 401
+    assert (await async_client.get("/metrics", headers={"Authorization": "Bearer wrong"})).status_code == 401
+    response = await async_client.get("/metrics", headers=METRICS_HEADERS)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'route="/api/{service_name}/{path:path}"' in response.text
+    assert "event_loop_lag_seconds" in response.text
+
+
+@pytest.mark.asyncio
+async def test_db_pool_metrics():
+    """Выдача соединений из пула и соединения сверх pool_size."""
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:", poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=1
+    )
+    instrument_engine(engine)
+    checkouts_before = sample("db_pool_checkouts_total")
+
+    async with engine.connect() as first, engine.connect() as second:
+        await first.execute(text("SELECT 1"))
+        await second.execute(text("SELECT 1"))
+        assert sample("db_pool_checked_out") == 2
+        assert sample("db_pool_overflow") == 1
+
+    assert sample("db_pool_checkouts_total") == checkouts_before + 2
+    assert sample("db_pool_checked_out") == 0
+    assert sample("db_pool_overflow") == 0
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_event_loop_monitor():
+    """Задержка event loop и очередь пула потоков измеряются периодически."""
+    monitor = asyncio.create_task(monitor_event_loop(0.01))
+    await asyncio.to_thread(lambda: None)
+    await asyncio.sleep(0.05)
+    monitor.cancel()
+
+    assert sample("event_loop_lag_seconds") >= 0
+    assert REGISTRY.get_sample_value("executor_queue_depth", {"executor": "default"}) == 0
@@ -0,0 +1,162 @@
+import json
+import asyncio
+import pytest
+import aiohttp
+from datetime import datetime, timezone
+from httpx import AsyncClient
+from unittest.mock import patch
+from prometheus_client import REGISTRY
+from sqlalchemy import event, select, update
+
+from app.main import app
+from app.models import OutboxMessage, User
+from app.repositories.outbox import add_outbox_message
+from app.services.outbox import PROFILE_CREATE, OutboxDispatcher
+from conftest import mock_upstream_response, test_async_session_maker, test_engine
+
+
+def make_dispatcher(**kwargs) -> OutboxDispatcher:
+    options = dict(batch_size=2, interval=60, max_attempts=3, retry_delay=1, max_retry_delay=5, lease=60)
+    return OutboxDispatcher(test_async_session_maker, app.state.upstreams, **{**options, **kwargs})
+
+
+def profiles(status: int = 201, error: Exception | None = None):
+    """Имитирует profiles и запоминает заголовки и тела запросов."""
+    calls = []
+
+    def request(*args, headers, data, **kwargs):
+        calls.append((headers, json.loads(data)))
+        if error is not None:
+            raise error
+        return mock_upstream_response(status, b"{}")
+
+    return request, calls
+
+
+async def add_messages(count: int) -> None:
+    async with test_async_session_maker() as session:
+        for user_id in range(1, count + 1):
+            payload = {"user_id": user_id, "body": {"username": f"user{user_id}", "display_name": f"user{user_id}"}}
+            add_outbox_message(session, PROFILE_CREATE, payload, f"{PROFILE_CREATE}:{user_id}")
+        await session.commit()
+
+
+async def outbox_messages() -> list[OutboxMessage]:
+    async with test_async_session_maker() as session:
+        return (await session.execute(select(OutboxMessage).order_by(OutboxMessage.id))).scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_register_single_transaction(async_client: AsyncClient):
+    """Пользователь, сообщение outbox и refresh-токен сохраняются одним commit без обращения к profiles."""
+    commits = []
+
+    def count_commit(conn):
+        commits.append(conn)
+
+    request, calls = profiles(error=aiohttp.ClientConnectorError(connection_key=None, os_error=OSError("refused")))
+    event.listen(test_engine.sync_engine, "commit", count_commit)
+    try:
+        with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request):
+            response = await async_client.post("/api/auth/register", json={"username": "newuser", "password": "pass"})
+    finally:
+        event.remove(test_engine.sync_engine, "commit", count_commit)
+
+    assert response.status_code == 200
+    assert len(commits) == 1
+    assert calls == []
+    async with test_async_session_maker() as session:
+        user = (await session.execute(select(User))).scalar_one()
+    [message] = await outbox_messages()
+    assert message.topic == PROFILE_CREATE
+    assert message.idempotency_key == f"profile.create:{user.id}"
+    assert message.payload == {"user_id": user.id, "body": {"username": "newuser", "display_name": "newuser"}}
+
+
+@pytest.mark.asyncio
+async def test_dispatch_delivers_in_batches(async_client: AsyncClient):
+    """Сообщения доставляются пакетами по batch_size с ключом идемпотентности и удаляются после доставки."""
+    await add_messages(3)
+    request, calls = profiles()
+    dispatcher = make_dispatcher()
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request):
+        assert await dispatcher.dispatch() == 2
+        assert await dispatcher.dispatch() == 1
+        assert await dispatcher.dispatch() == 0
+
+    assert await outbox_messages() == []
+    assert sorted(headers["Idempotency-Key"] for headers, _ in calls) == [
+        "profile.create:1", "profile.create:2", "profile.create:3",
+    ]
+    headers, body = calls[0]
+    assert headers["X-Auth-User-ID"] == "1"
+    assert body == {"username": "user1", "display_name": "user1"}
+
+
+@pytest.mark.asyncio
+async def test_dispatch_retries_with_backoff(async_client: AsyncClient):
+    """Недоставленное сообщение откладывается с растущей задержкой, после max_attempts доставка прекращается."""
+    await add_messages(1)
+    request, calls = profiles(status=503)
+    dispatcher = make_dispatcher()
+    dead = {"topic": PROFILE_CREATE, "result": "dead"}
+    dead_before = REGISTRY.get_sample_value("outbox_messages_total", dead) or 0
+
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request):
+        for attempt in range(1, 4):
+            started = datetime.now(timezone.utc).replace(tzinfo=None)
+            assert await dispatcher.dispatch() == 1
+            assert await dispatcher.dispatch() == 0  # следующая попытка ещё не наступила
+            [message] = await outbox_messages()
+            assert message.attempts == attempt
+            assert message.last_error == "Service profiles returned 503"
+            if attempt < 3:
+                delay = (message.next_attempt_at - started).total_seconds()
+                assert 2 ** (attempt - 1) <= delay < 2 ** (attempt - 1) + 1
+                async with test_async_session_maker() as session:
+                    await session.execute(update(OutboxMessage).values(next_attempt_at=started))
+                    await session.commit()
+
+    assert message.next_attempt_at is None
+    assert len(calls) == 3
+    assert REGISTRY.get_sample_value("outbox_messages_total", dead) == dead_before + 1
+
+
+@pytest.mark.asyncio
+async def test_dispatch_stops_on_client_error(async_client: AsyncClient):
+    """После ответа 4xx (кроме 408 и 429) сообщение не повторяется."""
+    await add_messages(1)
+    request, _ = profiles(status=409)
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request):
+        assert await make_dispatcher().dispatch() == 1
+
+    [message] = await outbox_messages()
+    assert message.next_attempt_at is None
+    assert message.last_error == "Service profiles returned 409"
+
+
+@pytest.mark.asyncio
+async def test_notify_wakes_dispatcher(async_client: AsyncClient):
+    """После notify() сообщения доставляются, не дожидаясь interval."""
+    request, calls = profiles()
+    dispatcher = make_dispatcher()
+    dispatched = asyncio.Event()
+
+    async def dispatch() -> int:
+        count = await OutboxDispatcher.dispatch(dispatcher)
+        dispatched.set()
+        return count
+
+    dispatcher.dispatch = dispatch
+    app.state.outbox = dispatcher
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request):
+        task = asyncio.create_task(dispatcher.run())
+        try:
+            response = await async_client.post("/api/auth/register", json={"username": "newuser", "password": "pass"})
+            await asyncio.wait_for(dispatched.wait(), 1)
+        finally:
+            task.cancel()
+
+    assert response.status_code == 200
+    assert [body for _, body in calls] == [{"username": "newuser", "display_name": "newuser"}]
+    assert await outbox_messages() == []
@@ -0,0 +1,149 @@
+import json
+import asyncio
+import pytest
+import aiohttp
+from httpx import AsyncClient
+from unittest.mock import patch
+
+from conftest import mock_upstream_response
+
+PRODUCT = {
+    "id": 7,
+    "name": "Product",
+    "description": None,
+    "price": 10.0,
+    "image_url": None,
+    "user_id": 1,
+    "rating": 4.5,
+    "reviews_count": 3,
+    "reviews": [
+        {"id": 1, "product_id": 7, "user_id": 2, "rating": 5, "text": "Great"},
+        {"id": 2, "product_id": 7, "user_id": 3, "rating": 4, "text": None},
+        {"id": 3, "product_id": 7, "user_id": 2, "rating": 4, "text": "Still good"},
+    ],
+}
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def upstreams(profiles=None, product: dict = PRODUCT):
+    """Имитирует goods и profiles; profiles(user_ids) возвращает ответ или вызывает ошибку."""
+    calls = []
+
+    def request(*args, url: str, params=None, **kwargs):
+        if url.startswith("http://mock-goods-service"):
+            return mock_upstream_response(200, json.dumps(product).encode(), JSON_HEADERS)
+        user_ids = [int(v) for k, v in params.multi_items() if k == "user_id"]
+        calls.append(user_ids)
+        if profiles is not None:
+            return profiles(user_ids)
+        body = [{"user_id": user_id, "display_name": f"User {user_id}"} for user_id in user_ids]
+        return mock_upstream_response(200, json.dumps(body).encode(), JSON_HEADERS)
+
+    return request, calls
+
+
+@pytest.mark.asyncio
+async def test_product_page(async_client: AsyncClient):
+    """Имена владельца и авторов отзывов получаются одним запросом к profiles."""
+    request, calls = upstreams()
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request):
+        response = await async_client.get("/api/pages/products/7")
+
+    assert response.status_code == 200
+    page = response.json()
+    assert page["name"] == "Product"
+    assert page["owner"] == {"user_id": 1, "display_name": "User 1"}
+    assert [(review["id"], review["user"]["display_name"]) for review in page["reviews"]] == [
+        (1, "User 2"), (2, "User 3"), (3, "User 2"),
+    ]
+    assert page["degraded"] is False
+    assert calls == [[1, 2, 3]]
+
+
+@pytest.mark.asyncio
+async def test_product_page_profiles_batches(async_client: AsyncClient, monkeypatch):
+    """Пользователи запрашиваются пакетами по PAGES_PROFILES_BATCH_SIZE."""
+    monkeypatch.setattr("app.services.pages.settings.PAGES_PROFILES_BATCH_SIZE", 2)
+    request, calls = upstreams()
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request):
+        response = await async_client.get("/api/pages/products/7")
+
+    assert response.json()["reviews"][1]["user"]["display_name"] == "User 3"
+    assert sorted(calls) == [[1, 2], [3]]
+
+
+@pytest.mark.asyncio
+async def test_product_page_profiles_unavailable(async_client: AsyncClient):
+    """Без profiles страница отдаётся без имён пользователей."""
+    def profiles(user_ids):
+        raise aiohttp.ClientConnectorError(connection_key=None, os_error=OSError("Connection refused"))
+
+    request, _ = upstreams(profiles)
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request):
+        response = await async_client.get("/api/pages/products/7")
+
+    assert response.status_code == 200
+    page = response.json()
+    assert page["degraded"] is True
+    assert page["owner"] == {"user_id": 1, "display_name": None}
+    assert len(page["reviews"]) == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("body", [b"<html>", b'{"detail": "error"}', b'[{"id": 1}]'])
+async def test_product_page_profiles_invalid_response(async_client: AsyncClient, body: bytes):
+    """Некорректный ответ profiles не ломает страницу: она отдаётся без имён пользователей."""
+    request, _ = upstreams(lambda user_ids: mock_upstream_response(200, body, JSON_HEADERS))
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request):
+        response = await async_client.get("/api/pages/products/7")
+
+    assert response.status_code == 200
+    assert response.json()["degraded"] is True
+
+
+@pytest.mark.asyncio
+async def test_product_page_profiles_timeout(async_client: AsyncClient, monkeypatch):
+    """Медленный profiles не задерживает страницу дольше PAGES_PROFILES_TIMEOUT."""
+    monkeypatch.setattr("app.services.pages.settings.PAGES_PROFILES_TIMEOUT", 0.01)
+
+    def profiles(user_ids):
+        context = mock_upstream_response(200, b"[]", JSON_HEADERS)
+        response = context.__aenter__.return_value
+
+        async def respond(*args):
+            await asyncio.sleep(1)
+            return response
+
+        context.__aenter__.side_effect = respond
+        return context
+
+    request, _ = upstreams(profiles)
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=request):
+        response = await async_client.get("/api/pages/products/7")
+
+    assert response.status_code == 200
+    assert response.json()["degraded"] is True
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_product_page_not_found(mock_request, async_client: AsyncClient):
+    """Ошибка goods передаётся клиенту, profiles не запрашивается."""
+    mock_request.return_value = mock_upstream_response(404, b'{"error": "NotFoundError"}', JSON_HEADERS)
+
+    response = await async_client.get("/api/pages/products/999")
+    assert response.status_code == 404
+    assert response.json() == {"error": "NotFoundError"}
+    assert mock_request.call_count == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("body", [b"<html>", b'{"id": 7}', b'{"user_id": 1, "reviews": []}'])
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_product_page_goods_invalid_response(mock_request, async_client: AsyncClient, body: bytes):
+    """Некорректный ответ goods возвращается клиенту как 503."""
+    mock_request.return_value = mock_upstream_response(200, body, JSON_HEADERS)
+
+    response = await async_client.get("/api/pages/products/7")
+    assert response.status_code == 503
+    assert response.json()["error"] == "ServiceUnavailableError"
@@ -1,23 +1,23 @@
 import pytest
+from types import SimpleNamespace
 from httpx import AsyncClient
-from unittest.mock import patch, AsyncMock, MagicMock
+from unittest.mock import patch
 import aiohttp
+from app.main import app
 from app.utils.auth import decode_access_token
+from conftest import STATS_HEADERS, mock_upstream_response
+
+
+async def _read_stream(stream) -> bytes:
+    """Вычитывает потоковое тело запроса, переданное в aiohttp."""
+    return b"".join([chunk async for chunk in stream])
 
 
 @pytest.mark.asyncio
 @patch("app.services.proxy.aiohttp.ClientSession.request")
 async def test_proxy_with_valid_token(mock_request, async_client: AsyncClient):
     """Проверка проксирования запроса с валидным access-токеном."""
-    mock_response = MagicMock()
-    mock_response.status = 200
-    mock_response.read = AsyncMock(return_value=b"mock response")
-    mock_response.headers = {"Content-Type": "text/plain"}
-
-    mock_context = MagicMock()
-    mock_context.__aenter__ = AsyncMock(return_value=mock_response)
-    mock_context.__aexit__ = AsyncMock(return_value=False)
-    mock_request.return_value = mock_context
+    mock_request.return_value = mock_upstream_response(200, b"mock response", {"Content-Type": "text/plain"})
 
     # Регистрация и логин для получения токена
     user_data = {"username": "proxyuser", "password": "testpass"}
@@ -44,15 +44,7 @@ async def test_proxy_with_valid_token(mock_request, async_client: AsyncClient):
 @patch("app.services.proxy.aiohttp.ClientSession.request")
 async def test_proxy_without_token(mock_request, async_client: AsyncClient):
     """Проверка проксирования запроса без токена (анонимный доступ)."""
-    mock_response = MagicMock()
-    mock_response.status = 200
-    mock_response.read = AsyncMock(return_value=b"no auth response")
-    mock_response.headers = {"Content-Type": "text/plain"}
-
-    mock_context = MagicMock()
-    mock_context.__aenter__ = AsyncMock(return_value=mock_response)
-    mock_context.__aexit__ = AsyncMock(return_value=False)
-    mock_request.return_value = mock_context
+    mock_request.return_value = mock_upstream_response(200, b"no auth response", {"Content-Type": "text/plain"})
 
     response = await async_client.get("/api/mock_service/noauth/path")
     assert response.status_code == 200
@@ -101,18 +93,31 @@ async def test_proxy_service_unavailable(mock_request, async_client: AsyncClient
     assert response.json()["detail"] == "Service mock_service is unavailable"
 
 
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_proxy_service_timeout(mock_request, async_client: AsyncClient):
+    """Проверка таймаута соединения с сервисом (503)."""
+    mock_request.side_effect = aiohttp.ConnectionTimeoutError()
+
+    response = await async_client.get("/api/mock_service/path")
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Service mock_service is unavailable"
+
+
 @pytest.mark.asyncio
 @patch("app.services.proxy.aiohttp.ClientSession.request")
 async def test_proxy_different_methods(mock_request, async_client: AsyncClient):
-    """Проверка проксирования POST-запроса с передачей данных."""
-    mock_response = MagicMock()
-    mock_response.status = 201
-    mock_response.read = AsyncMock(return_value=b"created")
-    mock_response.headers = {}
-
-    mock_context = MagicMock()
-    mock_context.__aenter__ = AsyncMock(return_value=mock_response)
-    mock_context.__aexit__ = AsyncMock(return_value=False)
+    """Проверка проксирования POST-запроса с потоковой передачей данных."""
+    mock_context = mock_upstream_response(201, b"created")
+    upstream_response = mock_context.__aenter__.return_value
+    received = {}
+
+    async def send_body(*args, **kwargs):
+        # Микросервис вычитывает тело запроса до отправки ответа
+        received["data"] = await _read_stream(mock_request.call_args.kwargs["data"])
+        return upstream_response
+
+    mock_context.__aenter__.side_effect = send_body
     mock_request.return_value = mock_context
 
     response = await async_client.post(
@@ -120,8 +125,7 @@ async def test_proxy_different_methods(mock_request, async_client: AsyncClient):
     )
     assert response.status_code == 201
     assert mock_request.call_args.kwargs["method"] == "POST"
-    request_data = mock_request.call_args.kwargs["data"]
-    assert request_data == b'{"data":"test"}'
+    assert received["data"] == b'{"data":"test"}'
 
 
 @pytest.mark.asyncio
@@ -135,15 +139,7 @@ async def test_proxy_integration_register_to_proxy(async_client: AsyncClient):
 
     # Патчим proxied-запрос
     with patch("app.services.proxy.aiohttp.ClientSession.request") as mock_request:
-        mock_response = MagicMock()
-        mock_response.status = 200
-        mock_response.read = AsyncMock(return_value=b"user matched")
-        mock_response.headers = {}
-
-        mock_context = MagicMock()
-        mock_context.__aenter__ = AsyncMock(return_value=mock_response)
-        mock_context.__aexit__ = AsyncMock(return_value=False)
-        mock_request.return_value = mock_context
+        mock_request.return_value = mock_upstream_response(200, b"user matched")
 
         headers = {"Authorization": f"Bearer {access_token}"}
         response = await async_client.get("/api/mock_service/secure", headers=headers)
@@ -151,3 +147,82 @@ async def test_proxy_integration_register_to_proxy(async_client: AsyncClient):
         called_headers = mock_request.call_args.kwargs["headers"]
         assert called_headers["X-Auth-User-ID"] == user_id
         assert called_headers["X-Auth-User-Role"] == "user"
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_proxy_streams_response_in_chunks(mock_request, async_client: AsyncClient, monkeypatch):
+    """Проверка потоковой передачи ответа микросервиса по чанкам."""
+    monkeypatch.setattr("app.services.proxy.settings.PROXY_CHUNK_SIZE", 4)
+    body = b"0123456789" * 10
+    mock_request.return_value = mock_upstream_response(200, body, {"Content-Type": "application/json"})
+
+    async with async_client.stream(
+            "GET", "/api/mock_service/products", headers={"Accept-Encoding": "identity"}
+    ) as response:
+        chunks = [chunk async for chunk in response.aiter_raw()]
+
+    assert response.status_code == 200
+    assert b"".join(chunks) == body
+    assert response.headers["content-type"] == "application/json"
+    assert mock_request.call_args.kwargs["data"] is None
+    mock_request.return_value.__aexit__.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_proxy_buffered_service(mock_request, async_client: AsyncClient):
+    """Проверка буферизованного режима для сервиса, где он включён в настройках."""
+    mock_request.return_value = mock_upstream_response(201, b"created")
+
+    response = await async_client.post("/api/buffered_service/create", json={"data": "test"})
+    assert response.status_code == 201
+    assert response.content == b"created"
+    assert mock_request.call_args.kwargs["data"] == b'{"data":"test"}'
+    mock_request.return_value.__aenter__.return_value.read.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_upstream_pool_settings(async_client: AsyncClient):
+    """Проверка отдельного пула соединений для каждого сервиса с настройками из конфигурации."""
+    upstreams = app.state.upstreams
+    buffered = upstreams.get("buffered_service")
+    profiles = upstreams.get("profiles")
+    assert buffered.session is not profiles.session
+    assert buffered.connector.limit == 5
+    assert buffered.session.timeout.connect == 1
+    assert buffered.session.timeout.sock_read == 2
+    assert profiles.connector.limit == 100
+
+    response = await async_client.get("/stats/upstreams", headers=STATS_HEADERS)
+    assert response.status_code == 200
+    assert response.json()["buffered_service"] == {
+        "limit": 5,
+        "acquired": 0,
+        "idle": 0,
+        "waiting": 0,
+        "instances": [
+            {"url": "http://buffered_service:8000", "in_flight": 0, "ejected": False, "consecutive_failures": 0},
+        ],
+    }
+
+
+@pytest.mark.asyncio
+async def test_upstream_pool_stats_without_connector_internals(async_client: AsyncClient, monkeypatch):
+    """Если версия aiohttp не содержит внутренних счётчиков пула, статистика возвращает None вместо ошибки."""
+    monkeypatch.setattr(app.state.upstreams.get("buffered_service"), "connector", SimpleNamespace(limit=5))
+
+    response = await async_client.get("/stats/upstreams", headers=STATS_HEADERS)
+    assert response.status_code == 200
+    stats = response.json()["buffered_service"]
+    assert (stats["limit"], stats["acquired"], stats["idle"], stats["waiting"]) == (5, None, None, None)
+
+
+@pytest.mark.asyncio
+async def test_stats_require_token(async_client: AsyncClient, monkeypatch):
+    """Эндпоинты /stats доступны только с STATS_TOKEN, без заданного токена закрыты."""
+    assert (await async_client.get("/stats/upstreams")).status_code == 401
+    assert (await async_client.get("/stats/upstreams", headers={"X-Stats-Token": "wrong"})).status_code == 401
+
+    monkeypatch.setattr("app.routers.stats.settings.STATS_TOKEN", None)
+    assert (await async_client.get("/stats/upstreams", headers=STATS_HEADERS)).status_code == 401
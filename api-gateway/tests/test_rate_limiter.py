@@ -0,0 +1,101 @@
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+
+from app.config import RateLimitQuota
+from app.models import User
+from app.utils.auth import create_access_token
+from app.utils.rate_limiter import RateLimiter
+from conftest import mock_upstream_response
+
+
+def test_bucket_allows_burst_then_refills(clock):
+    limiter = RateLimiter()
+    quota = RateLimitQuota(requests=2, period=10)
+    checks = [(("login", "1.2.3.4"), quota)]
+    assert limiter.acquire(checks) == 0
+    assert limiter.acquire(checks) == 0
+    assert limiter.acquire(checks) == pytest.approx(5)
+
+    clock.now += 5
+    assert limiter.acquire(checks) == 0
+    assert limiter.stats()["limited"] == 1
+
+
+def test_quota_split_between_workers(clock):
+    limiter = RateLimiter(workers=2)
+    quota = RateLimitQuota(requests=4, period=1)
+    assert limiter.worker_limits(quota) == (2, 2)
+    checks = [(("default", "user"), quota)]
+    assert limiter.acquire(checks) == 0
+    assert limiter.acquire(checks) == 0
+    assert limiter.acquire(checks) == pytest.approx(0.5)
+
+
+def test_rejected_request_does_not_consume_other_quotas(clock):
+    limiter = RateLimiter()
+    wide = (("default", "user"), RateLimitQuota(requests=10, period=1))
+    narrow = (("service:goods", "user"), RateLimitQuota(requests=1, period=1))
+    assert limiter.acquire([wide, narrow]) == 0
+    assert limiter.acquire([wide, narrow]) > 0
+    bucket = limiter.shards[hash(wide[0]) % len(limiter.shards)][wide[0]]
+    assert bucket[0] == 9
+
+
+def test_idle_buckets_swept(clock):
+    limiter = RateLimiter(shards=1, sweep_every=1)
+    quota = RateLimitQuota(requests=1, period=1)
+    limiter.acquire([(("default", "a"), quota)])
+    clock.now += 2
+    limiter.acquire([(("default", "b"), quota)])
+    assert list(limiter.shards[0]) == [("default", "b")]
+
+
+@pytest.mark.asyncio
+async def test_login_route_quota(async_client: AsyncClient, monkeypatch):
+    """Превышение квоты маршрута возвращает 429 с Retry-After."""
+    monkeypatch.setattr(
+        "app.middleware.settings.RATE_LIMIT_ROUTES", {"/api/auth/login": RateLimitQuota(requests=2, period=60)}
+    )
+    credentials = {"username": "nobody", "password": "wrongpass"}
+    for _ in range(2):
+        response = await async_client.post("/api/auth/login", json=credentials)
+        assert response.status_code == 401
+
+    response = await async_client.post("/api/auth/login", json=credentials)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "30"
+    assert response.json()["error"] == "TooManyRequestsError"
+
+
+@pytest.mark.asyncio
+async def test_client_ip_from_trusted_proxy(async_client: AsyncClient, monkeypatch):
+    """За доверенным прокси IP берётся из записи X-Forwarded-For, добавленной прокси, а не клиентом."""
+    monkeypatch.setattr(
+        "app.middleware.settings.RATE_LIMIT_ROUTES", {"/api/auth/login": RateLimitQuota(requests=1, period=60)}
+    )
+    monkeypatch.setattr("app.middleware.settings.RATE_LIMIT_TRUSTED_PROXIES", 1)
+    credentials = {"username": "nobody", "password": "wrongpass"}
+
+    async def login(forwarded_for: str) -> int:
+        headers = {"X-Forwarded-For": forwarded_for}
+        return (await async_client.post("/api/auth/login", json=credentials, headers=headers)).status_code
+
+    assert await login("10.0.0.1") == 401
+    assert await login("1.1.1.1, 10.0.0.1") == 429  # подставленный клиентом адрес не меняет квоту
+    assert await login("10.0.0.2") == 401
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_service_quota_per_user(mock_request, async_client: AsyncClient):
+    """Квота сервиса считается отдельно для каждого пользователя и для анонимных клиентов по IP."""
+    mock_request.return_value = mock_upstream_response(200, b"ok")
+    first = {"Authorization": f"Bearer {create_access_token(User(id=1, role='user'))}"}
+    second = {"Authorization": f"Bearer {create_access_token(User(id=2, role='user'))}"}
+
+    statuses = [(await async_client.get("/api/limited_service/items", headers=first)).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    assert (await async_client.get("/api/limited_service/items", headers=second)).status_code == 200
+    assert (await async_client.get("/api/limited_service/items")).status_code == 200
+    assert (await async_client.get("/api/mock_service/items", headers=first)).status_code == 200
@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+import aiohttp
+from httpx import AsyncClient
+from unittest.mock import patch
+
+from app.main import app
+from app.utils.retry import RetryBudget, LatencyTracker
+from conftest import STATS_HEADERS, mock_upstream_response
+
+
+def connection_refused() -> aiohttp.ClientConnectorError:
+    return aiohttp.ClientConnectorError(connection_key=None, os_error=OSError("Connection refused"))
+
+
+def test_retry_budget_limits_concurrent_retries():
+    """Дополнительных попыток не больше доли от выполняемых запросов, но не меньше минимума."""
+    budget = RetryBudget(ratio=0.1, min_concurrency=1)
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+
+    budget.active_requests = 30
+    assert budget.try_acquire()
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+    budget.release()
+    assert budget.try_acquire()
+
+
+def test_latency_tracker_percentile():
+    tracker = LatencyTracker(percentile=0.95, refresh_every=1)
+    for latency in range(1, 101):
+        tracker.record(latency / 1000)
+    assert tracker.value == pytest.approx(0.096)
+
+
+@pytest.mark.asyncio
+async def test_retry_on_connection_error(async_client: AsyncClient):
+    """GET повторяется на другом экземпляре после ошибки соединения."""
+    responses = [connection_refused(), mock_upstream_response(200, b"ok")]
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=responses) as mock_request:
+        response = await async_client.get("/api/retried_service/items")
+
+    assert response.status_code == 200
+    assert response.content == b"ok"
+    first, second = (call.kwargs["url"] for call in mock_request.call_args_list)
+    assert first != second
+
+    stats = (await async_client.get("/stats/retries", headers=STATS_HEADERS)).json()
+    assert stats["services"]["retried_service"]["retries"] == 1
+    assert stats["budget"] == {"active_requests": 0, "active_retries": 0}
+
+
+@pytest.mark.asyncio
+async def test_no_retry_for_unsafe_methods(async_client: AsyncClient):
+    """Неидемпотентные запросы не повторяются."""
+    with patch(
+            "app.services.proxy.aiohttp.ClientSession.request", side_effect=[connection_refused()]
+    ) as mock_request:
+        response = await async_client.post("/api/retried_service/items", content=b"{}")
+
+    assert response.status_code == 503
+    assert mock_request.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_request_wins(async_client: AsyncClient):
+    """Если ответ задерживается дольше перцентиля задержек, hedge-запрос отвечает вместо исходного."""
+    upstream = app.state.upstreams.get("retried_service")
+    for _ in range(upstream.retry.settings.hedge_min_samples):
+        upstream.retry.latency.record(0.001)
+
+    async def hang(*args):
+        await asyncio.sleep(10)
+
+    slow = mock_upstream_response(200, b"slow")
+    slow.__aenter__.side_effect = hang
+    fast = mock_upstream_response(200, b"fast")
+
+    with patch("app.services.proxy.aiohttp.ClientSession.request", side_effect=[slow, fast]) as mock_request:
+        response = await async_client.get("/api/retried_service/items")
+
+    assert response.status_code == 200
+    assert response.content == b"fast"
+    assert mock_request.call_count == 2
+    assert upstream.retry.stats()["hedges"] == 1
+    assert upstream.retry.stats()["hedge_wins"] == 1
+    assert [instance.in_flight for instance in upstream.balancer.instances] == [0, 0]
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_latency_samples(async_client: AsyncClient):
+    """Пока замеров задержки недостаточно, hedge-запросы не отправляются."""
+    with patch(
+            "app.services.proxy.aiohttp.ClientSession.request", return_value=mock_upstream_response(200, b"ok")
+    ) as mock_request:
+        response = await async_client.get("/api/retried_service/items")
+
+    assert response.status_code == 200
+    assert mock_request.call_count == 1
@@ -0,0 +1,59 @@
+import time
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+
+from app.models import User
+from app.utils.auth import create_access_token, decode_access_token
+from app.utils.token_cache import TokenCache
+from conftest import STATS_HEADERS, mock_upstream_response
+
+
+def make_token() -> str:
+    return create_access_token(User(id=1, role="user"))
+
+
+@pytest.mark.asyncio
+async def test_cached_token_skips_decoding(async_client: AsyncClient):
+    """Повторный запрос с тем же токеном не декодирует его заново."""
+    headers = {"Authorization": f"Bearer {make_token()}"}
+    with patch("app.services.proxy.aiohttp.ClientSession.request", return_value=mock_upstream_response(200)), \
+            patch("app.utils.auth.decode_access_token", wraps=decode_access_token) as mock_decode:
+        for _ in range(3):
+            response = await async_client.get("/api/mock_service/items", headers=headers)
+            assert response.status_code == 200
+
+    assert mock_decode.call_count == 1
+    stats = (await async_client.get("/stats/tokens", headers=STATS_HEADERS)).json()
+    assert stats["hits"] == 2
+    assert stats["entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalid_token_not_cached(async_client: AsyncClient):
+    """Невалидный токен не попадает в кэш и отклоняется при каждом запросе."""
+    headers = {"Authorization": "Bearer invalid.token.value"}
+    for _ in range(2):
+        response = await async_client.get("/api/mock_service/items", headers=headers)
+        assert response.status_code == 401
+
+    stats = (await async_client.get("/stats/tokens", headers=STATS_HEADERS)).json()
+    assert stats["entries"] == 0
+
+
+def test_token_cache_expires_entries():
+    cache = TokenCache(max_entries=10)
+    cache.store("token", {"sub": "1", "role": "user", "exp": int(time.time()) - 1})
+    assert cache.get("token") is None
+    assert cache.entries == {}
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(max_entries=2)
+    exp = int(time.time()) + 60
+    for token in ("a", "b"):
+        cache.store(token, {"sub": token, "role": "user", "exp": exp})
+    assert cache.get("a") is not None
+    cache.store("c", {"sub": "c", "role": "user", "exp": exp})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from prometheus_client import REGISTRY
+from sqlalchemy import func, select
+
+from app.models import RefreshToken, User
+from app.services.token_purge import purge_expired_refresh_tokens, run_refresh_token_purge
+from app.utils.auth import hash_refresh_token
+from conftest import test_async_session_maker, test_engine
+
+
+async def add_tokens(user: User, expired: int, valid: int) -> None:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    async with test_async_session_maker() as session:
+        for i in range(expired + valid):
+            expires_at = now - timedelta(minutes=1) if i < expired else now + timedelta(days=1)
+            token_hash = hash_refresh_token(f"token-{i}")
+            session.add(RefreshToken(user_id=user.id, token_hash=token_hash, expires_at=expires_at))
+        await session.commit()
+
+
+async def count_tokens() -> int:
+    async with test_async_session_maker() as session:
+        return await session.scalar(select(func.count()).select_from(RefreshToken))
+
+
+@pytest.mark.asyncio
+async def test_purge_expired_tokens_in_batches(test_user: User):
+    """Просроченные токены удаляются пакетами, действующие остаются."""
+    await add_tokens(test_user, expired=5, valid=2)
+    purged_before = REGISTRY.get_sample_value("refresh_tokens_purged_total") or 0
+
+    assert await purge_expired_refresh_tokens(test_engine, batch_size=2) == 5
+    assert await count_tokens() == 2
+    assert REGISTRY.get_sample_value("refresh_tokens_purged_total") == purged_before + 5
+    assert await purge_expired_refresh_tokens(test_engine, batch_size=2) == 0
+
+
+@pytest.mark.asyncio
+async def test_purge_runs_periodically(test_user: User, monkeypatch):
+    """Фоновая задача периодически удаляет просроченные токены."""
+    await add_tokens(test_user, expired=3, valid=1)
+    purged = asyncio.Event()
+
+    async def purge_and_notify(*args):
+        result = await purge_expired_refresh_tokens(*args)
+        purged.set()
+        return result
+
+    monkeypatch.setattr("app.services.token_purge.purge_expired_refresh_tokens", purge_and_notify)
+    purge = asyncio.create_task(run_refresh_token_purge(test_engine, interval=0.01, batch_size=100))
+    await asyncio.wait_for(purged.wait(), 1)
+    # Отмена во время запроса закрыла бы единственное соединение тестовой БД в памяти, задача отменяется в паузе
+    purge.cancel()
+    with suppress(asyncio.CancelledError):
+        await purge
+
+    assert await count_tokens() == 1
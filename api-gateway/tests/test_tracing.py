@@ -0,0 +1,89 @@
+import json
+import logging
+import pytest
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import patch
+from starlette.responses import PlainTextResponse
+
+from app.models import User
+from app.tracing import SpanExporter, Trace, TracingMiddleware, RequestIdFilter, current_trace, span
+from app.utils.auth import create_access_token
+from conftest import mock_upstream_response
+
+
+def server_timing(response) -> dict[str, float]:
+    entries = {}
+    for entry in response.headers["server-timing"].split(", "):
+        name, _, duration = entry.partition(";dur=")
+        entries[name] = float(duration)
+    return entries
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_proxy_request_id_and_server_timing(mock_request, async_client: AsyncClient):
+    """Gateway создаёт X-Request-ID, передаёт его микросервису и объединяет интервалы с его Server-Timing."""
+    mock_request.return_value = mock_upstream_response(200, b"ok", {"server-timing": "db;dur=2.5, total;dur=4"})
+    token = create_access_token(User(id=1, role="user"))
+
+    response = await async_client.get("/api/mock_service/items", headers={"Authorization": f"Bearer {token}"})
+    request_id = response.headers["x-request-id"]
+    assert len(request_id) == 32
+    assert mock_request.call_args.kwargs["headers"]["x-request-id"] == request_id
+
+    timings = server_timing(response)
+    assert {"auth", "upstream", "total"} <= timings.keys()
+    assert timings["mock_service-db"] == 2.5
+    assert timings["mock_service-total"] == 4.0
+
+
+@pytest.mark.asyncio
+@patch("app.services.proxy.aiohttp.ClientSession.request")
+async def test_client_request_id_propagated(mock_request, async_client: AsyncClient):
+    """X-Request-ID клиента сохраняется и передаётся микросервису."""
+    mock_request.return_value = mock_upstream_response(200, b"ok", {"X-Request-ID": "upstream-id"})
+
+    response = await async_client.get("/api/mock_service/items", headers={"X-Request-ID": "client-id"})
+    assert response.headers["x-request-id"] == "client-id"
+    assert mock_request.call_args.kwargs["headers"]["x-request-id"] == "client-id"
+
+
+@pytest.mark.asyncio
+async def test_db_and_serialize_spans(async_client: AsyncClient):
+    """Запросы к БД и сериализация ответа попадают в Server-Timing."""
+    response = await async_client.post("/api/auth/register", json={"username": "traced", "password": "pass"})
+    assert response.status_code == 200
+    assert {"db", "serialize", "total"} <= server_timing(response).keys()
+
+
+@pytest.mark.asyncio
+async def test_span_export(tmp_path):
+    """Интервалы запроса выгружаются в файл в формате JSON Lines."""
+    async def endpoint(scope, receive, send):
+        with span("work"):
+            pass
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    exporter = SpanExporter(str(tmp_path / "spans.jsonl"))
+    transport = ASGITransport(app=TracingMiddleware(endpoint, exporter=exporter))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/path", headers={"X-Request-ID": "export-id"})
+    exporter.close()
+
+    record = json.loads((tmp_path / "spans.jsonl").read_text())
+    assert record["request_id"] == "export-id"
+    assert record["path"] == "/path"
+    assert record["status"] == 200
+    assert [s["name"] for s in record["spans"]] == ["work"]
+    assert "work;dur=" in response.headers["server-timing"]
+
+
+def test_request_id_filter():
+    """Записи лога внутри запроса получают request_id."""
+    record = logging.LogRecord("test", logging.INFO, "", 0, "message", (), None)
+    token = current_trace.set(Trace("log-id"))
+    try:
+        RequestIdFilter().filter(record)
+    finally:
+        current_trace.reset(token)
+    assert record.request_id == "log-id"
@@ -21,6 +21,19 @@ class Settings(BaseSettings):
     PORT: int = 8000
     WORKERS: int = 1
     LOG_LEVEL: int = logging.INFO
+    LOG_SAMPLING: dict[str, float] = {}  # доля выводимых записей INFO и ниже по логгерам (пример: {"app.routers": 0.1})
+
+    # Метрики Prometheus (GET /metrics)
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str | None = None  # токен Prometheus (Authorization: Bearer) для /metrics, не задан - закрыт
+    METRICS_LOOP_LAG_INTERVAL: float = 0.5  # период измерения задержки event loop (в секундах)
+
+    # Трассировка запросов (X-Request-ID и Server-Timing)
+    TRACING_ENABLED: bool = True
+    TRACING_EXPORT_FILE: str | None = None  # файл для выгрузки интервалов запросов (JSON Lines)
+
+    # Сериализация ответов сразу в байты, без повторной проверки по response_model
+    FAST_RESPONSES: bool = False
 
     # Режим отладки
     DEBUG: bool = False
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -6,18 +7,32 @@ from app.database import setup_database, engine
 from app.routers import main_router
 from app.exceptions import *
 from app.config import settings
-from app.logs import setup_logging
+from app.logs import setup_logging, shutdown_logging
+from app.metrics import MetricsMiddleware, instrument_engine, metrics_endpoint, monitor_event_loop, shutdown_metrics
+from app.tracing import SpanExporter, TracedJSONResponse, TracingMiddleware, trace_engine
+
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+span_exporter = None
+if settings.TRACING_ENABLED:
+    trace_engine(engine)
+    if settings.TRACING_EXPORT_FILE:
+        span_exporter = SpanExporter(settings.TRACING_EXPORT_FILE)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Настройка жизненного цикла приложения: инициализация и завершение работы БД."""
-    setup_logging(debug=settings.DEBUG, level=settings.LOG_LEVEL, exclude_extra_fields=["message", "asctime"])
+    setup_logging(debug=settings.DEBUG, level=settings.LOG_LEVEL, exclude_extra_fields=["message", "asctime"],
+                  sampling=settings.LOG_SAMPLING)
     logger = logging.getLogger(__name__)
     safe_settings = settings.model_dump(exclude={"DB_PASSWORD", "DB_USER"})
     logger.info("Loaded settings from .env", extra={"settings": safe_settings})
 
     logger.info("Application startup")
+    loop_monitor = None
+    if settings.METRICS_ENABLED:
+        loop_monitor = asyncio.create_task(monitor_event_loop(settings.METRICS_LOOP_LAG_INTERVAL))
     await setup_database()  # создаём таблицы в базе при старте
     logger.info("Application startup complete")
     if settings.DEBUG:
@@ -25,11 +40,27 @@ async def lifespan(app: FastAPI):
         logger.info(f"Docs on http://{host}:{settings.PORT}/docs")
 
     yield
+    if loop_monitor is not None:
+        loop_monitor.cancel()
+        shutdown_metrics()
+    if span_exporter is not None:
+        span_exporter.close()
     await engine.dispose()  # закрываем соединение с базой при остановке
     logger.info("Application shutdown complete")
+    shutdown_logging()  # дожидаемся вывода записей из очереди
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=TracedJSONResponse)
+
+# Метрики Prometheus: время обработки запросов и GET /metrics (до роутера: /{product_id} перехватил бы путь)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_endpoint, include_in_schema=False)
 
+# Трассировка: X-Request-ID, Server-Timing и выгрузка интервалов (внешний слой, учитывает все middleware)
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware, exporter=span_exporter)
 
-app = FastAPI(lifespan=lifespan)
 app.include_router(main_router)
 
 # Подключаем обработчики исключений для FastAPI
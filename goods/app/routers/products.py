@@ -12,6 +12,7 @@ from app.services.products import (
 )
 from app.schemas import ProductCreateSchema, ProductUpdateSchema, ProductSchema, ProductShortSchema
 from app.utils.auth import get_auth_user_id
+from app.utils.responses import model_response
 
 logger = logging.getLogger(__name__)
 
@@ -25,13 +26,13 @@ async def create_product(
         auth_user_id: int = Depends(get_auth_user_id),
 ):
     logger.info("Create product endpoint called", extra={"user_id": auth_user_id})
-    return await create_product_service(db, product_data, user_id=auth_user_id)
+    return model_response(await create_product_service(db, product_data, user_id=auth_user_id), ProductSchema)
 
 
 @router.get("/{product_id}", response_model=ProductSchema)
 async def get_product(product_id: int, db: AsyncSession = Depends(get_session)):
     logger.info("Get product endpoint called", extra={"product_id": product_id})
-    return await get_product_details(db, product_id)
+    return model_response(await get_product_details(db, product_id), ProductSchema)
 
 
 @router.put("/{product_id}", response_model=ProductSchema)
@@ -42,7 +43,9 @@ async def update_product(
         auth_user_id: int = Depends(get_auth_user_id),
 ):
     logger.info("Update product endpoint called", extra={"product_id": product_id, "user_id": auth_user_id})
-    return await update_product_service(db, product_id, update_data, user_id=auth_user_id)
+    return model_response(
+        await update_product_service(db, product_id, update_data, user_id=auth_user_id), ProductSchema
+    )
 
 
 @router.delete("/{product_id}")
@@ -63,4 +66,4 @@ async def get_products(
         db: AsyncSession = Depends(get_session)
 ):
     logger.info("List products endpoint called", extra={"skip": skip, "limit": limit})
-    return await list_products(db, skip=skip, limit=limit)
+    return model_response(await list_products(db, skip=skip, limit=limit), list[ProductShortSchema])
@@ -10,6 +10,7 @@ from app.services.reviews import (
 )
 from app.schemas import ReviewCreateSchema, ReviewUpdateSchema, ReviewSchema
 from app.utils.auth import get_auth_user_id
+from app.utils.responses import model_response
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +25,7 @@ async def add_review(
         auth_user_id: int = Depends(get_auth_user_id),
 ):
     logger.info("Add review endpoint called", extra={"product_id": product_id, "user_id": auth_user_id})
-    return await add_review_service(db, product_id, auth_user_id, review_data)
+    return model_response(await add_review_service(db, product_id, auth_user_id, review_data), ReviewSchema)
 
 
 @router.put("/{review_id}", response_model=ReviewSchema)
@@ -35,7 +36,7 @@ async def update_review(
         auth_user_id: int = Depends(get_auth_user_id),
 ):
     logger.info("Update review endpoint called", extra={"review_id": review_id, "user_id": auth_user_id})
-    return await update_review_service(db, review_id, update_data, auth_user_id)
+    return model_response(await update_review_service(db, review_id, update_data, auth_user_id), ReviewSchema)
 
 
 @router.delete("/{review_id}")
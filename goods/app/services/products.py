@@ -10,6 +10,7 @@ from app.repositories.product import (
 )
 from app.schemas import ProductCreateSchema, ProductSchema, ProductUpdateSchema, ProductShortSchema
 from app.exceptions import ConflictError, NotFoundError, ForbiddenError
+from app.utils.responses import get_adapter
 
 logger = logging.getLogger(__name__)
 
@@ -50,7 +51,7 @@ async def get_product_details(db: AsyncSession, product_id: int) -> ProductSchem
 async def list_products(db: AsyncSession, skip: int = 0, limit: int = 10) -> list[ProductShortSchema]:
     logger.info("Listing products")
     products = await get_all_products(db, skip=skip, limit=limit, joined_load=False)
-    return [ProductShortSchema.model_validate(p) for p in products]
+    return get_adapter(list[ProductShortSchema]).validate_python(products, from_attributes=True)
 
 
 async def update_product_service(
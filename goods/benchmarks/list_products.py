@@ -0,0 +1,76 @@
+"""
+Сравнение пропускной способности GET / (список товаров) с обычной сериализацией FastAPI и с FAST_RESPONSES.
+
+Запуск из каталога goods (используется SQLite в памяти, нужен aiosqlite):
+    python benchmarks/list_products.py [--requests 500] [--sizes 10 100 1000]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+for name, value in {"DB_USER": "bench", "DB_PASSWORD": "bench", "DB_NAME": "bench"}.items():
+    os.environ.setdefault(name, value)
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.database import Base, get_session
+from app.main import app
+from app.models import Product
+
+
+async def run(client: AsyncClient, size: int, requests: int) -> float:
+    """Запрашивает список из size товаров requests раз, возвращает количество запросов в секунду."""
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get("/", params={"limit": size})
+        assert response.status_code == 200
+    return requests / (time.perf_counter() - started)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def override_get_session():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with session_maker() as session:
+        session.add_all(
+            Product(user_id=i % 50, name=f"Товар {i}", description="Описание товара " * 5, price=i + 0.99,
+                    image_url=f"https://example.com/{i}.jpg", rating=4.5, reviews_count=i % 10)
+            for i in range(max(args.sizes))
+        )
+        await session.commit()
+
+    print(f"requests={args.requests}")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for size in args.sizes:
+            results = {}
+            for fast in (False, True):
+                settings.FAST_RESPONSES = fast
+                await run(client, size, args.requests // 10)  # прогрев
+                results[fast] = await run(client, size, args.requests)
+            print(f"items={size:<5} default: {results[False]:8.1f} req/s   "
+                  f"fast: {results[True]:8.1f} req/s (x{results[True] / results[False]:.2f})")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
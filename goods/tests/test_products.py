@@ -106,3 +106,19 @@ async def test_list_products(async_client: AsyncClient, test_product):
     assert isinstance(data, list)
     assert len(data) >= 1
     assert data[0]["id"] == test_product.id
+
+
+@pytest.mark.asyncio
+async def test_fast_responses(async_client: AsyncClient, test_product, monkeypatch):
+    """Быстрая сериализация возвращает тот же ответ, что и обычная обработка FastAPI."""
+    await async_client.post(f"/reviews/{test_product.id}", json={"rating": 5, "text": "Отлично"},
+                            headers=auth_header(2))
+    paths = ["/", f"/{test_product.id}"]
+    expected = [(await async_client.get(path)).content for path in paths]
+
+    monkeypatch.setattr("app.utils.responses.settings.FAST_RESPONSES", True)
+    for path, body in zip(paths, expected):
+        response = await async_client.get(path)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.content == body
@@ -0,0 +1,14 @@
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.mark.asyncio
+async def test_request_id_and_server_timing(async_client: AsyncClient, test_product):
+    """Ответ содержит X-Request-ID запроса и интервалы обработки в Server-Timing."""
+    response = await async_client.get(f"/{test_product.id}", headers={"X-Request-ID": "goods-id"})
+    assert response.status_code == 200
+    assert response.headers["x-request-id"] == "goods-id"
+    timings = response.headers["server-timing"]
+    assert "db;dur=" in timings
+    assert "serialize;dur=" in timings
+    assert "total;dur=" in timings
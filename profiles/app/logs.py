@@ -1,7 +1,14 @@
 import sys
+import copy
+import queue
+import atexit
+import random
+from logging.handlers import QueueHandler, QueueListener
 from pythonjsonlogger.json import JsonFormatter
 import logging
 
+from app.tracing import RequestIdFilter
+
 ANSI = {
     "reset": "\033[0m",
     "debug": "\033[90m",
@@ -71,11 +78,62 @@ class PrettyFormatter(logging.Formatter):
         return "\n".join(lines)
 
 
-def setup_logging(debug: bool, level: int, exclude_extra_fields=None):
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает долю записей уровня INFO и ниже для логгеров из rates (например, {"app.middleware": 0.1}).
+    Частота логгера действует и на его потомков, остальные записи пропускаются всегда.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: dict[str, float] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1 or random.random() < rate
+
+    def _rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate, logger_name = 1.0, name
+            while logger_name:
+                if logger_name in self.rates:
+                    rate = self.rates[logger_name]
+                    break
+                logger_name = logger_name.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Передаёт записи в очередь без форматирования: в вызывающем потоке подставляются только аргументы сообщения,
+    форматирование и traceback - в потоке QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_queue_handler: QueueHandler | None = None
+_listener: QueueListener | None = None
+
+
+def setup_logging(debug: bool, level: int, exclude_extra_fields=None, sampling: dict[str, float] | None = None):
     """
     - dev (debug = True) -> PrettyFormatter
     - prod (debug = False) -> JSON
+    Записи передаются через очередь и выводятся в отдельном потоке, не блокируя event loop.
     """
+    global _queue_handler, _listener
+    shutdown_logging()
+
     root = logging.getLogger()
     root.handlers.clear()
     root.setLevel(level)
@@ -100,6 +158,35 @@ def setup_logging(debug: bool, level: int, exclude_extra_fields=None):
             )
         )
 
-    root.addHandler(handler)
+    # Фильтры выполняются в вызывающем потоке: request_id берётся из контекста запроса,
+    # а отброшенные записи не попадают в очередь
+    _queue_handler = LazyQueueHandler(queue.SimpleQueue())
+    _queue_handler.addFilter(SamplingFilter(sampling or {}))
+    _queue_handler.addFilter(RequestIdFilter())
+    _listener = QueueListener(_queue_handler.queue, handler, respect_handler_level=True)
+    _listener.start()
+
+    root.addHandler(_queue_handler)
 
     return root
+
+
+def shutdown_logging() -> None:
+    """
+    Дожидается вывода записей из очереди и переключает корневой логгер на синхронный вывод,
+    чтобы не потерять записи, сделанные после остановки приложения.
+    """
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        for log_filter in _queue_handler.filters:
+            handler.addFilter(log_filter)
+        root.addHandler(handler)
+    _queue_handler = _listener = None
+
+
+atexit.register(shutdown_logging)
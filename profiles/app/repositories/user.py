@@ -49,6 +49,16 @@ async def get_user_by_id(db: AsyncSession, user_id: int) -> User | None:
     return user
 
 
+async def get_users_by_ids(db: AsyncSession, user_ids: list[int]) -> list[User]:
+    """Возвращает пользователей по списку user_id одним запросом."""
+    logger.debug("Fetching users by IDs", extra={"user_ids": user_ids})
+    stmt = select(User).where(User.user_id.in_(user_ids))
+    result = await db.execute(stmt)
+    users = list(result.scalars().all())
+    logger.debug("Users found", extra={"requested": len(user_ids), "found": len(users)})
+    return users
+
+
 async def update_user(db: AsyncSession, user: User, **fields) -> User:
     """Обновляет данные пользователя."""
     logger.debug("Updating user", extra={"user_id": user.user_id, "fields": fields})
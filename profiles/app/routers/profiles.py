@@ -1,16 +1,20 @@
 import logging
-from fastapi import APIRouter, Depends
+from typing import List
+from fastapi import APIRouter, Depends, Header, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_session
 from app.services.profiles import (
     create_user_service,
     get_user_profile,
+    get_users_brief,
     update_user_service,
     delete_user_service,
 )
+from app.config import settings
 from app.schemas import UserCreateSchema, UserUpdateSchema, UserSchema, UserBriefSchema
 from app.utils.auth import get_auth_user_id
+from app.utils.responses import model_response
 
 logger = logging.getLogger(__name__)
 
@@ -22,9 +26,10 @@ async def create_profile(
         user_data: UserCreateSchema,
         db: AsyncSession = Depends(get_session),
         auth_user_id: int = Depends(get_auth_user_id),
+        idempotency_key: str | None = Header(None),
 ):
     logger.info("Create profile endpoint called", extra={"user_id": auth_user_id})
-    return await create_user_service(db, auth_user_id, user_data)
+    return model_response(await create_user_service(db, auth_user_id, user_data, idempotency_key), UserSchema)
 
 
 @router.get("/", response_model=UserSchema)
@@ -33,13 +38,22 @@ async def get_profile_self(
         auth_user_id: int = Depends(get_auth_user_id),
 ):
     logger.info("Get self profile endpoint called", extra={"user_id": auth_user_id})
-    return await get_user_profile(db, auth_user_id)
+    return model_response(await get_user_profile(db, auth_user_id), UserSchema)
+
+
+@router.get("/brief", response_model=List[UserBriefSchema])
+async def get_profiles_brief(
+        user_ids: List[int] = Query(alias="user_id", min_length=1, max_length=settings.BRIEF_MAX_IDS),
+        db: AsyncSession = Depends(get_session),
+):
+    logger.info("Get profiles brief endpoint called", extra={"count": len(user_ids)})
+    return model_response(await get_users_brief(db, user_ids), List[UserBriefSchema])
 
 
 @router.get("/{user_id}", response_model=UserSchema)
 async def get_profile(user_id: int, db: AsyncSession = Depends(get_session)):
     logger.info("Get profile endpoint called", extra={"user_id": user_id})
-    return await get_user_profile(db, user_id)
+    return model_response(await get_user_profile(db, user_id), UserSchema)
 
 
 @router.put("/", response_model=UserSchema)
@@ -49,7 +63,7 @@ async def update_profile_self(
         auth_user_id: int = Depends(get_auth_user_id),
 ):
     logger.info("Update self profile endpoint called", extra={"user_id": auth_user_id})
-    return await update_user_service(db, auth_user_id, update_data)
+    return model_response(await update_user_service(db, auth_user_id, update_data), UserSchema)
 
 
 @router.delete("/")
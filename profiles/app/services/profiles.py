@@ -2,20 +2,30 @@ import logging
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.repositories.user import create_user, get_user_by_id, update_user, delete_user
+from app.repositories.user import create_user, get_user_by_id, get_users_by_ids, update_user, delete_user
 from app.schemas import UserCreateSchema, UserUpdateSchema, UserSchema, UserBriefSchema
 from app.exceptions import NotFoundError, ConflictError
+from app.utils.responses import get_adapter
 
 logger = logging.getLogger(__name__)
 
 
-async def create_user_service(db: AsyncSession, user_id: int, user_data: UserCreateSchema) -> UserSchema:
-    """Создание пользователя."""
+async def create_user_service(
+        db: AsyncSession, user_id: int, user_data: UserCreateSchema, idempotency_key: str | None = None
+) -> UserSchema:
+    """
+    Создание пользователя.
+    С idempotency_key повторный запрос (профиль уже создан с тем же username) возвращает существующий профиль.
+    """
     logger.info("Creating user service", extra={"user_id": user_id})
     try:
         user = await create_user(db, user_id, **user_data.model_dump())
     except IntegrityError:
-        raise ConflictError("User with such data already exists")
+        existing = await get_user_by_id(db, user_id) if idempotency_key else None
+        if existing is None or existing.username != user_data.username:
+            raise ConflictError("User with such data already exists")
+        logger.info("Repeated create request", extra={"user_id": user_id, "idempotency_key": idempotency_key})
+        return UserSchema.model_validate(existing)
     logger.info("User created successfully", extra={"user_id": user.user_id})
     return UserSchema.model_validate(user)
 
@@ -30,6 +40,13 @@ async def get_user_profile(db: AsyncSession, user_id: int) -> UserSchema:
     return UserSchema.model_validate(user)
 
 
+async def get_users_brief(db: AsyncSession, user_ids: list[int]) -> list[UserBriefSchema]:
+    """Получение кратких профилей нескольких пользователей (несуществующие пропускаются)."""
+    logger.info("Getting users brief", extra={"count": len(user_ids)})
+    users = await get_users_by_ids(db, list(dict.fromkeys(user_ids)))
+    return get_adapter(list[UserBriefSchema]).validate_python(users, from_attributes=True)
+
+
 async def update_user_service(db: AsyncSession, user_id: int, update_data: UserUpdateSchema) -> UserSchema:
     """Обновление профиля."""
     logger.info("Updating user service", extra={"user_id": user_id})
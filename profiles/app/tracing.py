@@ -0,0 +1,194 @@
+import json
+import time
+import uuid
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "x-request-id"
+REQUEST_ID_MAX_LENGTH = 128
+
+
+class Trace:
+    """Интервалы (spans) обработки одного запроса."""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.spans: list[tuple[str, float, float]] = []  # (имя, начало от старта запроса, длительность) в секундах
+
+    def add(self, name: str, duration: float) -> None:
+        """Добавляет интервал, который закончился сейчас."""
+        self.spans.append((name, time.perf_counter() - self.started - duration, duration))
+
+    def server_timing(self) -> str:
+        """Значение заголовка Server-Timing: суммарная длительность интервалов каждого имени и общее время."""
+        durations: dict[str, float] = {}
+        for name, _, duration in self.spans:
+            durations[name] = durations.get(name, 0) + duration
+        durations["total"] = time.perf_counter() - self.started
+        return ", ".join(f"{name};dur={duration * 1000:.1f}" for name, duration in durations.items())
+
+
+current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+
+
+def current_request_id() -> str | None:
+    trace = current_trace.get()
+    return trace.request_id if trace else None
+
+
+@contextmanager
+def span(name: str):
+    """Измеряет интервал текущего запроса (вне запроса ничего не делает)."""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - started)
+
+
+def record_span(name: str, duration: float) -> None:
+    """Добавляет уже измеренный интервал к текущему запросу."""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(name, duration)
+
+
+def merge_server_timing(prefix: str, value: str | None) -> None:
+    """Добавляет к текущему запросу интервалы из заголовка Server-Timing ответа микросервиса (имена с префиксом)."""
+    trace = current_trace.get()
+    if trace is None or not value:
+        return
+    for entry in value.split(","):
+        name, *params = (part.strip() for part in entry.split(";"))
+        for param in params:
+            key, _, duration = param.partition("=")
+            if key == "dur" and name:
+                try:
+                    trace.add(f"{prefix}-{name}", float(duration) / 1000)
+                except ValueError:
+                    pass
+
+
+class SpanExporter:
+    """Выгружает интервалы запросов в файл (JSON Lines) из отдельного потока, не блокируя event loop."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self.thread.start()
+
+    def export(self, record: dict) -> None:
+        self.queue.put(record)
+
+    def _run(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            while (record := self.queue.get()) is not None:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if self.queue.empty():
+                    file.flush()
+
+    def close(self) -> None:
+        """Дожидается записи всех интервалов."""
+        self.queue.put(None)
+        self.thread.join()
+
+
+class TracingMiddleware:
+    """
+    Принимает X-Request-ID клиента или создаёт новый, возвращает его в ответе и передаёт в логи.
+    Добавляет к ответу заголовок Server-Timing с интервалами обработки запроса и выгружает их в exporter.
+    """
+
+    def __init__(self, app: ASGIApp, exporter: SpanExporter | None = None):
+        self.app = app
+        self.exporter = exporter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        if not request_id or len(request_id) > REQUEST_ID_MAX_LENGTH or not request_id.isprintable():
+            request_id = uuid.uuid4().hex
+        trace = Trace(request_id)
+        token = current_trace.set(trace)
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["Server-Timing"] = trace.server_timing()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_trace.reset(token)
+            if self.exporter is not None:
+                self.exporter.export({
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round((time.perf_counter() - trace.started) * 1000, 3),
+                    "spans": [
+                        {"name": name, "start_ms": round(start * 1000, 3), "duration_ms": round(duration * 1000, 3)}
+                        for name, start, duration in trace.spans
+                    ],
+                })
+
+
+class TracedJSONResponse(JSONResponse):
+    """JSON-ответ, время сериализации которого учитывается в интервале serialize."""
+
+    def render(self, content) -> bytes:
+        with span("serialize"):
+            return super().render(content)
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавляет к записям лога request_id текущего запроса."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = current_request_id()
+        if request_id is not None:
+            record.request_id = request_id
+        return True
+
+
+def trace_engine(engine: AsyncEngine) -> None:
+    """Учитывает выполнение SQL-запросов в интервале db."""
+
+    def before_cursor_execute(conn, *args) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, *args) -> None:
+        record_span("db", time.perf_counter() - conn.info["query_started"].pop())
+
+    def handle_error(context) -> None:
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", handle_error)
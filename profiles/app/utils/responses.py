@@ -0,0 +1,25 @@
+from functools import lru_cache
+from typing import Any
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.config import settings
+from app.tracing import span
+
+
+@lru_cache
+def get_adapter(response_type: Any) -> TypeAdapter:
+    """TypeAdapter для типа ответа (создаётся один раз на тип)."""
+    return TypeAdapter(response_type)
+
+
+def model_response(content: Any, response_type: Any) -> Any:
+    """
+    При FAST_RESPONSES сериализует уже проверенные модели сразу в байты (Pydantic, без json и повторной проверки
+    по response_model). Иначе возвращает content для обычной обработки FastAPI.
+    """
+    if not settings.FAST_RESPONSES:
+        return content
+    with span("serialize"):
+        body = get_adapter(response_type).dump_json(content)
+    return Response(body, media_type="application/json")
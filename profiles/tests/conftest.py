@@ -14,10 +14,14 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from app.config import settings as app_settings
 from app.database import Base, get_session
 from app.main import app
+from app.tracing import trace_engine
 from app.models import User
 
 app_settings.DEBUG = True
 app_settings.LOG_LEVEL = logging.ERROR
+app_settings.METRICS_TOKEN = "testmetricstoken"
+
+METRICS_HEADERS = {"Authorization": f"Bearer {app_settings.METRICS_TOKEN}"}
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
@@ -27,6 +31,7 @@ test_engine = create_async_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
+trace_engine(test_engine)  # SQL-запросы тестовой БД учитываются в Server-Timing, как в приложении
 async_session_maker = async_sessionmaker(
     test_engine, expire_on_commit=False, class_=AsyncSession
 )
@@ -0,0 +1,23 @@
+import pytest
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+
+from conftest import METRICS_HEADERS
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(async_client: AsyncClient):
+    """Запросы учитываются по шаблону маршрута и статусу ответа, /metrics отдаётся только с METRICS_TOKEN."""
+    labels = {"method": "GET", "route": "/profile/{user_id}", "status": "404"}
+    before = REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) or 0
+
+    response = await async_client.get("/profile/999")
+    assert response.status_code == 404
+    assert REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) == before + 1
+
+    assert (await async_client.get("/metrics")).status_code == 401
+    assert (await async_client.get("/metrics", headers={"Authorization": "Bearer wrong"})).status_code == 401
+    response = await async_client.get("/metrics", headers=METRICS_HEADERS)
+    assert response.status_code == 200
+    assert 'route="/profile/{user_id}"' in response.text
+    assert "db_pool_checkouts_total" in response.text
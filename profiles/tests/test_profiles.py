@@ -35,6 +35,20 @@ async def test_create_profile_conflict(async_client: AsyncClient, test_user: Use
     assert response.json()["error"] == "ConflictError"
 
 
+@pytest.mark.asyncio
+async def test_create_profile_idempotent_replay(async_client: AsyncClient, test_user: User):
+    """Повтор создания с Idempotency-Key возвращает уже созданный профиль, другой username - конфликт."""
+    user_data = {"username": "newuser", "display_name": "New User", "email": "new@example.com"}
+    headers = {"X-Auth-User-ID": "2", "Idempotency-Key": "profile-create:2"}
+    first = await async_client.post("/profile/", json=user_data, headers=headers)
+    replay = await async_client.post("/profile/", json=user_data, headers=headers)
+    assert replay.status_code == first.status_code
+    assert replay.json() == first.json()
+
+    response = await async_client.post("/profile/", json={**user_data, "username": "other"}, headers=headers)
+    assert response.status_code == 409
+
+
 @pytest.mark.asyncio
 async def test_get_profile_self_success(async_client: AsyncClient, test_user: User):
     """Проверка получения своего полного профиля."""
@@ -139,3 +153,39 @@ async def test_delete_profile_self_not_found(async_client: AsyncClient):
     response = await async_client.delete("/profile/", headers=headers)
     assert response.status_code == 404
     assert response.json()["error"] == "NotFoundError"
+
+
+@pytest.mark.asyncio
+async def test_get_profiles_brief(async_client: AsyncClient, test_user: User):
+    """Проверка пакетного получения кратких профилей (несуществующие пропускаются)."""
+    async with async_session_maker() as session:
+        session.add(User(user_id=2, username="second", display_name="Second User", email="second@example.com"))
+        await session.commit()
+
+    response = await async_client.get("/profile/brief", params=[("user_id", 1), ("user_id", 2), ("user_id", 999)])
+    assert response.status_code == 200
+    assert sorted(response.json(), key=lambda u: u["user_id"]) == [
+        {"user_id": 1, "display_name": "Test User"},
+        {"user_id": 2, "display_name": "Second User"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_profiles_brief_validation(async_client: AsyncClient):
+    """Проверка ограничений на список user_id."""
+    assert (await async_client.get("/profile/brief")).status_code == 422
+    too_many = [("user_id", i) for i in range(101)]
+    assert (await async_client.get("/profile/brief", params=too_many)).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_fast_responses(async_client: AsyncClient, test_user: User, monkeypatch):
+    """Быстрая сериализация возвращает тот же ответ, что и обычная обработка FastAPI."""
+    paths = ["/profile/1", "/profile/brief?user_id=1"]
+    expected = [(await async_client.get(path)).content for path in paths]
+
+    monkeypatch.setattr("app.utils.responses.settings.FAST_RESPONSES", True)
+    for path, body in zip(paths, expected):
+        response = await async_client.get(path)
+        assert response.status_code == 200
+        assert response.content == body
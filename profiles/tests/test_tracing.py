@@ -0,0 +1,15 @@
+import pytest
+from httpx import AsyncClient
+from app.models import User
+
+
+@pytest.mark.asyncio
+async def test_request_id_and_server_timing(async_client: AsyncClient, test_user: User):
+    """Ответ содержит X-Request-ID запроса и интервалы обработки в Server-Timing."""
+    response = await async_client.get("/profile/1", headers={"X-Request-ID": "profiles-id"})
+    assert response.status_code == 200
+    assert response.headers["x-request-id"] == "profiles-id"
+    timings = response.headers["server-timing"]
+    assert "db;dur=" in timings
+    assert "serialize;dur=" in timings
+    assert "total;dur=" in timings